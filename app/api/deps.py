@@ -1 +1 @@
-from app.core.dependencies import get_redis, validate_api_key
+from app.core.dependencies import get_redis, get_api_key, validate_api_key, validate_admin_key, is_api_key_allowed, require_allowed, check_rate_limit, require_within_rate
@@ -1,20 +1,101 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import base64
+import hashlib
+import json
+import random
+from fastapi import APIRouter, Depends, Response
 from redis.asyncio import Redis
-from app.api.deps import get_redis, validate_api_key
-from app.schemas import AddressRequest, AddressResponse, APIResponse, StandardizedAddress
+from app.api.deps import get_redis, get_api_key, is_api_key_allowed, require_allowed, check_rate_limit, require_within_rate
+from app.core.security import hash_key
+from app.schemas import AddressRequest, AddressResponse, APIResponse, ExtendedAddressResponse, StandardizedAddress
+from app.core.config import settings
 from app.services.input_processor import AddressInputProcessor
+from app.services.zip_index import load_zip_index
 from app.services.cache_service import AddressCacheService
-from app.services.validate_address_service import validate_address as validate_address_service
+from app.services.fuzzy_matcher import FuzzyMatcher
+from app.services.quota import set_caller
+from app.services import usage
+from app.services.usage import usage_recorder
+from app.services.address_store import get_address_store
+from app.services.degraded_mode import degraded_mode
+from app.services.validate_address_service import candidates_requested, validate_address as validate_address_service
 
 router = APIRouter()
-input_processor = AddressInputProcessor()
+input_processor = AddressInputProcessor(zip_index=load_zip_index(settings.ZIP_INDEX_PATH))
 
-@router.post("/validate-address", response_model=APIResponse[AddressResponse], dependencies=[Depends(validate_api_key)])
-async def validate_address(request: AddressRequest, redis: Redis = Depends(get_redis)):
+# Prebuilt response template for cache hits. The cached `standardized` fragment is
+# already serialized JSON, so a hit only needs the echoed input spliced in.
+# Field order mirrors APIResponse[AddressResponse].
+CACHE_HIT_PREFIX = b'{"success":true,"data":{"address_raw":'
+CACHE_HIT_INFIX = b',"standardized":'
+CACHE_HIT_SUFFIX = b',"valid":true},"error":null}'
+# Extended responses (ExtendedAddressResponse) append the cached details JSON
+CACHE_HIT_DETAILS_INFIX = b',"valid":true,"details":'
+CACHE_HIT_DETAILS_SUFFIX = b'},"error":null}'
+
+def address_etag(cache_key: str, fragment: str) -> str:
+    """
+    Deterministic per cache key and result. Weak, because the echoed address_raw
+    may differ between inputs that normalize to the same key.
+    """
+    digest = hashlib.blake2b(f"{cache_key}\0{fragment}".encode("utf-8"), digest_size=12).digest()
+    return f'W/"{base64.urlsafe_b64encode(digest).decode("ascii")}"'
+
+def cache_hit_response(
+    address_raw: str, fragment: str, cache_key: str | None = None, details: str | None = None
+) -> Response:
+    """
+    Builds a cache-hit response without rebuilding or re-validating any models.
+    Pass `details` (AddressDetails JSON, or "null") for an extended response.
+    """
+    parts = [
+        CACHE_HIT_PREFIX,
+        json.dumps(address_raw, ensure_ascii=False).encode("utf-8"),
+        CACHE_HIT_INFIX,
+        fragment.encode("utf-8"),
+    ]
+    if details is None:
+        parts.append(CACHE_HIT_SUFFIX)
+    else:
+        parts += [CACHE_HIT_DETAILS_INFIX, details.encode("utf-8"), CACHE_HIT_DETAILS_SUFFIX]
+    body = b"".join(parts)
+    headers = None
+    if cache_key is not None:
+        # Responses depend on the API key, so only the client (not shared caches) may store them
+        headers = {
+            "ETag": address_etag(cache_key, fragment if details is None else f"{fragment}\0{details}"),
+            "Cache-Control": f"private, max-age={settings.HTTP_CACHE_MAX_AGE}",
+        }
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _details_json(result: StandardizedAddress, extended: bool) -> str | None:
+    """
+    The details to cache beside the address. A lookup for a plain request asked
+    for one candidate, so its details would pass for a complete candidate list.
+    """
+    if not extended or result.details is None:
+        return None
+    return result.details.model_dump_json()
+
+async def _none():
+    return None
+
+# Documented with the extended shape: `details` is only present when the request sets `extended`
+@router.post(
+    "/validate-address",
+    response_model=APIResponse[AddressResponse],
+    responses={200: {"model": APIResponse[ExtendedAddressResponse], "description": "Validation result"}},
+)
+async def validate_address(request: AddressRequest, redis: Redis = Depends(get_redis), api_key: str = Depends(get_api_key)):
     # Step 1: Process Input (Sanitize, Validate, Normalize)
     processing_result = input_processor.process(request.address_raw)
+    key_hash = hash_key(api_key)
     
     if not processing_result.is_valid:
+        require_allowed(await is_api_key_allowed(redis, key_hash))
+        require_within_rate(await check_rate_limit(redis, key_hash))
+        usage_recorder.record(key_hash, usage.REQUESTS)
+        usage_recorder.record(key_hash, usage.INVALID)
         # Fail fast
         return APIResponse(
             success=True,
@@ -25,24 +106,76 @@ async def validate_address(request: AddressRequest, redis: Redis = Depends(get_r
             )
         )
 
-    # Step 2: Caching Layer
+    # Step 2: Auth + Caching Layer
+    # The allow-list check and the cache GETs are independent, so they share one
+    # round trip; the key's rate limit and the legacy-key migration (which writes)
+    # wait until the key is known good
     cache_service = AddressCacheService(redis)
-    cached_data = await cache_service.get_cached_address(processing_result.sanitized_input)
+    cache_key = cache_service.generate_cache_key(processing_result.sanitized_input)
+    allowed, cached_fragment, cached_details = await asyncio.gather(
+        is_api_key_allowed(redis, key_hash),
+        cache_service.get_cached_fragment(processing_result.sanitized_input, cache_key, migrate=False),
+        cache_service.get_cached_details(cache_key) if request.extended else _none(),
+    )
+    require_allowed(allowed)
+    require_within_rate(await check_rate_limit(redis, key_hash))
+    if cached_fragment is None:
+        cached_fragment = await cache_service.get_legacy_fragment(processing_result.sanitized_input, cache_key)
+    # Provider calls made for this request draw on this key's quota policy, and
+    # only ask for extra candidates when the response will show them
+    set_caller(key_hash)
+    candidates_requested.set(request.extended)
+    usage_recorder.record(key_hash, usage.REQUESTS)
     
-    if cached_data:
-        # Cache Hit
-        standardized_address = StandardizedAddress(**cached_data)
-        return APIResponse(
-            success=True,
-            data=AddressResponse(
-                address_raw=request.address_raw, 
-                valid=True, 
-                standardized=standardized_address
-            )
+    # Extended requests also need the details cached with the address; an entry
+    # cached without them is refreshed from the provider
+    if cached_fragment and (cached_details or not request.extended):
+        # Cache Hit: splice the stored JSON straight into the response body
+        usage_recorder.record(key_hash, usage.CACHE_HITS)
+        return cache_hit_response(request.address_raw, cached_fragment, cache_key, cached_details)
+
+    # Step 2b: Durable Store (L3) behind Redis (addresses only, no details)
+    address_store = get_address_store()
+    if address_store is not None and not request.extended:
+        stored_fragment = await address_store.get(
+            cache_key, cache_service.legacy_cache_keys(processing_result.sanitized_input)
         )
+        if stored_fragment:
+            # Repopulate Redis so the next lookup is an L2 hit
+            await cache_service.queue_address(processing_result.sanitized_input, stored_fragment)
+            usage_recorder.record(key_hash, usage.CACHE_HITS)
+            return cache_hit_response(request.address_raw, stored_fragment, cache_key)
 
-    # Step 3: External Validation (Smarty)
-    result = await validate_address_service(processing_result.sanitized_input, redis)
+    # Step 2c: Near-duplicate (typo'd) address already validated under another key
+    # (its index lives in Redis, so not while degraded)
+    fuzzy_matcher = FuzzyMatcher(redis) if settings.FUZZY_MATCH_ENABLED and not degraded_mode.active else None
+    if fuzzy_matcher is not None:
+        match = await fuzzy_matcher.lookup(processing_result.canonical_key)
+        details = None
+        if match is not None and request.extended:
+            details = await cache_service.get_cached_details(match[0])
+        if match is not None and (details or not request.extended):
+            _, fragment = match
+            # Alias it under this input's key so the next lookup is an exact hit
+            await cache_service.queue_address(processing_result.sanitized_input, fragment, details)
+            if random.random() < settings.FUZZY_VERIFY_SAMPLE_RATE:
+                async def repair(result):
+                    await cache_service.cache_address(
+                        processing_result.sanitized_input, result, _details_json(result, request.extended)
+                    )
+
+                fuzzy_matcher.verify_later(
+                    validate_address_service(processing_result.sanitized_input, redis), fragment, repair
+                )
+            usage_recorder.record(key_hash, usage.CACHE_HITS)
+            return cache_hit_response(request.address_raw, fragment, cache_key, details)
+
+    # Step 3: External Validation (Smarty); the provider records the calls it makes
+    try:
+        result = await validate_address_service(processing_result.sanitized_input, redis)
+    except Exception:
+        usage_recorder.record(key_hash, usage.ERRORS)
+        raise
     
     if result is None:
         return APIResponse(
@@ -50,10 +183,31 @@ async def validate_address(request: AddressRequest, redis: Redis = Depends(get_r
             data=AddressResponse(address_raw=request.address_raw, valid=False, standardized=None)
         )
 
-    # Step 4: Store in Cache
-    await cache_service.cache_address(processing_result.sanitized_input, result)
+    # Step 4: Queue the cache write (write-behind) and the durable write
+    # Serialized once: the same fragment is cached, stored and sent, so the ETag
+    # matches the one later cache hits will carry
+    fragment = result.model_dump_json()
+    details = _details_json(result, request.extended)
+    await cache_service.queue_address(processing_result.sanitized_input, fragment, details)
+    if address_store is not None:
+        address_store.enqueue(cache_key, fragment)
+    if fuzzy_matcher is not None:
+        await fuzzy_matcher.index(processing_result.canonical_key, cache_key, result)
     
-    return APIResponse(
-        success=True,
-        data=AddressResponse(address_raw=request.address_raw, valid=True, standardized=result)
+    return cache_hit_response(
+        request.address_raw, fragment, cache_key, (details or "null") if request.extended else None
     )
+
+@router.get(
+    "/validate-address",
+    response_model=APIResponse[AddressResponse],
+    responses={200: {"model": APIResponse[ExtendedAddressResponse], "description": "Validation result"}},
+)
+async def validate_address_query(
+    address_raw: str,
+    extended: bool = False,
+    redis: Redis = Depends(get_redis),
+    api_key: str = Depends(get_api_key),
+):
+    # Same lookup as the POST; being a GET, the response can be revalidated with If-None-Match
+    return await validate_address(AddressRequest(address_raw=address_raw, extended=extended), redis, api_key)
@@ -0,0 +1,42 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from redis.asyncio import Redis
+from app.api.deps import get_redis, validate_admin_key
+from app.core.profiler import profile
+from app.services.usage import usage_recorder, usage_report
+
+router = APIRouter()
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(10.0, gt=0, le=60),
+    interval_ms: float = Query(5.0, ge=1, le=100),
+    mode: Literal["cpu", "wall"] = "cpu",
+    api_key: str = Depends(validate_admin_key),
+):
+    """
+    Samples the worker that serves this request and returns collapsed stacks
+    (flamegraph.pl / speedscope input). Only this worker is profiled.
+    """
+    try:
+        stacks = await profile(seconds, interval_ms / 1000, mode)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(stacks)
+
+@router.get("/usage")
+async def usage(
+    days: int = Query(7, ge=1, le=90),
+    key_hash: str | None = None,
+    redis: Redis = Depends(get_redis),
+    api_key: str = Depends(validate_admin_key),
+):
+    """
+    Requests, cache hits, provider calls, invalid inputs and errors per key and day,
+    with the cache hit ratio. Counters reach Redis every USAGE_FLUSH_INTERVAL seconds,
+    so the current interval of other workers is not included yet.
+    """
+    # This worker's own pending counters are flushed first
+    await usage_recorder.flush(redis)
+    return await usage_report(redis, days, key_hash)
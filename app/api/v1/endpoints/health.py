@@ -1,7 +1,22 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from redis.asyncio import Redis
+from app.api.deps import get_redis
+from app.services.health_service import readiness_checker
 
 router = APIRouter()
 
 @router.get("")
 async def health_check():
     return {"status": "ok"}
+
+@router.get("/live")
+async def liveness():
+    """The process is up and its event loop is serving requests; no dependencies probed."""
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def readiness(redis: Redis = Depends(get_redis)):
+    """Dependency probes with latencies; 503 takes the pod out of rotation."""
+    report = await readiness_checker.check(redis)
+    return JSONResponse(status_code=503 if report["status"] == "not_ready" else 200, content=report)
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core.metrics import metrics
+
+router = APIRouter()
+
+@router.get("", response_class=PlainTextResponse)
+async def get_metrics():
+    # Per-worker values; scrape every worker (or aggregate) when running several
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import address, health
+from app.api.v1.endpoints import address, admin, health, metrics
 
 api_router = APIRouter()
 # Health check often lives at root or /health, not /api/v1/health, but requirements say "Move... logic to app/api/v1/endpoints/health.py".
@@ -7,4 +7,6 @@ api_router = APIRouter()
 # This implies /api/v1/health.
 # I'll stick to that.
 api_router.include_router(health.router, prefix="/health", tags=["health"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
 api_router.include_router(address.router, tags=["address"])
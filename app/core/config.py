@@ -2,12 +2,130 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6379/0"
+    # standalone | sentinel | cluster. Cache reads go to replicas when
+    # REDIS_READ_FROM_REPLICAS is set; writes, auth and quota always use the primary
+    REDIS_MODE: str = "standalone"
+    REDIS_REPLICA_URL: str = ""
+    REDIS_READ_FROM_REPLICAS: bool = True
+    REDIS_SENTINELS: list[str] = []
+    REDIS_SENTINEL_SERVICE: str = "mymaster"
+    # Requests per second and burst per API key (0 disables); keys may override both in
+    # the api_key_rate_limits hash. API_KEY_RATE_LOCAL_TOKENS > 1 lets each worker
+    # reserve that many requests per Redis call
+    API_KEY_RATE_LIMIT: float = 20
+    API_KEY_RATE_BURST: int = 40
+    API_KEY_RATE_LOCAL_TOKENS: int = 0
     SMARTY_AUTH_ID: str = ""
     SMARTY_AUTH_TOKEN: str = ""
     SMARTY_DAILY_LIMIT: int = 33
+    # Candidates requested per lookup; all are cached for extended responses
+    SMARTY_MAX_CANDIDATES: int = 5
+    # Share of SMARTY_DAILY_LIMIT that only interactive (non-bulk) callers may use;
+    # per-key limits, reserved shares and lanes are set with scripts/manage_keys.py
+    QUOTA_INTERACTIVE_RESERVE: float = 0.2
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     SMARTY_WEBSITE_DOMAIN: str = "http:localhost:8000"
+    # Cache key scheme: 1 = bare SHA-256 hex (legacy), 2 = "<prefix>:2:" + base64url
+    # blake2b-128, 3 = version 2 with a Redis Cluster hash tag. Misses fall back to the
+    # legacy versions and move hits to the current key
+    CACHE_KEY_VERSION: int = 3
+    CACHE_KEY_PREFIX: str = "a"
+    CACHE_KEY_LEGACY_VERSIONS: list[int] = [1]
+    # Write-behind: request-path cache writes are queued (up to MAX_ENTRIES keys, then
+    # dropped and counted) and pipelined to Redis INTERVAL_MS later; 0 writes inline
+    CACHE_WRITE_BEHIND_MAX_ENTRIES: int = 10000
+    CACHE_WRITE_BEHIND_INTERVAL_MS: float = 5.0
+    # Fuzzy near-duplicate lookup on exact-key misses: a single candidate in the same
+    # ZIP and house number scoring at least the threshold (0-1) counts as a hit. A sample
+    # of hits is re-validated in the background to measure the false-match rate.
+    # Off by default: a false match serves (and caches) another real address
+    FUZZY_MATCH_ENABLED: bool = False
+    FUZZY_MATCH_THRESHOLD: float = 0.9
+    FUZZY_VERIFY_SAMPLE_RATE: float = 0.01
+    # Path to a ZIP index built with scripts/build_zip_index.py; empty disables the offline check
+    ZIP_INDEX_PATH: str = ""
+    # Providers to route between, in preference order (a single entry disables routing)
+    ADDRESS_PROVIDERS: list[str] = ["smarty"]
+    # Offline mode: PROVIDER_RECORD appends every live answer to the corpus file;
+    # ADDRESS_PROVIDERS=["replay"] serves the corpus with synthetic latency instead
+    PROVIDER_RECORD: bool = False
+    PROVIDER_CORPUS_PATH: str = "provider_corpus.jsonl"
+    REPLAY_LATENCY_MS: float = 50.0
+    REPLAY_LATENCY_JITTER_MS: float = 25.0
+    PROVIDER_HEDGING_ENABLED: bool = False
+    # Bounds (seconds) on the p95-based delay before a hedged request is fired
+    PROVIDER_HEDGE_MIN_DELAY: float = 0.05
+    PROVIDER_HEDGE_MAX_DELAY: float = 1.0
+    # Provider call timeout (seconds): p95 latency x multiplier, clamped to [min, max]
+    PROVIDER_TIMEOUT: float = 5.0
+    PROVIDER_MIN_TIMEOUT: float = 0.5
+    PROVIDER_TIMEOUT_MULTIPLIER: float = 3.0
+    # Circuit breaker: open when failures/calls >= ratio within a window of at least min calls
+    CIRCUIT_FAILURE_RATIO: float = 0.5
+    CIRCUIT_MIN_CALLS: int = 5
+    CIRCUIT_WINDOW_SECONDS: int = 60
+    CIRCUIT_OPEN_SECONDS: int = 30
+    CIRCUIT_HALF_OPEN_PROBES: int = 1
+    # Client-side token buckets toward Smarty (0 disables a window); callers wait up to
+    # SMARTY_RATE_MAX_WAIT seconds for a token before failing
+    SMARTY_RATE_PER_SECOND: float = 10
+    SMARTY_RATE_PER_MINUTE: float = 300
+    SMARTY_RATE_MAX_WAIT: float = 1.0
+    # Concurrent misses are coalesced into one Smarty batch call of up to MAX_SIZE
+    # lookups (the API allows 100); the first waits at most MAX_WAIT_MS for company,
+    # less at low load (0 disables batching)
+    SMARTY_BATCH_MAX_SIZE: int = 100
+    SMARTY_BATCH_MAX_WAIT_MS: float = 5.0
+    # Durable address store (L3) behind Redis; empty disables it
+    DATABASE_URL: str = ""
+    DATABASE_POOL_MIN_SIZE: int = 1
+    DATABASE_POOL_MAX_SIZE: int = 10
+    ADDRESS_STORE_BATCH_SIZE: int = 500
+    ADDRESS_STORE_FLUSH_INTERVAL: float = 1.0
+    # Per-key usage counters are flushed to Redis (usage:<day> hashes) every interval
+    # seconds and kept for the retention period
+    USAGE_FLUSH_INTERVAL: float = 10.0
+    USAGE_RETENTION_DAYS: int = 90
+    # Production server (python -m app.server); WEB_CONCURRENCY=0 runs one worker per CPU
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    WEB_CONCURRENCY: int = 0
+    GRACEFUL_SHUTDOWN_TIMEOUT: int = 30
+    # A worker exiting within WORKER_STARTUP_SECONDS of its start failed to start up:
+    # its replacement waits 0.5s, doubling per failure in a row (up to 30s), and
+    # after WORKER_MAX_STARTUP_FAILURES in a row the server exits non-zero
+    WORKER_STARTUP_SECONDS: float = 10.0
+    WORKER_MAX_STARTUP_FAILURES: int = 5
+    # Readiness probe: results are reused for HEALTH_CACHE_SECONDS; a pod is not ready
+    # when Redis is unreachable or slower than, or the event loop lags more than, the limits
+    HEALTH_CACHE_SECONDS: float = 2.0
+    HEALTH_PROBE_TIMEOUT: float = 1.0
+    HEALTH_MAX_REDIS_LATENCY: float = 0.25
+    HEALTH_MAX_LOOP_LAG: float = 0.2
+    # Degraded mode: after DEGRADED_FAILURE_THRESHOLD failed Redis pings (one every
+    # DEGRADED_CHECK_INTERVAL seconds) a worker serves from an in-process cache of its
+    # last DEGRADED_CACHE_SIZE entries, checks keys against its last allow-list snapshot
+    # and may spend DEGRADED_QUOTA_SHARE of the provider budget left at that snapshot
+    # (rounded down; when that is nothing, one worker holding a lease may still make one call)
+    DEGRADED_MODE_ENABLED: bool = True
+    DEGRADED_CHECK_INTERVAL: float = 2.0
+    DEGRADED_FAILURE_THRESHOLD: int = 2
+    DEGRADED_CACHE_SIZE: int = 10000
+    DEGRADED_QUOTA_SHARE: float = 0.02
+    # HTTP: responses of at least COMPRESSION_MINIMUM_SIZE bytes are compressed (zstd
+    # when the zstandard package is installed, else gzip); validated addresses carry
+    # an ETag and may be cached by clients for HTTP_CACHE_MAX_AGE seconds
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    HTTP_CACHE_MAX_AGE: int = 86400
+    # Event-loop monitor: samples lag every interval and logs the stack of any callback
+    # holding the loop longer than the threshold (seconds)
+    LOOP_MONITOR_ENABLED: bool = False
+    LOOP_MONITOR_INTERVAL: float = 0.1
+    LOOP_BLOCK_THRESHOLD: float = 0.1
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -1,29 +1,72 @@
+import asyncio
 from redis.asyncio import Redis
 from fastapi import Security, HTTPException, Depends
 from fastapi.security import APIKeyHeader
-from app.core.config import settings
+from app.core.exceptions import RateLimitExceededError
+from app.core.redis_client import get_redis_clients
 from app.core.security import hash_key
+from app.services.degraded_mode import degraded_mode
+from app.services.rate_limiter import key_rate_limiter
 
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
+ALLOWED_KEYS_SET = "allowed_api_key_hashes"
+# Subset of the allowed keys that may use the /v1/admin endpoints
+ADMIN_KEYS_SET = "admin_api_key_hashes"
+
 async def get_redis() -> Redis:
-    redis = Redis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
-    try:
-        yield redis
-    finally:
-        await redis.close()
+    """The worker's primary client; cache reads go through reader_for(redis)."""
+    yield get_redis_clients().primary
 
-async def validate_api_key(
-    key: str = Security(api_key_header),
-    redis: Redis = Depends(get_redis)
-) -> str:
+async def get_api_key(key: str = Security(api_key_header)) -> str:
+    """Extracts the API key header; the allow-list check is left to the caller."""
     if key is None:
         raise HTTPException(status_code=403, detail="Missing API Key")
-    
-    hashed = hash_key(key)
-    exists = await redis.sismember("allowed_api_key_hashes", hashed)
-    
-    if not exists:
+    return key
+
+async def is_api_key_allowed(redis: Redis, key_hash: str) -> bool:
+    if degraded_mode.active:
+        # Redis is down: trust the worker's last snapshot of the allow list
+        return degraded_mode.is_allowed(key_hash)
+    return bool(await redis.sismember(ALLOWED_KEYS_SET, key_hash))
+
+async def is_admin_key(redis: Redis, key_hash: str) -> bool:
+    if degraded_mode.active:
+        return degraded_mode.is_admin(key_hash)
+    return bool(await redis.sismember(ADMIN_KEYS_SET, key_hash))
+
+def require_allowed(allowed: bool):
+    if not allowed:
         raise HTTPException(status_code=403, detail="Invalid API Key")
-    
+
+async def check_rate_limit(redis: Redis, key_hash: str) -> float:
+    """Seconds until the key may retry, or 0; see require_within_rate."""
+    return await key_rate_limiter.check(redis, key_hash)
+
+def require_within_rate(retry_after: float):
+    if retry_after > 0:
+        raise RateLimitExceededError(retry_after)
+
+async def validate_api_key(
+    key: str = Depends(get_api_key),
+    redis: Redis = Depends(get_redis)
+) -> str:
+    key_hash = hash_key(key)
+    require_allowed(await is_api_key_allowed(redis, key_hash))
+    # Only after auth: the limiter keeps per-key state, which unknown keys must not grow
+    require_within_rate(await check_rate_limit(redis, key_hash))
+    return key
+
+async def validate_admin_key(
+    key: str = Depends(get_api_key),
+    redis: Redis = Depends(get_redis)
+) -> str:
+    key_hash = hash_key(key)
+    allowed, admin = await asyncio.gather(
+        is_api_key_allowed(redis, key_hash),
+        is_admin_key(redis, key_hash),
+    )
+    require_allowed(allowed)
+    if not admin:
+        raise HTTPException(status_code=403, detail="Admin API Key required")
     return key
@@ -1,4 +1,9 @@
+import math
+
 class AppException(Exception):
+    # Extra response headers (e.g. Retry-After)
+    headers: dict[str, str] | None = None
+
     def __init__(self, message: str, status_code: int, error_code: str):
         self.message = message
         self.status_code = status_code
@@ -20,3 +25,13 @@ class ProviderTimeoutError(AppException):
 class InputValidationError(AppException):
     def __init__(self, message: str = "Invalid input"):
         super().__init__(message, 400, "validation_error")
+
+class ProviderRateLimitedError(AppException):
+    def __init__(self, message: str = "Provider rate limit reached"):
+        super().__init__(message, 429, "provider_rate_limited")
+
+class RateLimitExceededError(AppException):
+    def __init__(self, retry_after: float, message: str = "Rate limit exceeded for this API key"):
+        super().__init__(message, 429, "rate_limited")
+        self.retry_after = retry_after
+        self.headers = {"Retry-After": str(max(1, math.ceil(retry_after)))}
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class LoopMonitor:
+    """
+    Measures how long synchronous work holds the event loop (per worker).
+
+    A task sleeps for `interval` and records how late it woke up as the
+    event_loop_lag_seconds gauge. A watchdog thread watches the task's heartbeat:
+    when the loop has not come back for longer than `threshold`, it logs the loop
+    thread's current stack (the callback that is blocking it) once per stall.
+    """
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.1):
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self._heartbeat = time.monotonic()
+        self._loop_thread: int | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+        logger.info("Event loop monitor started (interval=%ss, threshold=%ss)", self.interval, self.threshold)
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self._heartbeat = time.monotonic()
+            self.lag = max(0.0, loop.time() - expected)
+            self.max_lag = max(self.max_lag, self.lag)
+            metrics.set_gauge("event_loop_lag_seconds", self.lag)
+            metrics.set_gauge("event_loop_lag_max_seconds", self.max_lag)
+
+    def _watch(self):
+        reported = None
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled <= self.threshold or heartbeat == reported:
+                continue
+            # One report per stall: the heartbeat only moves once the loop is back
+            reported = heartbeat
+            metrics.increment("event_loop_blocked_total")
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<no frame>"
+            logger.warning("Event loop blocked for more than %.3fs; loop thread stack:\n%s", stalled, stack)
+
+loop_monitor: LoopMonitor | None = None
+
+def get_loop_monitor() -> LoopMonitor | None:
+    return loop_monitor
+
+def start_loop_monitor(interval: float, threshold: float):
+    global loop_monitor
+    loop_monitor = LoopMonitor(interval, threshold)
+    loop_monitor.start()
+
+async def stop_loop_monitor():
+    global loop_monitor
+    if loop_monitor is not None:
+        await loop_monitor.stop()
+        loop_monitor = None
@@ -0,0 +1,64 @@
+import math
+import threading
+from collections import defaultdict
+
+LabelSet = tuple[tuple[str, str], ...]
+
+def format_value(value: float) -> str:
+    """Whole numbers without a decimal point, everything else at full precision."""
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+class Metrics:
+    """
+    Minimal in-process metrics registry (per worker).
+    Counters only go up, gauges hold the last value set; both are rendered in the
+    Prometheus text exposition format by the /v1/metrics endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: defaultdict[str, defaultdict[LabelSet, float]] = defaultdict(lambda: defaultdict(float))
+        self._gauges: defaultdict[str, dict[LabelSet, float]] = defaultdict(dict)
+
+    @staticmethod
+    def _labels(labels: dict[str, str]) -> LabelSet:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def increment(self, name: str, value: float = 1.0, **labels: str):
+        with self._lock:
+            self._counters[name][self._labels(labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels: str):
+        with self._lock:
+            self._gauges[name][self._labels(labels)] = value
+
+    def get(self, name: str, **labels: str) -> float:
+        key = self._labels(labels)
+        with self._lock:
+            if name in self._counters:
+                return self._counters[name].get(key, 0.0)
+            return self._gauges.get(name, {}).get(key, 0.0)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for kind, series in (("counter", self._counters), ("gauge", self._gauges)):
+                for name in sorted(series):
+                    lines.append(f"# TYPE {name} {kind}")
+                    for labels, value in sorted(series[name].items()):
+                        label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+                        value_str = format_value(value)
+                        lines.append(f"{name}{{{label_str}}} {value_str}" if label_str else f"{name} {value_str}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
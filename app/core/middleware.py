@@ -0,0 +1,204 @@
+import importlib.util
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.metrics import metrics
+
+ZSTD_AVAILABLE = importlib.util.find_spec("zstandard") is not None
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    """Codings the client accepts (q > 0), lowercased."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding and q > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+# Encoders allocate their compression state on the first compressed chunk, so
+# responses under the minimum size cost nothing
+
+class GzipEncoder:
+    content_encoding = "gzip"
+
+    def __init__(self, level: int = 6):
+        self.level = level
+        self._compressor = None
+
+    def compress(self, body: bytes, *, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        if more_body:
+            return self._compressor.compress(body) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return self._compressor.compress(body) + self._compressor.flush()
+
+class ZstdEncoder:
+    content_encoding = "zstd"
+
+    def __init__(self, level: int = 3):
+        self.level = level
+        self._compressor = None
+
+    def compress(self, body: bytes, *, more_body: bool) -> bytes:
+        import zstandard
+
+        if self._compressor is None:
+            if not more_body:
+                # One-shot frames record the content size, which some decoders require
+                return zstandard.ZstdCompressor(level=self.level).compress(body)
+            self._compressor = zstandard.ZstdCompressor(level=self.level).compressobj()
+        if more_body:
+            return self._compressor.compress(body) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._compressor.compress(body) + self._compressor.flush()
+
+class CompressionResponder:
+    """
+    Wraps one response: holds back http.response.start until the first body
+    chunk shows whether the response reaches `minimum_size`, then sends it with
+    Content-Encoding, Content-Length and Vary adjusted. With no encoder the body
+    goes out as-is, but Vary: Accept-Encoding is still set on large responses.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int, encoder: GzipEncoder | ZstdEncoder | None = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoder = encoder
+        self.send: Send | None = None
+        self.start: Message | None = None
+        self.started = False
+        # Already encoded, or a partial (206) response: forwarded untouched
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            self.passthrough = message["status"] == 206 or "content-encoding" in Headers(raw=message["headers"])
+            if self.passthrough:
+                await self.send(message)
+            return
+        if self.start is None or self.passthrough:
+            await self.send(message)
+            return
+        if message["type"] != "http.response.body":
+            # Trailers, pathsend: nothing to encode
+            if not self.started:
+                self.started = True
+                await self.send(self.start)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.started:
+            if self.encoder is not None:
+                message = {**message, "body": self.encoder.compress(body, more_body=more_body)}
+            await self.send(message)
+            return
+
+        self.started = True
+        if len(body) >= self.minimum_size or more_body:
+            headers = MutableHeaders(raw=self.start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if self.encoder is not None:
+                body = self.encoder.compress(body, more_body=more_body)
+                headers["Content-Encoding"] = self.encoder.content_encoding
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(body))
+                message = {**message, "body": body}
+        await self.send(self.start)
+        await self.send(message)
+
+class CompressionMiddleware:
+    """
+    Compresses responses of at least `minimum_size` bytes with zstd (when the
+    zstandard package is installed and the client accepts it) or gzip. Smaller
+    responses go out as-is: below about a kilobyte the CPU cost outweighs the
+    bytes saved (see scripts/benchmark_compression.py).
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, zstd_level: int = 3, zstd: bool = True):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+        self.zstd = zstd and ZSTD_AVAILABLE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        encoder = None
+        if self.zstd and "zstd" in accepted:
+            encoder = ZstdEncoder(self.zstd_level)
+        elif "gzip" in accepted:
+            encoder = GzipEncoder(self.gzip_level)
+        await CompressionResponder(self.app, self.minimum_size, encoder)(scope, receive, send)
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison (RFC 9110 13.1.2): W/"x" and "x" match each other."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+class ConditionalRequestMiddleware:
+    """
+    Answers 304 Not Modified, without a body, when a successful GET or HEAD
+    response carries an ETag that the request's If-None-Match already holds.
+    Other methods pass through untouched (RFC 9110 13.1.2), so a POST lookup
+    always gets its body; clients revalidate through GET /v1/validate-address.
+    """
+
+    # Headers a 304 keeps from the 200 it replaces
+    KEPT_HEADERS = {"etag", "cache-control", "vary", "expires", "date"}
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if not if_none_match or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        not_modified = False
+
+        async def send_conditional(message: Message):
+            nonlocal not_modified
+            if message["type"] == "http.response.start":
+                etag = Headers(raw=message["headers"]).get("etag")
+                if message["status"] == 200 and etag and etag_matches(if_none_match, etag):
+                    not_modified = True
+                    headers = MutableHeaders(raw=[
+                        (name, value) for name, value in message["headers"]
+                        if name.decode("latin-1").lower() in self.KEPT_HEADERS
+                    ])
+                    metrics.increment("http_not_modified_total")
+                    await send({"type": "http.response.start", "status": 304, "headers": headers.raw})
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+            elif not_modified:
+                # The 304 has already been sent; drop the original body
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_conditional)
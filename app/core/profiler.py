@@ -0,0 +1,139 @@
+import asyncio
+import os
+import sys
+import threading
+from collections import Counter
+from types import FrameType
+
+# Innermost (module, function) of threads that are parked, not working. A thread
+# blocked in C code shows the Python frame that made the call: an idle executor
+# worker sits in _worker on SimpleQueue.get, and a uvloop loop thread sits in
+# whatever called run_until_complete/run_forever (asyncio.run, uvicorn's Runner)
+IDLE_LEAVES = {
+    ("selectors", "select"),
+    ("threading", "wait"),
+    ("threading", "_wait_for_tstate_lock"),
+    ("queue", "get"),
+    ("concurrent.futures.thread", "_worker"),
+    ("asyncio.runners", "run"),
+    ("uvloop", "run"),
+}
+
+def is_idle(frame: FrameType) -> bool:
+    return (frame.f_globals.get("__name__"), frame.f_code.co_name) in IDLE_LEAVES
+
+def frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+def thread_stack(frame: FrameType) -> list[FrameType]:
+    """Outermost frame first."""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+def task_stack(task: asyncio.Task) -> list[FrameType]:
+    """The chain of suspended coroutine frames a task is awaiting, outermost first."""
+    frames = []
+    coro = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is not None:
+            frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+class SamplingProfiler:
+    """
+    Statistical profiler for a running worker. A background thread snapshots every
+    thread's stack each `interval` seconds and counts identical stacks; the result is
+    the collapsed-stack format read by flamegraph.pl and speedscope.
+
+    cpu:  only threads doing work (the event loop thread running a callback, and
+          asyncio.to_thread workers such as the Smarty SDK call)
+    wall: additionally every task suspended on the loop, through its await chain,
+          so time spent waiting on Redis or the provider is attributed to
+          AddressCacheService / SmartyValidator frames
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.005,
+        mode: str = "cpu",
+        loop: asyncio.AbstractEventLoop | None = None,
+        exclude: asyncio.Task | None = None,
+    ):
+        if mode not in ("cpu", "wall"):
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.interval = interval
+        self.mode = mode
+        self.loop = loop
+        self.exclude = exclude
+        self.samples: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if is_idle(frame):
+                    continue
+                self._add([f"thread:{names.get(ident, ident)}"], thread_stack(frame))
+            if self.mode == "wall" and self.loop is not None:
+                self._sample_tasks()
+
+    def _sample_tasks(self):
+        try:
+            tasks = asyncio.all_tasks(self.loop)
+        except RuntimeError:
+            # The task set changed under us; skip this tick
+            return
+        for task in tasks:
+            if task is self.exclude:
+                continue
+            frames = task_stack(task)
+            if frames:
+                self._add(["task"], frames)
+
+    def _add(self, roots: list[str], frames: list[FrameType]):
+        self.samples[";".join(roots + [frame_label(frame) for frame in frames])] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+_profile_lock = threading.Lock()
+
+async def profile(seconds: float, interval: float = 0.005, mode: str = "cpu") -> str:
+    """Profiles this worker for `seconds` and returns collapsed stacks; one run at a time."""
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("A profile is already running on this worker")
+    try:
+        profiler = SamplingProfiler(interval, mode, asyncio.get_running_loop(), exclude=asyncio.current_task())
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            # Joining takes at most one interval
+            await asyncio.to_thread(profiler.stop)
+        return profiler.collapsed()
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,110 @@
+import hashlib
+import os
+from functools import lru_cache
+from typing import NamedTuple
+from redis.asyncio import Redis
+from redis.asyncio.cluster import RedisCluster
+from redis.asyncio.connection import parse_url
+from redis.asyncio.sentinel import Sentinel
+from redis.cluster import LoadBalancingStrategy
+from redis.exceptions import NoScriptError
+from app.core.config import settings
+
+class RedisClients(NamedTuple):
+    # Writes, Lua scripts and anything that must read its own writes (auth, quota, circuit)
+    primary: Redis
+    # Cache reads; the primary itself when no replica is configured
+    reader: Redis
+
+def _parse_sentinels(hosts: list[str]) -> list[tuple[str, int]]:
+    sentinels = []
+    for host in hosts:
+        name, _, port = host.rpartition(":")
+        sentinels.append((name, int(port)))
+    return sentinels
+
+def create_redis_clients() -> RedisClients:
+    """
+    Builds the clients for REDIS_MODE:
+    standalone: REDIS_URL, plus REDIS_REPLICA_URL for reads when set
+    sentinel:   primary and replica discovered through REDIS_SENTINELS; REDIS_URL
+                supplies the db and credentials
+    cluster:    two RedisCluster clients seeded from REDIS_URL, both routing by slot:
+                the primary only talks to shard primaries, the reader spreads
+                reads over the replicas
+    """
+    options = {"encoding": "utf-8", "decode_responses": True}
+    read_replicas = settings.REDIS_READ_FROM_REPLICAS
+
+    if settings.REDIS_MODE == "cluster":
+        primary = RedisCluster.from_url(settings.REDIS_URL, **options)
+        reader = primary
+        if read_replicas:
+            reader = RedisCluster.from_url(
+                settings.REDIS_URL, load_balancing_strategy=LoadBalancingStrategy.ROUND_ROBIN_REPLICAS, **options
+            )
+        return RedisClients(primary, reader)
+
+    if settings.REDIS_MODE == "sentinel":
+        url_options = {k: v for k, v in parse_url(settings.REDIS_URL).items() if k not in ("host", "port")}
+        sentinel = Sentinel(_parse_sentinels(settings.REDIS_SENTINELS), **url_options, **options)
+        primary = sentinel.master_for(settings.REDIS_SENTINEL_SERVICE)
+        reader = sentinel.slave_for(settings.REDIS_SENTINEL_SERVICE) if read_replicas else primary
+        return RedisClients(primary, reader)
+
+    if settings.REDIS_MODE != "standalone":
+        raise ValueError(f"Unknown REDIS_MODE: {settings.REDIS_MODE}")
+
+    primary = Redis.from_url(settings.REDIS_URL, **options)
+    reader = primary
+    if settings.REDIS_REPLICA_URL and read_replicas:
+        reader = Redis.from_url(settings.REDIS_REPLICA_URL, **options)
+    return RedisClients(primary, reader)
+
+# One set of clients (and connection pools) per worker: a client per request
+# would pay a fresh connection handshake on every call
+_clients: RedisClients | None = None
+
+def get_redis_clients() -> RedisClients:
+    global _clients
+    if _clients is None:
+        _clients = create_redis_clients()
+    return _clients
+
+def reader_for(redis: Redis) -> Redis:
+    """The read-replica client paired with `redis`, or `redis` itself when there is none."""
+    if _clients is not None and redis is _clients.primary:
+        return _clients.reader
+    return redis
+
+async def close_redis_clients():
+    global _clients
+    if _clients is not None:
+        clients, _clients = _clients, None
+        if clients.reader is not clients.primary:
+            await clients.reader.aclose()
+        await clients.primary.aclose()
+
+@lru_cache(maxsize=None)
+def script_sha(script: str) -> str:
+    return hashlib.sha1(script.encode("utf-8")).hexdigest()
+
+async def run_script(redis: Redis, script: str, keys: list[str], args: list) -> object:
+    """
+    Runs a Lua script by its SHA (EVALSHA), so the body is not resent on every
+    call; a node that has not seen it yet (new, restarted or failed over) gets it
+    loaded once, the way redis-py's register_script does.
+    """
+    try:
+        return await redis.evalsha(script_sha(script), len(keys), *keys, *args)
+    except NoScriptError:
+        await redis.script_load(script)
+        return await redis.evalsha(script_sha(script), len(keys), *keys, *args)
+
+def _reset_redis_clients():
+    # Connections inherited across fork would be shared between workers
+    global _clients
+    _clients = None
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_redis_clients)
@@ -5,7 +5,18 @@ from contextlib import asynccontextmanager
 from app.schemas import APIResponse, ErrorDetail
 from app.core.exceptions import AppException
 from app.core.logging import setup_logging
+from app.core.config import settings
+from app.core.loop_monitor import start_loop_monitor, stop_loop_monitor
+from app.core.redis_client import close_redis_clients
+from app.core.middleware import CompressionMiddleware, ConditionalRequestMiddleware
+from app.services.address_store import init_address_store, close_address_store
+from app.services.usage import usage_recorder
+from app.services.cache_writer import close_cache_writers
+from app.services.degraded_mode import degraded_mode
+from app.services.validate_address_service import close_lookup_batchers, preload_provider
 from app.api.v1.router import api_router
+from app.api.v1.endpoints import health
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,7 +24,30 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     setup_logging()
+    if settings.LOOP_MONITOR_ENABLED:
+        start_loop_monitor(settings.LOOP_MONITOR_INTERVAL, settings.LOOP_BLOCK_THRESHOLD)
+    # Load the provider SDK and parser model off the event loop, so the worker
+    # starts serving cache hits while the first miss no longer pays for the import
+    warm_up = asyncio.create_task(asyncio.to_thread(preload_provider))
+    warm_up.add_done_callback(_log_warm_up_failure)
+    await init_address_store()
+    usage_recorder.start()
+    if settings.DEGRADED_MODE_ENABLED:
+        degraded_mode.start()
     yield
+    await degraded_mode.close()
+    await close_cache_writers()
+    close_lookup_batchers()
+    await usage_recorder.close()
+    await close_address_store()
+    if not warm_up.done():
+        warm_up.cancel()
+    await stop_loop_monitor()
+    await close_redis_clients()
+
+def _log_warm_up_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Provider warm-up failed: %s", task.exception())
 
 app = FastAPI(
     title="Address Validation Service",
@@ -22,6 +56,16 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Outermost last: a 304 is decided before anything is compressed
+app.add_middleware(ConditionalRequestMiddleware)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+    )
+
 @app.exception_handler(AppException)
 async def app_exception_handler(request: Request, exc: AppException):
     return JSONResponse(
@@ -29,7 +73,8 @@ async def app_exception_handler(request: Request, exc: AppException):
         content=APIResponse[None](
             success=False,
             error=ErrorDetail(code=exc.status_code, message=exc.message, type=exc.error_code)
-        ).model_dump()
+        ).model_dump(),
+        headers=exc.headers,
     )
 
 @app.exception_handler(RequestValidationError)
@@ -54,3 +99,5 @@ async def general_exception_handler(request: Request, exc: Exception):
     )
 
 app.include_router(api_router, prefix="/v1")
+# Unversioned probes for load balancers and orchestrators
+app.include_router(health.router, prefix="/health", tags=["health"])
@@ -1,2 +1,10 @@
-from .address import AddressRequest, AddressResponse, StandardizedAddress
+from .address import (
+    AddressCandidate,
+    AddressDetails,
+    AddressMetadata,
+    AddressRequest,
+    AddressResponse,
+    ExtendedAddressResponse,
+    StandardizedAddress,
+)
 from .common import APIResponse, ErrorDetail
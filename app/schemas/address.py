@@ -1,15 +1,47 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class AddressRequest(BaseModel):
     address_raw: str
+    # Adds `details` (candidates, geocode, DPV and RDI data) to the response
+    extended: bool = False
+
+class AddressMetadata(BaseModel):
+    latitude: float | None = None
+    longitude: float | None = None
+    # Geocode precision, e.g. "Zip9" or "Rooftop"
+    precision: str | None = None
+    # Residential Delivery Indicator: "Residential" or "Commercial"
+    rdi: str | None = None
+    dpv_match_code: str | None = None
+    dpv_footnotes: str | None = None
+    footnotes: str | None = None
+    # The provider changed the input to produce this address
+    is_corrected: bool = False
+
+class AddressCandidate(BaseModel):
+    standardized: "StandardizedAddress"
+    metadata: AddressMetadata
+
+class AddressDetails(BaseModel):
+    # Metadata of the first candidate, which is the standardized address
+    metadata: AddressMetadata
+    candidates: list[AddressCandidate]
 
 class StandardizedAddress(BaseModel):
     street: str
     city: str
     state: str
     zip_code: str
+    # Enrichment from the same provider call; cached beside the address and only
+    # sent to extended requests, so it never appears in the serialized address
+    details: AddressDetails | None = Field(default=None, exclude=True)
+
+AddressCandidate.model_rebuild()
 
 class AddressResponse(BaseModel):
     address_raw: str
     standardized: StandardizedAddress | None = None
     valid: bool = False
+
+class ExtendedAddressResponse(AddressResponse):
+    details: AddressDetails | None = None
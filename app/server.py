@@ -0,0 +1,192 @@
+"""
+Production entry point: python -m app.server
+
+Imports and warms the application once, binds the listening socket, then forks
+one uvicorn worker per CPU. Workers share the preloaded pages copy-on-write and
+accept from the same socket; per-process resources (Redis pool, Smarty client)
+are reset after fork so each worker opens its own. SIGTERM/SIGINT drain every
+worker gracefully; workers that die unexpectedly are replaced, with a growing
+delay while they keep dying during startup, and the server gives up (exit code 1)
+when they never come up.
+"""
+import argparse
+import gc
+import importlib.util
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+import uvicorn
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def is_available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+def worker_count(requested: int) -> int:
+    return requested if requested > 0 else (os.cpu_count() or 1)
+
+def preload():
+    """Imports the app and warms heavy dependencies before forking."""
+    from app.main import app
+    from app.services.validate_address_service import preload_provider
+
+    preload_provider()
+    # Keep preloaded objects out of the collector so workers don't dirty their pages
+    gc.collect()
+    gc.freeze()
+    return app
+
+def build_config(app, host: str, port: int) -> uvicorn.Config:
+    return uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        loop="uvloop" if is_available("uvloop") else "asyncio",
+        http="httptools" if is_available("httptools") else "h11",
+        lifespan="on",
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_TIMEOUT,
+    )
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+class Supervisor:
+    # Delay before replacing a worker after the first startup failure, doubled per
+    # further failure in a row
+    RESTART_BACKOFF_BASE = 0.5
+    RESTART_BACKOFF_MAX = 30.0
+
+    def __init__(self, config: uvicorn.Config, sock: socket.socket, workers: int):
+        self.config = config
+        self.sock = sock
+        self.workers = workers
+        # pid -> time.monotonic() at spawn
+        self.children: dict[int, float] = {}
+        self.should_exit = False
+        self.exit_code = 0
+        # Workers in a row that exited before WORKER_STARTUP_SECONDS
+        self.startup_failures = 0
+        # When each pending replacement is due (time.monotonic())
+        self.respawn_at: list[float] = []
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            # Worker: uvicorn installs its own SIGINT/SIGTERM handlers for graceful shutdown
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                uvicorn.Server(self.config).run(sockets=[self.sock])
+            except BaseException:
+                logger.exception("Worker %d crashed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        logger.info("Started worker %d", pid)
+
+    def handle_exit(self, signum, frame):
+        self.should_exit = True
+
+    def reap(self) -> list[tuple[int, float]]:
+        """Collects exited workers; returns (pid, seconds it ran) for each."""
+        exited = []
+        while self.children:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            started = self.children.pop(pid, None)
+            if started is not None:
+                exited.append((pid, time.monotonic() - started))
+        return exited
+
+    def restart_delay(self) -> float:
+        if self.startup_failures == 0:
+            return 0.0
+        return min(self.RESTART_BACKOFF_MAX, self.RESTART_BACKOFF_BASE * 2 ** (self.startup_failures - 1))
+
+    def worker_exited(self, pid: int, uptime: float):
+        """Schedules the replacement of a worker that exited on its own, or gives up."""
+        if uptime < settings.WORKER_STARTUP_SECONDS:
+            self.startup_failures += 1
+            if self.startup_failures >= settings.WORKER_MAX_STARTUP_FAILURES:
+                logger.error("%d workers in a row exited during startup; shutting down", self.startup_failures)
+                self.should_exit = True
+                self.exit_code = 1
+                return
+        else:
+            self.startup_failures = 0
+        delay = self.restart_delay()
+        logger.warning("Worker %d exited unexpectedly after %.1fs; replacing it in %.1fs", pid, uptime, delay)
+        self.respawn_at.append(time.monotonic() + delay)
+
+    def run(self) -> int:
+        """Runs until a signal (exit code 0) or until workers keep failing to start (1)."""
+        signal.signal(signal.SIGINT, self.handle_exit)
+        signal.signal(signal.SIGTERM, self.handle_exit)
+        for _ in range(self.workers):
+            self.spawn()
+
+        while not self.should_exit:
+            for pid, uptime in self.reap():
+                self.worker_exited(pid, uptime)
+            now = time.monotonic()
+            due = [at for at in self.respawn_at if at <= now]
+            if due and not self.should_exit:
+                self.respawn_at = [at for at in self.respawn_at if at > now]
+                for _ in due:
+                    self.spawn()
+            time.sleep(0.2)
+
+        self.shutdown()
+        return self.exit_code
+
+    def shutdown(self):
+        logger.info("Shutting down %d workers", len(self.children))
+        for pid in self.children:
+            os.kill(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + settings.GRACEFUL_SHUTDOWN_TIMEOUT + 5
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+
+        for pid in self.children:
+            logger.warning("Worker %d did not stop in time; killing it", pid)
+            os.kill(pid, signal.SIGKILL)
+        while self.children:
+            pid, _ = os.waitpid(-1, 0)
+            self.children.pop(pid, None)
+        self.sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Address Validation Service in production mode")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.WEB_CONCURRENCY, help="0 = one per CPU")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL, format=settings.LOG_FORMAT)
+    app = preload()
+    config = build_config(app, args.host, args.port)
+    workers = worker_count(args.workers)
+    logger.info("Serving on %s:%d with %d workers (loop=%s, http=%s)", args.host, args.port, workers, config.loop, config.http)
+
+    if workers == 1:
+        uvicorn.Server(config).run()
+        return
+
+    sys.exit(Supervisor(config, bind_socket(args.host, args.port), workers).run())
+
+if __name__ == "__main__":
+    main()
@@ -30,7 +30,3 @@ def parse_with_leading_zip_handling(raw_input: str):
         parsed_data['ZipCode'] = pre_extracted_zip
 
     return parsed_data
-
-# Test
-print(parse_with_leading_zip_handling("07055 130 jackson st"))
-# Output: OrderedDict([('AddressNumber', '130'), ('StreetName', 'jackson'), ('StreetNamePostType', 'st'), ('ZipCode', '07055')])
\ No newline at end of file
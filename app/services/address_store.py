@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Sequence
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    import asyncpg
+
+logger = logging.getLogger(__name__)
+
+class AddressStore:
+    """
+    Durable L3 tier behind Redis: cache key -> standardized address JSON.
+    Reads go straight to Postgres; writes are buffered in-process and flushed
+    as one multi-row upsert per batch, so the request path never waits on them.
+    """
+
+    # JSON (not JSONB) keeps the stored text verbatim, ready to splice into responses
+    CREATE_TABLE_SQL = """
+        CREATE TABLE IF NOT EXISTS validated_addresses (
+            cache_key TEXT PRIMARY KEY,
+            standardized JSON NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """
+    SELECT_SQL = "SELECT standardized FROM validated_addresses WHERE cache_key = $1"
+    # First match in the given order (newest key version first)
+    SELECT_ANY_SQL = """
+        SELECT standardized FROM validated_addresses
+        WHERE cache_key = ANY($1::text[])
+        ORDER BY array_position($1::text[], cache_key)
+        LIMIT 1
+    """
+    UPSERT_SQL = """
+        INSERT INTO validated_addresses (cache_key, standardized)
+        SELECT * FROM unnest($1::text[], $2::json[])
+        ON CONFLICT (cache_key) DO UPDATE
+        SET standardized = EXCLUDED.standardized, updated_at = now()
+    """
+
+    def __init__(self, pool: "asyncpg.Pool", batch_size: int = 500, flush_interval: float = 1.0):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Keyed by cache key: a batch may not upsert the same row twice
+        self._pending: dict[str, str] = {}
+        self._flush_task: asyncio.Task | None = None
+        self._flush_lock = asyncio.Lock()
+        self._background: set[asyncio.Task] = set()
+
+    @classmethod
+    async def connect(cls, dsn: str, **kwargs) -> "AddressStore":
+        # Imported here so deployments without DATABASE_URL never load the driver
+        import asyncpg
+
+        pool = await asyncpg.create_pool(
+            dsn,
+            min_size=settings.DATABASE_POOL_MIN_SIZE,
+            max_size=settings.DATABASE_POOL_MAX_SIZE,
+        )
+        async with pool.acquire() as conn:
+            await conn.execute(cls.CREATE_TABLE_SQL)
+        return cls(pool, **kwargs)
+
+    def start(self):
+        self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def close(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+        await self.pool.close()
+
+    async def get(self, cache_key: str, legacy_keys: Sequence[str] = ()) -> str | None:
+        """
+        Looks up the current cache key, then the keys earlier key versions used.
+        A legacy hit is queued for rewrite under the current key.
+        """
+        # Writes still waiting for a flush are already authoritative
+        if cache_key in self._pending:
+            return self._pending[cache_key]
+        try:
+            value = await self.pool.fetchval(self.SELECT_SQL, cache_key)
+            if value is None and legacy_keys:
+                value = await self.pool.fetchval(self.SELECT_ANY_SQL, list(legacy_keys))
+                if value is not None:
+                    self.enqueue(cache_key, value)
+            return value
+        except Exception as e:
+            # Resilience: treat the L3 tier as a miss
+            logger.warning("Address store read failed: %s", e)
+            return None
+
+    def enqueue(self, cache_key: str, standardized: str):
+        self._pending[cache_key] = standardized
+        if len(self._pending) >= self.batch_size and not self._flush_lock.locked():
+            task = asyncio.create_task(self.flush())
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            try:
+                await self.pool.execute(self.UPSERT_SQL, list(batch), list(batch.values()))
+                logger.info("Flushed %d addresses to the address store", len(batch))
+            except Exception as e:
+                logger.warning("Address store write of %d rows failed: %s", len(batch), e)
+                # Retry on the next flush, but don't grow without bound while Postgres is down
+                if len(batch) + len(self._pending) <= self.batch_size * 10:
+                    # Keep newer writes that arrived during the failed flush
+                    self._pending = {**batch, **self._pending}
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+_store: AddressStore | None = None
+
+def get_address_store() -> AddressStore | None:
+    return _store
+
+async def init_address_store():
+    """Connects the L3 store when DATABASE_URL is configured; failures leave it disabled."""
+    global _store
+    if not settings.DATABASE_URL:
+        return
+    try:
+        _store = await AddressStore.connect(
+            settings.DATABASE_URL,
+            batch_size=settings.ADDRESS_STORE_BATCH_SIZE,
+            flush_interval=settings.ADDRESS_STORE_FLUSH_INTERVAL,
+        )
+    except Exception as e:
+        logger.error("Address store unavailable, continuing without it: %s", e)
+        return
+    _store.start()
+    logger.info("Address store connected")
+
+async def close_address_store():
+    global _store
+    if _store is not None:
+        await _store.close()
+        _store = None
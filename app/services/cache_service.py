@@ -1,29 +1,85 @@
+import base64
 import hashlib
 import json
 import re
 import logging
+from typing import Callable
 from redis.asyncio import Redis
 from pydantic import BaseModel
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.redis_client import reader_for
+from app.services.cache_writer import get_cache_writer, pending_write
+from app.services.degraded_mode import degraded_mode
 
 logger = logging.getLogger(__name__)
 
+def _sha256_hex(normalized: str, prefix: str) -> str:
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+def _blake2b_b64(normalized: str) -> str:
+    # 128 bits is plenty against accidental collisions; keys are not attacker-chosen secrets
+    digest = hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+def _blake2b_key(normalized: str, prefix: str) -> str:
+    return f"{prefix}:2:{_blake2b_b64(normalized)}"
+
+def _blake2b_tagged_key(normalized: str, prefix: str) -> str:
+    # The first two digest characters form a Redis Cluster hash tag: keys spread over
+    # 4096 tag groups, and a batch MGET grouped by tag stays on one slot
+    encoded = _blake2b_b64(normalized)
+    return f"{prefix}:3:{{{encoded[:2]}}}{encoded[2:]}"
+
+# Key scheme per CACHE_KEY_VERSION. Versions are never reused: a new scheme gets a new number
+CACHE_KEY_SCHEMES: dict[int, Callable[[str, str], str]] = {
+    1: _sha256_hex,             # 64 hex chars
+    2: _blake2b_key,            # "a:2:" + 22 base64url chars = 26 bytes
+    3: _blake2b_tagged_key,     # "a:3:{xx}" + 20 base64url chars = 28 bytes
+}
+
+def hash_tag(key: str) -> str:
+    """The part of the key Redis Cluster hashes to pick a slot ({tag} if present)."""
+    start = key.find("{")
+    if start != -1:
+        end = key.find("}", start + 1)
+        if end > start + 1:
+            return key[start + 1:end]
+    return key
+
+def details_key(cache_key: str) -> str:
+    """Key of the enrichment cached beside an address; shares its hash tag."""
+    return f"{cache_key}:d"
+
 class AddressCacheService:
-    def __init__(self, redis_client: Redis):
+    # TTL: 30 days = 2,592,000 seconds
+    CACHE_TTL_SECONDS = 2592000
+
+    def __init__(
+        self,
+        redis_client: Redis,
+        reader: Redis | None = None,
+        key_version: int | None = None,
+        legacy_versions: list[int] | None = None,
+        key_prefix: str | None = None,
+    ):
         self.redis = redis_client
+        # Lookups may be served by a replica; writes and migrations use the primary
+        self.reader = reader if reader is not None else reader_for(redis_client)
         # Pattern to keep only alphanumeric and spaces
         self.cleanup_pattern = re.compile(r'[^a-z0-9\s]')
+        self.key_version = key_version if key_version is not None else settings.CACHE_KEY_VERSION
+        if self.key_version not in CACHE_KEY_SCHEMES:
+            raise ValueError(f"Unknown cache key version: {self.key_version}")
+        legacy = settings.CACHE_KEY_LEGACY_VERSIONS if legacy_versions is None else legacy_versions
+        self.legacy_versions = [v for v in legacy if v != self.key_version]
+        self.key_prefix = key_prefix if key_prefix is not None else settings.CACHE_KEY_PREFIX
 
-    def generate_cache_key(self, address_raw: str) -> str:
+    def normalize(self, address_raw: str) -> str:
         """
-        Generates a smart cache key for the address.
-        Strategy: Token Sorting.
-        1. Lowercase and remove punctuation.
-        2. Split into words.
-        3. Sort words alphabetically.
-        4. Join and hash.
-        
-        This allows inputs like "130 Jackson St 07055" and "07055 130 Jackson St" 
-        to produce the same cache key, recognizing they are likely the same address.
+        Token sorting: lowercase, strip punctuation, sort the words and join them.
+        Inputs like "130 Jackson St 07055" and "07055 130 Jackson St" normalize
+        identically, recognizing they are likely the same address.
         """
         # 1. Lowercase and strip non-alphanumeric (keep spaces)
         cleaned = self.cleanup_pattern.sub('', address_raw.lower())
@@ -36,18 +92,50 @@ class AddressCacheService:
         
         # 4. Join them back together
         # Using simple concatenation to form the basis for the hash
-        sorted_str = "".join(tokens)
-        
-        # 5. Return SHA-256 hash
-        return hashlib.sha256(sorted_str.encode('utf-8')).hexdigest()
+        return "".join(tokens)
 
-    async def get_cached_address(self, address_raw: str):
-        key = self.generate_cache_key(address_raw)
+    def generate_cache_key(self, address_raw: str, version: int | None = None) -> str:
+        """
+        Generates a smart cache key for the address: the normalized form (see
+        normalize) hashed with the scheme of the given, or configured, key version.
+        """
+        return CACHE_KEY_SCHEMES[version or self.key_version](self.normalize(address_raw), self.key_prefix)
+
+    def legacy_cache_keys(self, address_raw: str) -> list[str]:
+        """Keys the same address was stored under by earlier key versions, newest first."""
+        normalized = self.normalize(address_raw)
+        return [CACHE_KEY_SCHEMES[v](normalized, self.key_prefix) for v in self.legacy_versions]
+
+    @staticmethod
+    def _as_fragment(data) -> str | None:
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        if isinstance(data, str) and data.startswith("{"):
+            return data
+        return None
+
+    async def get_cached_fragment(self, address_raw: str, key: str | None = None, migrate: bool = True) -> str | None:
+        """
+        Returns the cached standardized address as raw JSON text.
+        Callers on the hot path can splice it into a response without decoding it,
+        so only values that look like a JSON object are treated as hits.
+        Pass `key` when the caller has already generated it, and `migrate=False` to
+        leave the legacy keys alone (see get_legacy_fragment).
+        """
+        key = key or self.generate_cache_key(address_raw)
+        if degraded_mode.active:
+            data = degraded_mode.cached(key)
+            logger.info("Degraded cache %s for key: %s", "HIT" if data else "MISS", key)
+            return data
         try:
-            data = await self.redis.get(key)
-            if data:
+            # Written by this worker but not flushed yet
+            data = pending_write(self.redis, key) or self._as_fragment(await self.reader.get(key))
+            if data is None and migrate and self.legacy_versions:
+                data = await self._migrate(address_raw, key)
+            if data is not None:
                 logger.info("Cache HIT for key: %s", key)
-                return json.loads(data)
+                degraded_mode.remember(key, data)
+                return data
             logger.info("Cache MISS for key: %s", key)
         except Exception as e:
             # Resilience: Log error and return None (fail open)
@@ -55,17 +143,140 @@ class AddressCacheService:
             return None
         return None
 
-    async def cache_address(self, address_raw: str, data: dict | BaseModel):
-        key = self.generate_cache_key(address_raw)
-        
+    async def get_legacy_fragment(self, address_raw: str, key: str) -> str | None:
+        """
+        The legacy-key half of get_cached_fragment, for callers that read the current
+        key before the request is authorized: migrating deletes the legacy key, so it
+        must wait until then. Fails open.
+        """
+        if degraded_mode.active or not self.legacy_versions:
+            return None
+        try:
+            data = await self._migrate(address_raw, key)
+        except Exception as e:
+            logger.warning("Redis connection failed: %s", e)
+            return None
+        if data is not None:
+            degraded_mode.remember(key, data)
+        return data
+
+    async def _migrate(self, address_raw: str, key: str) -> str | None:
+        """
+        Looks the address up under the legacy keys; a hit is copied, with its
+        details, to the current key and only then deleted, so entries migrate as
+        they are read and the old keys stop costing memory. The keys live in
+        different cluster slots, so this is not one transaction: a failure between
+        the steps leaves the legacy copy to be migrated again, never a lost entry.
+        """
+        for legacy_key in self.legacy_cache_keys(address_raw):
+            data = self._as_fragment(await self.redis.get(legacy_key))
+            if data is None:
+                continue
+            details = self._as_fragment(await self.redis.get(details_key(legacy_key)))
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.set(key, data, ex=self.CACHE_TTL_SECONDS)
+            if details is not None:
+                pipe.set(details_key(key), details, ex=self.CACHE_TTL_SECONDS)
+            await pipe.execute()
+            await self.redis.delete(legacy_key, details_key(legacy_key))
+            metrics.increment("cache_key_migrated_total")
+            logger.info("Migrated cache key %s to %s", legacy_key, key)
+            return data
+        return None
+
+    async def get_many_fragments(self, keys: list[str]) -> list[str | None]:
+        """
+        Bulk lookup by cache key, in order. Keys are grouped by hash tag into one
+        MGET per group, sent in a single pipeline, so on Redis Cluster no MGET spans
+        slots. Errors propagate: bulk callers decide whether to retry or skip.
+        """
+        groups: dict[str, list[int]] = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(hash_tag(key), []).append(i)
+
+        pipe = self.reader.pipeline(transaction=False)
+        for indexes in groups.values():
+            pipe.mget([keys[i] for i in indexes])
+        results: list[str | None] = [None] * len(keys)
+        for indexes, values in zip(groups.values(), await pipe.execute()):
+            for i, value in zip(indexes, values):
+                results[i] = self._as_fragment(value)
+        return results
+
+    async def get_cached_details(self, key: str) -> str | None:
+        """The AddressDetails JSON cached with the address under `key`, if any (fails open)."""
+        if degraded_mode.active:
+            return degraded_mode.cached(details_key(key))
+        try:
+            details = pending_write(self.redis, details_key(key)) or self._as_fragment(await self.reader.get(details_key(key)))
+            if details is not None:
+                degraded_mode.remember(details_key(key), details)
+            return details
+        except Exception as e:
+            logger.warning("Redis connection failed: %s", e)
+            return None
+
+    async def get_cached_address(self, address_raw: str):
+        data = await self.get_cached_fragment(address_raw)
+        if data:
+            return json.loads(data)
+        return None
+
+    @staticmethod
+    def _serialize(data: dict | BaseModel | str) -> str:
         if isinstance(data, BaseModel):
-            value = data.model_dump_json()
-        else:
-            value = json.dumps(data)
+            return data.model_dump_json()
+        if isinstance(data, str):
+            # Already serialized (e.g. a fragment read back from the address store)
+            return data
+        return json.dumps(data)
+
+    async def queue_address(self, address_raw: str, data: dict | BaseModel | str, details: str | None = None):
+        """
+        cache_address without waiting on Redis: the write joins the write-behind
+        queue (see CacheWriter) and is pipelined shortly after. Writes inline when
+        CACHE_WRITE_BEHIND_MAX_ENTRIES is 0, and only to the in-process cache while
+        degraded (see DegradedMode).
+        """
+        key = self.generate_cache_key(address_raw)
+        entries = {key: self._serialize(data)}
+        if details is not None:
+            entries[details_key(key)] = details
+        for entry_key, value in entries.items():
+            # While degraded the entries wait there until Redis is back
+            degraded_mode.remember(entry_key, value, self.CACHE_TTL_SECONDS)
+        if degraded_mode.active:
+            return
+        if settings.CACHE_WRITE_BEHIND_MAX_ENTRIES <= 0:
+            await self.cache_address(address_raw, data, details)
+            return
+        get_cache_writer(self.redis).enqueue(entries, self.CACHE_TTL_SECONDS)
+
+    async def cache_address(self, address_raw: str, data: dict | BaseModel | str, details: str | None = None):
+        """Caches the standardized address and, when given, its AddressDetails JSON beside it."""
+        key = self.generate_cache_key(address_raw)
+        value = self._serialize(data)
             
         try:
-            # TTL: 30 days = 2,592,000 seconds
-            await self.redis.set(key, value, ex=2592000)
+            if details is None:
+                await self.redis.set(key, value, ex=self.CACHE_TTL_SECONDS)
+            else:
+                # One round trip for both, expiring together
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.set(key, value, ex=self.CACHE_TTL_SECONDS)
+                pipe.set(details_key(key), details, ex=self.CACHE_TTL_SECONDS)
+                await pipe.execute()
         except Exception as e:
             # Resilience: Log error and continue
             logger.warning("Redis set failed: %s", e)
+
+    async def cache_many(self, entries: list[tuple[str, str]]):
+        """
+        Stores pre-serialized values under already generated cache keys.
+        Uses one non-transactional pipeline, so a batch costs a single round trip.
+        Errors propagate: bulk callers decide whether to retry or skip.
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        for key, value in entries:
+            pipe.set(key, value, ex=self.CACHE_TTL_SECONDS)
+        await pipe.execute()
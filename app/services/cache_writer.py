@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import os
+from redis.asyncio import Redis
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class CacheWriter:
+    """
+    Write-behind queue for cache SETs, so a response never waits on Redis.
+
+    Writes go into a bounded in-process dict (key -> value and TTL). A flush
+    scheduled `flush_interval` seconds after the first queued write sends
+    everything waiting in one pipeline. A later write to a pending key replaces
+    the queued value, and reads in this worker see pending values (see get).
+    Once `max_entries` keys are waiting, new writes are dropped and counted in
+    cache_write_dropped_total. A lost cache write only costs a later miss.
+    """
+
+    def __init__(self, redis: Redis, max_entries: int = 10000, flush_interval: float = 0.005):
+        self.redis = redis
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self._pending: dict[str, tuple[str, int]] = {}
+        self._flush_task: asyncio.Task | None = None
+        # The loop the queued writes (and the client's connections) belong to
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._flush_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def get(self, key: str) -> str | None:
+        """The value queued for `key`, if it has not been flushed yet."""
+        entry = self._pending.get(key)
+        return entry[0] if entry is not None else None
+
+    def enqueue(self, entries: dict[str, str], ttl_seconds: int) -> bool:
+        """Queues the entries (all or none); False when the queue is full and they were dropped."""
+        new_keys = sum(1 for key in entries if key not in self._pending)
+        if len(self._pending) + new_keys > self.max_entries:
+            metrics.increment("cache_write_dropped_total", len(entries), reason="full")
+            logger.warning("Cache write queue full (%d entries); dropping write", len(self._pending))
+            return False
+        for key, value in entries.items():
+            self._pending[key] = (value, ttl_seconds)
+        self._loop = asyncio.get_running_loop()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_soon())
+        return True
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch = dict(self._pending)
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                for key, (value, ttl_seconds) in batch.items():
+                    pipe.set(key, value, ex=ttl_seconds)
+                await pipe.execute()
+                metrics.increment("cache_write_flushed_total", len(batch))
+            except Exception as e:
+                # Resilience: the cache is an optimization; log, count and move on
+                metrics.increment("cache_write_dropped_total", len(batch), reason="error")
+                logger.warning("Cache write flush of %d keys failed: %s", len(batch), e)
+            # Values queued while the pipeline ran are newer; keep them for the next flush
+            self._pending = {key: entry for key, entry in self._pending.items() if batch.get(key) is not entry}
+
+    async def _flush_soon(self):
+        while self._pending:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+        await self.flush()
+
+# One queue per Redis client, so writes land where the request read from. A plain
+# dict: each writer holds its client, so weak keys would never be released.
+# Emptied on shutdown (close_cache_writers) and in forked children.
+_writers: dict[Redis, CacheWriter] = {}
+
+def get_cache_writer(redis: Redis) -> CacheWriter:
+    writer = _writers.get(redis)
+    if writer is None:
+        writer = CacheWriter(
+            redis,
+            max_entries=settings.CACHE_WRITE_BEHIND_MAX_ENTRIES,
+            flush_interval=settings.CACHE_WRITE_BEHIND_INTERVAL_MS / 1000,
+        )
+        _writers[redis] = writer
+    return writer
+
+def pending_write(redis: Redis, key: str) -> str | None:
+    """A queued, not yet flushed value for `key` on this client, if any."""
+    writer = _writers.get(redis)
+    return writer.get(key) if writer is not None else None
+
+async def close_cache_writers():
+    """Flushes and forgets every queue written from this event loop; called on shutdown."""
+    loop = asyncio.get_running_loop()
+    for redis, writer in list(_writers.items()):
+        # Async Redis connections are bound to their loop; another loop's writes cannot be sent from here
+        if writer._loop is loop or writer._loop is None:
+            await writer.close()
+            del _writers[redis]
+
+def _reset_cache_writers():
+    # The parent's queued writes and flush tasks belong to its own loop and connections
+    _writers.clear()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_cache_writers)
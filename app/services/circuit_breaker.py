@@ -0,0 +1,190 @@
+import logging
+import time
+from redis.asyncio import Redis
+from app.core.config import settings
+from app.core.exceptions import AddressProviderError
+from app.core.redis_client import run_script
+from app.services.degraded_mode import degraded_mode
+
+logger = logging.getLogger(__name__)
+
+# KEYS: open, half_open, probes, latency
+# ARGV: max probes, probe ttl, min samples, percentile
+# Returns {state, latency percentile or ""}
+BEFORE_CALL_SCRIPT = """
+local state = 'closed'
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return {'open', ''}
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    local probes = redis.call('INCR', KEYS[3])
+    if probes == 1 then
+        redis.call('EXPIRE', KEYS[3], ARGV[2])
+    end
+    if probes > tonumber(ARGV[1]) then
+        return {'open', ''}
+    end
+    state = 'probe'
+end
+local samples = redis.call('LRANGE', KEYS[4], 0, -1)
+if #samples < tonumber(ARGV[3]) then
+    return {state, ''}
+end
+local values = {}
+for i, sample in ipairs(samples) do
+    values[i] = tonumber(sample)
+end
+table.sort(values)
+local index = math.min(#values, math.floor(tonumber(ARGV[4]) * #values) + 1)
+return {state, tostring(values[index])}
+"""
+
+# KEYS: open, half_open, probes, window, latency
+# ARGV: success (1/0), latency, failure ratio, min calls, window ttl, open seconds, max samples
+# Returns the resulting state
+RECORD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 'open'
+end
+if ARGV[1] == '1' then
+    redis.call('LPUSH', KEYS[5], ARGV[2])
+    redis.call('LTRIM', KEYS[5], 0, tonumber(ARGV[7]) - 1)
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('DEL', KEYS[3])
+    if ARGV[1] == '1' then
+        redis.call('DEL', KEYS[2])
+        return 'closed'
+    end
+    redis.call('SET', KEYS[1], '1', 'EX', ARGV[6])
+    return 'open'
+end
+local calls = redis.call('HINCRBY', KEYS[4], 'calls', 1)
+local failures = tonumber(redis.call('HGET', KEYS[4], 'failures') or '0')
+if ARGV[1] == '0' then
+    failures = redis.call('HINCRBY', KEYS[4], 'failures', 1)
+end
+redis.call('EXPIRE', KEYS[4], ARGV[5])
+if ARGV[1] == '0' and calls >= tonumber(ARGV[4]) and failures / calls >= tonumber(ARGV[3]) then
+    redis.call('SET', KEYS[1], '1', 'EX', ARGV[6])
+    redis.call('SET', KEYS[2], '1', 'EX', 86400)
+    redis.call('DEL', KEYS[4])
+    return 'open'
+end
+return 'closed'
+"""
+
+def _text(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+class CircuitBreaker:
+    """
+    Circuit breaker whose state lives in Redis, so every worker sees the same circuit.
+
+    closed:    calls go through; failures are counted per window and the circuit
+               opens once the failure ratio passes the threshold
+    open:      calls fail fast with AddressProviderError until the cool-down expires
+    half-open: a limited number of probe calls go through; a success closes the
+               circuit, a failure opens it again
+
+    The call timeout adapts to the recent latency percentile of successful calls,
+    bounded by PROVIDER_MIN_TIMEOUT and PROVIDER_TIMEOUT.
+    Redis errors fail open: the provider is called with the maximum timeout.
+    """
+
+    MIN_LATENCY_SAMPLES = 20
+    MAX_LATENCY_SAMPLES = 200
+    LATENCY_PERCENTILE = 0.95
+
+    def __init__(self, redis: Redis, name: str):
+        self.redis = redis
+        self.name = name
+        # Hash tag: the scripts touch several keys, which must share a Cluster slot
+        prefix = f"circuit:{{{name}}}"
+        self.open_key = f"{prefix}:open"
+        self.half_open_key = f"{prefix}:half_open"
+        self.probes_key = f"{prefix}:probes"
+        self.latency_key = f"{prefix}:latency"
+        self.window_prefix = f"{prefix}:window"
+
+    def _window_key(self) -> str:
+        bucket = int(time.time() // settings.CIRCUIT_WINDOW_SECONDS)
+        return f"{self.window_prefix}:{bucket}"
+
+    def _timeout_from(self, percentile: str) -> float:
+        if not percentile:
+            return settings.PROVIDER_TIMEOUT
+        adaptive = float(percentile) * settings.PROVIDER_TIMEOUT_MULTIPLIER
+        return min(settings.PROVIDER_TIMEOUT, max(settings.PROVIDER_MIN_TIMEOUT, adaptive))
+
+    async def before_call(self) -> float:
+        """
+        Raises AddressProviderError while the circuit is open.
+        Returns the timeout to apply to the provider call.
+        """
+        if degraded_mode.active:
+            # No shared state without Redis: behave as a closed circuit
+            return settings.PROVIDER_TIMEOUT
+        try:
+            state, percentile = await run_script(
+                self.redis,
+                BEFORE_CALL_SCRIPT,
+                [self.open_key, self.half_open_key, self.probes_key, self.latency_key],
+                [
+                    settings.CIRCUIT_HALF_OPEN_PROBES,
+                    int(settings.PROVIDER_TIMEOUT) + 1,
+                    self.MIN_LATENCY_SAMPLES,
+                    self.LATENCY_PERCENTILE,
+                ],
+            )
+            state, percentile = _text(state), _text(percentile)
+            timeout = self._timeout_from(percentile)
+        except Exception as e:
+            # Resilience: without shared state, behave as a closed circuit
+            logger.warning("Circuit breaker state unavailable: %s", e)
+            return settings.PROVIDER_TIMEOUT
+
+        if state == "open":
+            logger.warning("Circuit %s is open; failing fast", self.name)
+            raise AddressProviderError(f"{self.name} is unavailable (circuit open)")
+        if state == "probe":
+            logger.info("Circuit %s is half-open; sending probe request", self.name)
+        return timeout
+
+    async def state(self) -> str:
+        """Read-only view of the circuit ("closed", "open" or "half_open") for health checks."""
+        is_open, half_open = await self.redis.mget(self.open_key, self.half_open_key)
+        if is_open:
+            return "open"
+        return "half_open" if half_open else "closed"
+
+    async def _record(self, success: bool, latency: float):
+        if degraded_mode.active:
+            return
+        try:
+            state = await run_script(
+                self.redis,
+                RECORD_SCRIPT,
+                [self.open_key, self.half_open_key, self.probes_key, self._window_key(), self.latency_key],
+                [
+                    "1" if success else "0",
+                    f"{latency:.4f}",
+                    settings.CIRCUIT_FAILURE_RATIO,
+                    settings.CIRCUIT_MIN_CALLS,
+                    settings.CIRCUIT_WINDOW_SECONDS * 2,
+                    settings.CIRCUIT_OPEN_SECONDS,
+                    self.MAX_LATENCY_SAMPLES,
+                ],
+            )
+        except Exception as e:
+            logger.warning("Circuit breaker update failed: %s", e)
+            return
+
+        if not success and _text(state) == "open":
+            logger.error("Circuit %s opened for %ss", self.name, settings.CIRCUIT_OPEN_SECONDS)
+
+    async def record_success(self, latency: float):
+        await self._record(True, latency)
+
+    async def record_failure(self, latency: float):
+        await self._record(False, latency)
@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import math
+import os
+import uuid
+from collections import Counter, OrderedDict
+from redis.asyncio import Redis
+from app.core.config import settings
+from app.core.exceptions import DailyQuotaExceededError
+from app.core.metrics import metrics
+from app.core.redis_client import get_redis_clients
+
+logger = logging.getLogger(__name__)
+
+# Held by one worker of the fleet at a time; see DegradedMode._activate
+MINIMAL_BUDGET_LEASE_KEY = "degraded:minimal_budget_lease"
+
+class DegradedMode:
+    """
+    Keeps a worker serving, without Redis, while Redis is unreachable.
+
+    A background probe pings Redis every `check_interval` seconds. After
+    `failure_threshold` consecutive failures the worker goes degraded, and it
+    recovers on the first successful ping. While Redis is healthy each probe
+    also snapshots the API-key allow list and the day's provider usage.
+
+    While degraded:
+    - cache reads are served from an in-process LRU of the last `cache_size`
+      entries this worker read or wrote
+    - API keys (and admin keys) are checked against the last snapshot (no snapshot: rejected)
+    - provider calls draw on a local budget: `quota_share` of what was left of the
+      daily limit at the last snapshot, rounded down, so a fleet of workers cannot
+      overspend the day on its own. When that rounds to nothing, the one worker
+      holding the minimal-budget lease (renewed with each snapshot) gets one call
+    - per-key rate limits, the circuit breaker and the fuzzy lookup are skipped
+
+    On recovery the units spent offline are added to the quota counters, and the
+    addresses validated offline are written to the cache. Usage counters need
+    nothing: their flush keeps retrying until Redis takes them.
+    """
+
+    def __init__(
+        self,
+        check_interval: float = 2.0,
+        failure_threshold: int = 2,
+        cache_size: int = 10000,
+        quota_share: float = 0.02,
+    ):
+        self.check_interval = check_interval
+        self.failure_threshold = failure_threshold
+        self.cache_size = cache_size
+        self.quota_share = quota_share
+        self.active = False
+        self._failures = 0
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        # Cache writes made while degraded: key -> (value, TTL)
+        self._unsynced: dict[str, tuple[str, int]] = {}
+        self._allowed_keys: frozenset[str] | None = None
+        self._admin_keys: frozenset[str] | None = None
+        self._quota_used = 0
+        self._budget = 0
+        self._spent: Counter[str] = Counter()
+        self._check_task: asyncio.Task | None = None
+        self._stopping = False
+        # Random per process; the pid tells apart workers forked from the same master
+        self._token = uuid.uuid4().hex
+        self._holds_lease = False
+
+    def reset(self):
+        self.active = False
+        self._failures = 0
+        self._cache.clear()
+        self._unsynced.clear()
+        self._allowed_keys = None
+        self._admin_keys = None
+        self._quota_used = 0
+        self._budget = 0
+        self._spent.clear()
+        self._holds_lease = False
+
+    # In-process cache
+
+    def remember(self, key: str, value: str, ttl_seconds: int | None = None):
+        """Keeps a cache entry for degraded reads; with a TTL, a write Redis has not seen while degraded."""
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        if self.active and ttl_seconds is not None and len(self._unsynced) < self.cache_size:
+            self._unsynced[key] = (value, ttl_seconds)
+
+    def cached(self, key: str) -> str | None:
+        value = self._cache.get(key)
+        if value is not None:
+            self._cache.move_to_end(key)
+        return value
+
+    # Allow list and quota
+
+    def is_allowed(self, key_hash: str) -> bool:
+        return self._allowed_keys is not None and key_hash in self._allowed_keys
+
+    def is_admin(self, key_hash: str) -> bool:
+        return self._admin_keys is not None and key_hash in self._admin_keys
+
+    @property
+    def remaining_budget(self) -> int:
+        return max(0, self._budget - sum(self._spent.values()))
+
+    def consume_quota(self, key_hash: str):
+        """Takes one unit of the local budget or raises DailyQuotaExceededError."""
+        if self.remaining_budget <= 0:
+            metrics.increment("provider_quota_rejected_total", provider="smarty", reason="degraded")
+            raise DailyQuotaExceededError("Validation quota is limited while the service is degraded.")
+        self._spent[key_hash] += 1
+        metrics.increment("degraded_quota_used_total")
+
+    # Health checks
+
+    async def probe(self, redis: Redis) -> bool:
+        try:
+            await asyncio.wait_for(redis.ping(), timeout=settings.HEALTH_PROBE_TIMEOUT)
+            return True
+        except Exception:
+            # A cancel racing a failing ping can surface as the ping's error instead
+            # of CancelledError; swallowing it would keep close() waiting forever
+            task = asyncio.current_task()
+            if task is not None and task.cancelling():
+                raise
+            return False
+
+    async def check(self, redis: Redis | None = None):
+        redis = redis or get_redis_clients().primary
+        if not await self.probe(redis):
+            self._failures += 1
+            if not self.active and self._failures >= self.failure_threshold:
+                self._activate()
+            return
+        self._failures = 0
+        try:
+            if self.active:
+                await self.reconcile(redis)
+                self._deactivate()
+            await self.snapshot(redis)
+        except Exception as e:
+            logger.warning("Degraded mode bookkeeping failed: %s", e)
+
+    @property
+    def worker_id(self) -> str:
+        return f"{self._token}:{os.getpid()}"
+
+    async def snapshot(self, redis: Redis):
+        """Refreshes the allow list, the admin keys, the day's provider usage and the lease from Redis."""
+        from app.core.dependencies import ADMIN_KEYS_SET, ALLOWED_KEYS_SET
+        from app.services.quota import ProviderQuota
+
+        allowed, admins, used, holds_lease = await asyncio.gather(
+            redis.smembers(ALLOWED_KEYS_SET),
+            redis.smembers(ADMIN_KEYS_SET),
+            ProviderQuota(redis, "smarty").used_today(),
+            self._renew_lease(redis),
+        )
+        self._allowed_keys = frozenset(allowed)
+        self._admin_keys = frozenset(admins)
+        self._quota_used = used
+        self._holds_lease = holds_lease
+
+    async def _renew_lease(self, redis: Redis) -> bool:
+        """Takes or extends the minimal-budget lease; True when this worker holds it."""
+        # Outlives a few missed checks, so the holder keeps it across the outage's start
+        ttl = max(1, math.ceil(self.check_interval * (self.failure_threshold + 2)))
+        pipe = redis.pipeline(transaction=False)
+        pipe.set(MINIMAL_BUDGET_LEASE_KEY, self.worker_id, nx=True, ex=ttl)
+        pipe.get(MINIMAL_BUDGET_LEASE_KEY)
+        _, holder = await pipe.execute()
+        if holder != self.worker_id:
+            return False
+        await redis.expire(MINIMAL_BUDGET_LEASE_KEY, ttl)
+        return True
+
+    async def reconcile(self, redis: Redis):
+        """Adds the offline provider units to the quota counters and caches the offline results."""
+        from app.services.quota import ProviderQuota
+
+        if self._spent:
+            spent, self._spent = self._spent, Counter()
+            try:
+                await ProviderQuota(redis, "smarty").add_usage(spent)
+            except Exception:
+                self._spent.update(spent)
+                raise
+        if self._unsynced:
+            unsynced, self._unsynced = self._unsynced, {}
+            pipe = redis.pipeline(transaction=False)
+            for key, (value, ttl_seconds) in unsynced.items():
+                pipe.set(key, value, ex=ttl_seconds)
+            try:
+                await pipe.execute()
+            except Exception:
+                self._unsynced = {**unsynced, **self._unsynced}
+                raise
+        logger.info("Reconciled degraded-mode counters and cache writes with Redis")
+
+    def _activate(self):
+        remaining = max(0, settings.SMARTY_DAILY_LIMIT - self._quota_used)
+        self._budget = math.floor(remaining * self.quota_share)
+        if self._budget == 0 and remaining > 0 and self._holds_lease:
+            # Small limits still allow a call, from one worker of the fleet only
+            self._budget = 1
+        self.active = True
+        metrics.increment("degraded_mode_activations_total")
+        metrics.set_gauge("degraded_mode_active", 1)
+        logger.error(
+            "Redis unreachable after %d checks; serving degraded (%d cached entries, provider budget %d)",
+            self._failures, len(self._cache), self._budget,
+        )
+
+    def _deactivate(self):
+        self.active = False
+        self._budget = 0
+        metrics.set_gauge("degraded_mode_active", 0)
+        logger.warning("Redis reachable again; leaving degraded mode")
+
+    # Lifecycle
+
+    def start(self):
+        self._stopping = False
+        self._check_task = asyncio.create_task(self._check_periodically())
+
+    async def close(self, timeout: float = 5.0):
+        self._stopping = True
+        if self._check_task:
+            self._check_task.cancel()
+            # Never let a stuck probe hold up shutdown
+            await asyncio.wait({self._check_task}, timeout=timeout)
+            if not self._check_task.done():
+                logger.warning("Degraded mode check did not stop within %.1fs", timeout)
+            self._check_task = None
+
+    async def _check_periodically(self):
+        while not self._stopping:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+degraded_mode = DegradedMode(
+    check_interval=settings.DEGRADED_CHECK_INTERVAL,
+    failure_threshold=settings.DEGRADED_FAILURE_THRESHOLD,
+    cache_size=settings.DEGRADED_CACHE_SIZE if settings.DEGRADED_MODE_ENABLED else 0,
+    quota_share=settings.DEGRADED_QUOTA_SHARE,
+)
@@ -0,0 +1,231 @@
+import asyncio
+import difflib
+import json
+import logging
+from typing import Awaitable, NamedTuple
+from redis.asyncio import Redis
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.redis_client import reader_for
+from app.schemas import StandardizedAddress
+from app.services.cache_writer import pending_write
+from app.services.input_processor import AddressInputProcessor
+from app.services.quota import BULK, current_caller, set_caller
+
+logger = logging.getLogger(__name__)
+
+class Signature(NamedTuple):
+    zip_code: str
+    house_number: str
+    # Every number in the address except the ZIP (house, unit, ...), in order
+    numbers: str
+    # The remaining words, canonicalized
+    words: str
+
+# Words that tell otherwise similar addresses apart: a one-letter difference
+# ("S Main St" / "N Main St") scores high on similarity yet is another address.
+# They must match exactly, in order. Abbreviations the input processor does not
+# expand are mapped to their full form first.
+DIRECTIONALS = frozenset({"north", "south", "east", "west", "northeast", "northwest", "southeast", "southwest"})
+STREET_SUFFIXES = frozenset({
+    "street", "avenue", "road", "boulevard", "lane", "drive", "court", "place", "square",
+    "highway", "parkway", "circle", "terrace", "way", "trail", "plaza", "alley", "crossing",
+    "expressway", "freeway", "loop", "pike", "row", "run", "walk", "path",
+})
+UNIT_DESIGNATORS = frozenset({
+    "apartment", "suite", "unit", "floor", "room", "building", "lot", "space", "trailer",
+    "basement", "department", "office", "penthouse", "front", "rear", "lower", "upper",
+})
+FIXED_WORD_ALIASES = {
+    "ter": "terrace", "trl": "trail", "plz": "plaza", "aly": "alley", "xing": "crossing",
+    "expy": "expressway", "fwy": "freeway", "fl": "floor", "rm": "room", "bldg": "building",
+    "spc": "space", "trlr": "trailer", "bsmt": "basement", "dept": "department",
+    "ofc": "office", "ph": "penthouse", "frnt": "front", "lowr": "lower", "uppr": "upper",
+}
+FIXED_WORDS = DIRECTIONALS | STREET_SUFFIXES | UNIT_DESIGNATORS
+
+def fixed_words(words: str) -> list[str]:
+    """The directionals, street suffixes and unit designators in `words`, in order."""
+    fixed = []
+    for word in words.split():
+        word = FIXED_WORD_ALIASES.get(word, word)
+        if word in FIXED_WORDS:
+            fixed.append(word)
+    return fixed
+
+def canonical_tokens(text: str) -> list[str]:
+    """Lowercase, punctuation stripped, abbreviations expanded (as AddressInputProcessor does)."""
+    cleaned = AddressInputProcessor.PUNCTUATION_PATTERN.sub('', text.lower())
+    return [AddressInputProcessor.ABBREVIATIONS.get(w, w) for w in cleaned.split()]
+
+def _split(tokens: list[str]) -> tuple[str, str]:
+    numbers = [t for t in tokens if any(c.isdigit() for c in t)]
+    words = [t for t in tokens if not any(c.isdigit() for c in t)]
+    return " ".join(numbers), " ".join(words)
+
+def query_signature(canonical_key: str) -> Signature | None:
+    """
+    Signature of a processed input; the input processor moves the ZIP to the end.
+    None when there is no ZIP or house number to block on.
+    """
+    tokens = canonical_key.split()
+    if len(tokens) < 3 or not (len(tokens[-1]) == 5 and tokens[-1].isdigit()):
+        return None
+    zip_code, tokens = tokens[-1], tokens[:-1]
+    if not tokens[0].isdigit():
+        return None
+    numbers, words = _split(tokens)
+    return Signature(zip_code, tokens[0], numbers, words)
+
+def similarity(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+# Sampled verifications still in flight; held so they are not garbage collected
+_verifications: set[asyncio.Task] = set()
+
+class FuzzyMatcher:
+    """
+    Secondary lookup for exact-key cache misses, so "130 Jakson St 07055" can reuse
+    the result cached for "130 Jackson St 07055" instead of spending provider quota.
+
+    Every provider result is indexed in a Redis hash per (ZIP, house number), under
+    both the input's ZIP and the standardized one (the provider may correct it).
+    A miss loads its block and scores the words of each candidate against the
+    input's with difflib's ratio: against the standardized street line alone and
+    with city and state appended, since inputs may omit the last line. Numbers are
+    never fuzzed: a candidate must carry exactly the same house and unit numbers.
+    Nor are directionals, street suffixes and unit designators (see FIXED_WORDS):
+    "130 S Main St" never matches "130 N Main St".
+
+    A match is confident when exactly one candidate scores at least `threshold`.
+    A sample of matches is re-checked against the provider in the background to
+    measure the false-match rate (fuzzy_false_match_total / fuzzy_verified_total).
+    """
+
+    def __init__(
+        self,
+        redis_client: Redis,
+        reader: Redis | None = None,
+        threshold: float | None = None,
+        ttl_seconds: int = 2592000,
+    ):
+        self.redis = redis_client
+        self.reader = reader if reader is not None else reader_for(redis_client)
+        self.threshold = settings.FUZZY_MATCH_THRESHOLD if threshold is None else threshold
+        # Blocks outlive the cache entries they point to by at most one TTL
+        self.ttl_seconds = ttl_seconds
+
+    def block_key(self, zip_code: str, house_number: str) -> str:
+        # The ZIP and house number share a hash tag, so a block lives on one cluster slot
+        return f"{settings.CACHE_KEY_PREFIX}:fz:{{{zip_code}:{house_number}}}"
+
+    async def index(self, canonical_key: str, cache_key: str, result: StandardizedAddress):
+        """Records a cached provider result as a candidate for later near-duplicates."""
+        query = query_signature(canonical_key)
+        street_numbers, street_words = _split(canonical_tokens(result.street))
+        house_number = street_numbers.split()[0] if street_numbers else None
+        if query is None or house_number is None:
+            return
+        candidate = json.dumps({
+            "n": street_numbers,
+            "s": street_words,
+            "l": " ".join(canonical_tokens(f"{result.city} {result.state}")),
+        })
+        blocks = {self.block_key(query.zip_code, house_number), self.block_key(result.zip_code[:5], house_number)}
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for block in blocks:
+                pipe.hset(block, cache_key, candidate)
+                pipe.expire(block, self.ttl_seconds)
+            await pipe.execute()
+        except Exception as e:
+            # Resilience: the index is an optimization; log and continue
+            logger.warning("Fuzzy index update failed: %s", e)
+
+    def best_match(self, query: Signature, candidates: dict[str, str]) -> tuple[str | None, float]:
+        """The cache key of the single candidate scoring at least the threshold, and its score."""
+        scored = []
+        query_fixed = fixed_words(query.words)
+        for cache_key, raw in candidates.items():
+            candidate = json.loads(raw)
+            if candidate["n"] != query.numbers:
+                continue
+            street = candidate["s"]
+            full = f"{street} {candidate['l']}".strip()
+            # Score only the forms whose fixed words agree (the last line may hold some, e.g. "East Orange")
+            forms = [form for form in (street, full) if fixed_words(form) == query_fixed]
+            if not forms:
+                continue
+            score = max(similarity(query.words, form) for form in forms)
+            scored.append((score, cache_key))
+        scored.sort(reverse=True)
+        if not scored:
+            return None, 0.0
+        best_score, best_key = scored[0]
+        if best_score < self.threshold:
+            return None, best_score
+        if len(scored) > 1 and scored[1][0] >= self.threshold:
+            # Two plausible addresses: guessing would risk returning the wrong one
+            metrics.increment("fuzzy_ambiguous_total")
+            return None, best_score
+        return best_key, best_score
+
+    async def lookup(self, canonical_key: str) -> tuple[str, str] | None:
+        """
+        Returns (cache key, cached fragment) of a confident near-duplicate, or None.
+        Fails open: Redis errors count as no match.
+        """
+        query = query_signature(canonical_key)
+        if query is None:
+            return None
+        block = self.block_key(query.zip_code, query.house_number)
+        try:
+            candidates = await self.reader.hgetall(block)
+            if not candidates:
+                metrics.increment("fuzzy_lookup_total", outcome="miss")
+                return None
+            match, score = self.best_match(query, candidates)
+            if match is None:
+                metrics.increment("fuzzy_lookup_total", outcome="miss")
+                return None
+            fragment = pending_write(self.redis, match) or await self.reader.get(match)
+            if not (isinstance(fragment, str) and fragment.startswith("{")):
+                # The cache entry expired or was evicted; drop the dangling candidate
+                await self.redis.hdel(block, match)
+                metrics.increment("fuzzy_lookup_total", outcome="miss")
+                return None
+        except Exception as e:
+            logger.warning("Fuzzy lookup failed: %s", e)
+            return None
+        metrics.increment("fuzzy_lookup_total", outcome="hit")
+        logger.info("Fuzzy HIT (score %.3f) for %r: %s", score, canonical_key, match)
+        return match, fragment
+
+    def verify_later(self, provider_call: Awaitable[StandardizedAddress | None], fragment: str, on_mismatch=None):
+        """
+        Checks a fuzzy hit against the provider in the background. A mismatch counts
+        as a false match; `on_mismatch(result)` may then repair what was cached.
+        """
+        task = asyncio.create_task(self._verify(provider_call, fragment, on_mismatch))
+        _verifications.add(task)
+        task.add_done_callback(_verifications.discard)
+
+    async def _verify(self, provider_call, fragment: str, on_mismatch):
+        # Verification is background work: it must not eat into the interactive reserve
+        caller = current_caller.get()
+        if caller is not None:
+            set_caller(caller.key_hash, BULK)
+        try:
+            result = await provider_call
+        except Exception as e:
+            logger.warning("Fuzzy match verification failed: %s", e)
+            return
+        if result is None:
+            # The provider could not validate it either; nothing to compare
+            return
+        metrics.increment("fuzzy_verified_total")
+        if json.loads(fragment) != result.model_dump(mode="json"):
+            metrics.increment("fuzzy_false_match_total")
+            logger.warning("Fuzzy false match: cached %s, provider returned %s", fragment, result.model_dump_json())
+            if on_mismatch is not None:
+                await on_mismatch(result)
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import time
+from redis.asyncio import Redis
+from app.core.config import settings
+from app.core.loop_monitor import get_loop_monitor
+from app.core.metrics import metrics
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.degraded_mode import degraded_mode
+
+logger = logging.getLogger(__name__)
+
+async def measure_loop_lag() -> float:
+    """Seconds a ready callback waits for the event loop (the backlog ahead of it)."""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await asyncio.sleep(0)
+    return loop.time() - start
+
+class ReadinessChecker:
+    """
+    Probes the dependencies a worker needs to serve traffic and reports their latency.
+    A report is reused for HEALTH_CACHE_SECONDS and concurrent callers share the probe
+    in flight, so load balancer polling never multiplies into Redis load.
+
+    ready:     Redis answers within HEALTH_MAX_REDIS_LATENCY and the event loop lags
+               less than HEALTH_MAX_LOOP_LAG
+    degraded:  ready, but a provider circuit is open or half-open (shared by every
+               pod, so it does not take this one out of rotation: cache hits still work),
+               or Redis is down and the worker serves without it (see DegradedMode)
+    not_ready: anything else
+    """
+
+    def __init__(self):
+        self._report: dict | None = None
+        self._checked_at = 0.0
+        self._probe: asyncio.Task | None = None
+
+    def reset(self):
+        self._report = None
+        self._checked_at = 0.0
+        self._probe = None
+
+    async def check(self, redis: Redis) -> dict:
+        age = time.monotonic() - self._checked_at
+        if self._report is not None and age < settings.HEALTH_CACHE_SECONDS:
+            return {**self._report, "age_ms": round(age * 1000, 1)}
+
+        if self._probe is None or self._probe.done():
+            self._probe = asyncio.create_task(self._run(redis))
+        report = await asyncio.shield(self._probe)
+        return {**report, "age_ms": 0.0}
+
+    async def _run(self, redis: Redis) -> dict:
+        lag, redis_check, circuits = await asyncio.gather(
+            measure_loop_lag(), self._check_redis(redis), self._check_circuits(redis)
+        )
+        monitor = get_loop_monitor()
+        if monitor is not None and monitor.running:
+            # The monitor's last sample reflects sustained lag, not just this instant
+            lag = max(lag, monitor.lag)
+        loop_check = {
+            "status": "ok" if lag <= settings.HEALTH_MAX_LOOP_LAG else "slow",
+            "lag_ms": round(lag * 1000, 2),
+        }
+
+        if loop_check["status"] != "ok":
+            status = "not_ready"
+        elif redis_check["status"] != "ok":
+            # Every pod shares the outage; pulling them all would serve nobody
+            status = "degraded" if degraded_mode.active else "not_ready"
+        elif any(state != "closed" for state in circuits.values()):
+            status = "degraded"
+        else:
+            status = "ready"
+
+        report = {
+            "status": status,
+            "checks": {
+                "redis": redis_check,
+                "event_loop": loop_check,
+                "providers": {name: {"circuit": state} for name, state in circuits.items()},
+                "degraded_mode": {"active": degraded_mode.active},
+            },
+        }
+        metrics.set_gauge("ready", 0 if status == "not_ready" else 1)
+        metrics.set_gauge("health_probe_latency_seconds", lag, check="event_loop")
+        if status == "not_ready":
+            logger.warning("Readiness check failed: %s", report["checks"])
+
+        self._report = report
+        self._checked_at = time.monotonic()
+        return report
+
+    async def _check_redis(self, redis: Redis) -> dict:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(redis.ping(), timeout=settings.HEALTH_PROBE_TIMEOUT)
+        except Exception as e:
+            return {"status": "down", "error": str(e) or type(e).__name__}
+        latency = time.perf_counter() - start
+        metrics.set_gauge("health_probe_latency_seconds", latency, check="redis")
+        return {
+            "status": "ok" if latency <= settings.HEALTH_MAX_REDIS_LATENCY else "slow",
+            "latency_ms": round(latency * 1000, 2),
+        }
+
+    async def _check_circuits(self, redis: Redis) -> dict[str, str]:
+        async def state(name: str) -> str:
+            try:
+                return await asyncio.wait_for(
+                    CircuitBreaker(redis, name).state(), timeout=settings.HEALTH_PROBE_TIMEOUT
+                )
+            except Exception:
+                # Redis being down is already reported by its own check
+                return "unknown"
+
+        names = list(settings.ADDRESS_PROVIDERS)
+        return dict(zip(names, await asyncio.gather(*(state(name) for name in names))))
+
+readiness_checker = ReadinessChecker()
@@ -1,6 +1,7 @@
 import re
 import unicodedata
 from pydantic import BaseModel
+from app.services.zip_index import ZipCodeIndex
 
 class ProcessingResult(BaseModel):
     is_valid: bool
@@ -13,8 +14,10 @@ class AddressInputProcessor:
     SAFE_CHARS_PATTERN = re.compile(r'^[a-zA-Z0-9\s.,#-]*$')
     PUNCTUATION_PATTERN = re.compile(r'[.,#-]')
     WHITESPACE_PATTERN = re.compile(r'\s+')
-    FIVE_DIGIT_PATTERN = re.compile(r'\b(\d{5})\b')
+    # A ZIP+4 suffix stays attached to its ZIP when the ZIP is moved
+    FIVE_DIGIT_PATTERN = re.compile(r'\b(\d{5}(?:-\d{4})?)\b')
     ANY_DIGIT_PATTERN = re.compile(r'\d+')
+    TRAILING_ZIP_PATTERN = re.compile(r'(?:^|\s)(\d{5})(?:-\d{4})?$')
     
     # Common US abbreviations map
     ABBREVIATIONS = {
@@ -42,6 +45,21 @@ class AddressInputProcessor:
         "sw": "southwest",
     }
 
+    # USPS state and territory codes
+    STATE_CODES = frozenset({
+        "AL", "AK", "AZ", "AR", "CA", "CO", "CT", "DE", "DC", "FL", "GA", "HI",
+        "ID", "IL", "IN", "IA", "KS", "KY", "LA", "ME", "MD", "MA", "MI", "MN",
+        "MS", "MO", "MT", "NE", "NV", "NH", "NJ", "NM", "NY", "NC", "ND", "OH",
+        "OK", "OR", "PA", "RI", "SC", "SD", "TN", "TX", "UT", "VT", "VA", "WA",
+        "WV", "WI", "WY", "AS", "GU", "MP", "PR", "VI", "AA", "AE", "AP",
+    })
+    # Codes that double as street abbreviations ("Ct", "NE") are only trusted
+    # as a state when they agree with the ZIP
+    AMBIGUOUS_STATE_CODES = STATE_CODES & {abbr.upper() for abbr in ABBREVIATIONS}
+
+    def __init__(self, zip_index: ZipCodeIndex | None = None):
+        self.zip_index = zip_index
+
     def process(self, raw_input: str) -> ProcessingResult:
         # Step 1: Sanitize (Security)
         # Handle None input gracefully if needed, but type hint says str
@@ -139,6 +157,16 @@ class AddressInputProcessor:
                 error_message="Address must contain at least one digit"
             )
 
+        # Step 2b: Offline ZIP check (reject impossible ZIP/state, fill in city/state)
+        if self.zip_index is not None:
+            sanitized, error_message = self._check_zip(sanitized)
+            if error_message:
+                return ProcessingResult(
+                    is_valid=False,
+                    sanitized_input=sanitized,
+                    error_message=error_message
+                )
+
         # Step 3: Normalize (Caching Efficiency)
         normalized = sanitized.lower()
         
@@ -159,3 +187,41 @@ class AddressInputProcessor:
             sanitized_input=sanitized,
             canonical_key=canonical_key
         )
+
+    def _check_zip(self, sanitized: str) -> tuple[str, str | None]:
+        """
+        Checks a trailing ZIP (or ZIP+4) against the offline index.
+        Returns the input, with the state filled in when it follows a city of the
+        ZIP without one, and an error message, if any.
+        """
+        zip_match = self.TRAILING_ZIP_PATTERN.search(sanitized)
+        if not zip_match:
+            return sanitized, None
+
+        entry = self.zip_index.lookup(zip_match.group(1))
+        if entry is None:
+            return sanitized, "Unknown ZIP code"
+
+        prefix = sanitized[:zip_match.start()].rstrip(" ,")
+        tokens = prefix.split()
+        state_token = self.PUNCTUATION_PATTERN.sub('', tokens[-1]).upper() if tokens else ""
+
+        has_state = state_token == entry.state
+        if not has_state and state_token in self.STATE_CODES and state_token not in self.AMBIGUOUS_STATE_CODES:
+            return sanitized, "ZIP code does not match state"
+
+        if has_state:
+            # Caller supplied the lastline; nothing to fill in
+            return sanitized, None
+
+        # Only a missing state is filled in, after a city the ZIP is known by: without
+        # one there is no telling where the street ends, and guessing corrupts the input
+        normalized_prefix = self.WHITESPACE_PATTERN.sub(' ', self.PUNCTUATION_PATTERN.sub('', prefix.lower()))
+        has_city = any(
+            normalized_prefix == city or normalized_prefix.endswith(" " + city)
+            for city in (self.PUNCTUATION_PATTERN.sub('', name.lower()) for name in (entry.city, *entry.aliases))
+        )
+        if not has_city:
+            return sanitized, None
+        completed = " ".join(p for p in [prefix, entry.state, sanitized[zip_match.start():].strip()] if p)
+        return completed, None
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import time
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class LookupBatcher:
+    """
+    Coalesces concurrent single-address lookups into one provider HTTP call.
+
+    Each submitted lookup waits in a shared batch that is sent when it holds
+    `max_size` lookups or when the batching window closes, whichever comes first;
+    the SDK fills in every lookup's result and each caller's future resolves.
+
+    The window adapts to the arrival rate (an exponentially weighted average of the
+    gaps between lookups). When fewer than one more lookup is expected within
+    `max_wait`, waiting cannot pay off and a lookup goes out at once, so latency at
+    low QPS is unchanged. Under load the window opens up to `max_wait`, and shrinks
+    again to the time it takes to fill a batch as the rate climbs further.
+    """
+
+    # Weight of the newest inter-arrival gap in the running average
+    SMOOTHING = 0.2
+
+    def __init__(self, client, max_size: int = 100, max_wait: float = 0.005):
+        self.client = client
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._pending: list[tuple[object, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._mean_gap: float | None = None
+        self._last_arrival: float | None = None
+        # Batches in flight; held so they are not garbage collected
+        self._sends: set[asyncio.Task] = set()
+
+    @property
+    def rate(self) -> float:
+        """Estimated lookups per second."""
+        if not self._mean_gap:
+            return 0.0
+        return 1.0 / self._mean_gap
+
+    def window(self) -> float:
+        """Seconds the first lookup of a new batch waits for company."""
+        rate = self.rate
+        if rate * self.max_wait < 1:
+            return 0.0
+        return min(self.max_wait, (self.max_size - 1) / rate)
+
+    def _observe_arrival(self):
+        now = time.monotonic()
+        if self._last_arrival is not None:
+            gap = max(now - self._last_arrival, 1e-6)
+            if self._mean_gap is None:
+                self._mean_gap = gap
+            else:
+                self._mean_gap += self.SMOOTHING * (gap - self._mean_gap)
+        self._last_arrival = now
+
+    async def submit(self, lookup):
+        """Sends the lookup, alone or in a batch; returns once its result is filled in."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._observe_arrival()
+        self._pending.append((lookup, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            window = self.window()
+            if window <= 0:
+                self._flush()
+            else:
+                self._timer = loop.call_later(window, self._flush)
+        await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[:self.max_size], self._pending[self.max_size:]
+        if not batch:
+            return
+        task = asyncio.create_task(self._send(batch))
+        self._sends.add(task)
+        task.add_done_callback(self._sends.discard)
+        if self._pending:
+            self._flush()
+
+    async def _send(self, batch: list[tuple[object, asyncio.Future]]):
+        lookups = [lookup for lookup, _ in batch]
+        metrics.increment("provider_batches_total")
+        metrics.increment("provider_batched_lookups_total", len(lookups))
+        try:
+            if len(lookups) == 1:
+                await asyncio.to_thread(self.client.send_lookup, lookups[0])
+            else:
+                from smartystreets_python_sdk import Batch
+
+                smarty_batch = Batch()
+                for lookup in lookups:
+                    smarty_batch.add(lookup)
+                logger.info("Sending %d coalesced lookups in one batch", len(lookups))
+                await asyncio.to_thread(self.client.send_batch, smarty_batch)
+        except Exception as e:
+            # One HTTP call: its failure is every caller's failure
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for _, future in batch:
+            # A caller that timed out has cancelled its future
+            if not future.done():
+                future.set_result(None)
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Callable
+from redis.asyncio import Redis
+from app.core.config import settings
+from app.interfaces.validator import AddressValidator
+from app.schemas import StandardizedAddress
+
+logger = logging.getLogger(__name__)
+
+ProviderFactory = Callable[[Redis], AddressValidator]
+
+class ProviderStats:
+    """Rolling latency and error statistics for a single provider (per worker)."""
+
+    # Providers with fewer samples than this are tried first so every provider gets measured
+    MIN_SAMPLES = 5
+    # Score multiplier applied per unit of error rate
+    ERROR_PENALTY = 10.0
+
+    def __init__(self, window: int = 200):
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.errors: deque[bool] = deque(maxlen=window)
+
+    def record(self, latency: float, error: bool = False):
+        self.errors.append(error)
+        if not error:
+            self.latencies.append(latency)
+
+    @property
+    def error_rate(self) -> float:
+        if not self.errors:
+            return 0.0
+        return sum(self.errors) / len(self.errors)
+
+    def percentile(self, q: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def score(self) -> float:
+        """Lower is better: median latency inflated by the recent error rate."""
+        if len(self.errors) < self.MIN_SAMPLES:
+            return 0.0
+        median = self.percentile(0.5)
+        if median is None:
+            # Nothing but errors recently
+            return float("inf")
+        return median * (1 + self.ERROR_PENALTY * self.error_rate)
+
+# Statistics outlive the per-request validator instances
+provider_stats: defaultdict[str, ProviderStats] = defaultdict(ProviderStats)
+
+class ProviderRouter(AddressValidator):
+    """
+    Routes each lookup to the best-scoring provider.
+    With hedging enabled, a second provider is fired once the primary has been
+    running longer than its own p95 latency; the first answer wins and the other
+    call is cancelled.
+    """
+
+    def __init__(
+        self,
+        providers: dict[str, AddressValidator],
+        stats: dict[str, ProviderStats] | None = None,
+        hedge: bool = False,
+        hedge_min_delay: float = 0.05,
+        hedge_max_delay: float = 1.0,
+    ):
+        if not providers:
+            raise ValueError("ProviderRouter needs at least one provider")
+        self.providers = providers
+        self.stats = stats if stats is not None else provider_stats
+        for name in providers:
+            self.stats.setdefault(name, ProviderStats())
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+
+    def rank(self) -> list[str]:
+        # sorted() is stable, so configuration order breaks ties
+        return sorted(self.providers, key=lambda name: self.stats[name].score())
+
+    def hedge_delay(self, name: str) -> float:
+        stats = self.stats[name]
+        p95 = stats.percentile(0.95) if len(stats.latencies) >= ProviderStats.MIN_SAMPLES else None
+        if p95 is None:
+            return self.hedge_max_delay
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, p95))
+
+    async def _call(self, name: str, address: str) -> StandardizedAddress | None:
+        start = time.perf_counter()
+        try:
+            result = await self.providers[name].validate(address)
+        except asyncio.CancelledError:
+            # Lost a hedge race; not a signal about the provider's health
+            raise
+        except Exception:
+            self.stats[name].record(time.perf_counter() - start, error=True)
+            raise
+        self.stats[name].record(time.perf_counter() - start)
+        return result
+
+    async def validate(self, address: str) -> StandardizedAddress | None:
+        ranked = self.rank()
+        primary = ranked[0]
+
+        if not self.hedge or len(ranked) < 2:
+            return await self._call(primary, address)
+
+        tasks = {asyncio.create_task(self._call(primary, address)): primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay(primary))
+            # Fire the secondary if the primary is slow, or already failed
+            if not done or next(iter(done)).exception() is not None:
+                secondary = ranked[1]
+                logger.info("Hedging request to %s with %s", primary, secondary)
+                tasks[asyncio.create_task(self._call(secondary, address))] = secondary
+
+            first_error: BaseException | None = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    first_error = first_error or task.exception()
+            # Every provider failed; surface the first failure
+            raise first_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+def create_validator(factories: dict[str, ProviderFactory], redis: Redis) -> AddressValidator:
+    """Builds the validator for the configured providers; a single provider is used directly."""
+    unknown = [name for name in settings.ADDRESS_PROVIDERS if name not in factories]
+    if unknown:
+        raise ValueError(f"Unknown address provider(s): {', '.join(unknown)}")
+
+    if len(settings.ADDRESS_PROVIDERS) == 1:
+        return factories[settings.ADDRESS_PROVIDERS[0]](redis)
+
+    return ProviderRouter(
+        {name: factories[name](redis) for name in settings.ADDRESS_PROVIDERS},
+        hedge=settings.PROVIDER_HEDGING_ENABLED,
+        hedge_min_delay=settings.PROVIDER_HEDGE_MIN_DELAY,
+        hedge_max_delay=settings.PROVIDER_HEDGE_MAX_DELAY,
+    )
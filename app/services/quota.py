@@ -0,0 +1,305 @@
+import logging
+import math
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import NamedTuple
+from redis.asyncio import Redis
+from app.core.config import settings
+from app.core.exceptions import DailyQuotaExceededError
+from app.core.metrics import metrics
+from app.services.degraded_mode import degraded_mode
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+# KEYS: day total, reserved-share usage, per-key usage hash, the key's policy hash,
+#       sum of all reserved shares
+# ARGV: global daily limit, key hash ('' when unknown), requested lane,
+#       interactive-only reserve, TTL of the day's counters
+# Returns {1, lane} when a unit was taken, otherwise {0, reason}.
+#
+# The day's budget is split into the keys' reserved shares (each usable only by its
+# owner), a slice only the interactive lane may use, and the shared rest. A key draws
+# on its own share first; every other unit comes out of the shared pool. All keys
+# share the {smarty} hash tag, so the script runs on one Redis Cluster slot.
+QUOTA_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local key_hash = ARGV[2]
+local lane = ARGV[3]
+local used = 0
+local key_limit, reserved = 0, 0
+if key_hash ~= '' then
+    local policy = redis.call('HMGET', KEYS[4], 'daily_limit', 'reserved', 'lane')
+    key_limit = tonumber(policy[1]) or 0
+    reserved = tonumber(policy[2]) or 0
+    if policy[3] == 'bulk' then
+        lane = 'bulk'
+    end
+    used = tonumber(redis.call('HGET', KEYS[3], key_hash)) or 0
+    if key_limit > 0 and used >= key_limit then
+        return {0, 'key_limit'}
+    end
+end
+local total = tonumber(redis.call('GET', KEYS[1])) or 0
+if total >= limit then
+    return {0, 'global'}
+end
+local from_reserve = used < reserved
+if not from_reserve then
+    local shared = limit - (tonumber(redis.call('GET', KEYS[5])) or 0)
+    if lane == 'bulk' then
+        shared = shared - tonumber(ARGV[4])
+    end
+    local shared_used = total - (tonumber(redis.call('GET', KEYS[2])) or 0)
+    if shared_used >= shared then
+        if lane == 'bulk' then
+            return {0, 'bulk_lane'}
+        end
+        return {0, 'shared'}
+    end
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+if from_reserve then
+    redis.call('INCR', KEYS[2])
+    redis.call('EXPIRE', KEYS[2], ARGV[5])
+end
+if key_hash ~= '' then
+    redis.call('HINCRBY', KEYS[3], key_hash, 1)
+    redis.call('EXPIRE', KEYS[3], ARGV[5])
+end
+return {1, lane}
+"""
+
+# KEYS: the key's policy hash, sum of all reserved shares
+# ARGV: daily limit (0 = none), reserved share, lane ('' keeps the stored value),
+#       global daily limit
+# Keeps the reserved total consistent with the policies it sums, and within the
+# global limit. Returns {1, new total}, or {0, current total} when the change was
+# refused; lowering a share is always allowed.
+SET_POLICY_SCRIPT = """
+local previous = tonumber(redis.call('HGET', KEYS[1], 'reserved')) or 0
+local daily_limit = ARGV[1] ~= '' and ARGV[1] or (redis.call('HGET', KEYS[1], 'daily_limit') or '0')
+local reserved = ARGV[2] ~= '' and tonumber(ARGV[2]) or previous
+local lane = ARGV[3] ~= '' and ARGV[3] or (redis.call('HGET', KEYS[1], 'lane') or 'interactive')
+local total = tonumber(redis.call('GET', KEYS[2])) or 0
+if reserved > previous and total + reserved - previous > tonumber(ARGV[4]) then
+    return {0, total}
+end
+redis.call('HSET', KEYS[1], 'daily_limit', daily_limit, 'reserved', reserved, 'lane', lane)
+return {1, redis.call('INCRBY', KEYS[2], reserved - previous)}
+"""
+
+# KEYS: day total, reserved-share usage, per-key usage hash, then the policy hash
+#       of each key in ARGV order
+# ARGV: TTL of the day's counters, then key hash ('' when unknown) and count pairs
+# Adds calls made elsewhere the way QUOTA_SCRIPT would have counted them: a key's
+# units come out of what is left of its reserved share first.
+ADD_USAGE_SCRIPT = """
+local total, from_reserve = 0, 0
+for i = 2, #ARGV, 2 do
+    local key_hash, count = ARGV[i], tonumber(ARGV[i + 1])
+    total = total + count
+    if key_hash ~= '' then
+        local reserved = tonumber(redis.call('HGET', KEYS[3 + i / 2], 'reserved')) or 0
+        local used = tonumber(redis.call('HGET', KEYS[3], key_hash)) or 0
+        from_reserve = from_reserve + math.max(0, math.min(count, reserved - used))
+        redis.call('HINCRBY', KEYS[3], key_hash, count)
+    end
+end
+redis.call('INCRBY', KEYS[1], total)
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+if from_reserve > 0 then
+    redis.call('INCRBY', KEYS[2], from_reserve)
+    redis.call('EXPIRE', KEYS[2], ARGV[1])
+end
+redis.call('EXPIRE', KEYS[3], ARGV[1])
+return total
+"""
+
+# KEYS: day total, legacy count already carried into it
+# ARGV: the legacy counter's current value, TTL of the day's counters
+# Adds only the part of the legacy count not carried over yet, so any number of
+# workers can carry the same (or a later, larger) value without double counting.
+CARRY_LEGACY_SCRIPT = """
+local legacy = tonumber(ARGV[1])
+local carried = tonumber(redis.call('GET', KEYS[2])) or 0
+if legacy <= carried then
+    return 0
+end
+redis.call('INCRBY', KEYS[1], legacy - carried)
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('SET', KEYS[2], legacy, 'EX', ARGV[2])
+return legacy - carried
+"""
+
+# Day counter used before per-key quotas; its count is carried over on the first
+# call of the day, so a deploy mid-day does not hand out the day's budget again.
+# It is left in place for workers still running the previous release.
+LEGACY_DAY_KEY = "smarty_quota:{day}"
+# The day this worker last carried the legacy counter over
+_legacy_seeded_day: str | None = None
+
+QUOTA_MESSAGES = {
+    "key_limit": "Daily validation quota for this API key exceeded.",
+    "global": "Daily validation quota exceeded.",
+    "shared": "Daily validation quota exceeded.",
+    "bulk_lane": "Daily bulk validation quota exceeded; the remainder is reserved for interactive requests.",
+}
+
+class Caller(NamedTuple):
+    key_hash: str
+    lane: str = INTERACTIVE
+
+# Who the provider call is made for; set by the endpoint and inherited by any
+# task it spawns, so the validator needs no extra parameters
+current_caller: ContextVar[Caller | None] = ContextVar("current_caller", default=None)
+
+def set_caller(key_hash: str, lane: str = INTERACTIVE):
+    current_caller.set(Caller(key_hash, lane))
+
+class ProviderQuota:
+    """
+    Daily provider budget (SMARTY_DAILY_LIMIT) shared by every API key, with
+    per-key policies on top, enforced by one Lua script per provider call:
+
+    daily_limit: a cap on the key's own usage (0 = none)
+    reserved:    units set aside for the key; other keys cannot consume them
+    lane:        "bulk" keys (batch clients, jobs) cannot touch the interactive
+                 reserve (QUOTA_INTERACTIVE_RESERVE of the budget), so single
+                 interactive lookups keep a guaranteed minimum when the day runs short
+    """
+
+    def __init__(self, redis: Redis, name: str = "smarty"):
+        self.redis = redis
+        self.name = name
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def _day_prefix(self) -> str:
+        return f"quota:{{{self.name}}}:{self._today()}"
+
+    async def _seed_from_legacy(self):
+        """
+        Adds today's legacy counter (see LEGACY_DAY_KEY) to the day total through
+        CARRY_LEGACY_SCRIPT, which is idempotent: workers checking at the same time
+        carry it over once, and a count left by old workers during a rolling deploy
+        is topped up by the next worker to check.
+        """
+        global _legacy_seeded_day
+        today = self._today()
+        if self.name != "smarty" or _legacy_seeded_day == today:
+            return
+        try:
+            # The legacy key has no hash tag, so it is read outside the script
+            legacy = await self.redis.get(LEGACY_DAY_KEY.format(day=today))
+            if legacy:
+                day = self._day_prefix()
+                added = await self.redis.eval(CARRY_LEGACY_SCRIPT, 2, day, f"{day}:legacy", int(legacy), 86400)
+                if int(added):
+                    logger.info("Carried %s provider calls over from the legacy quota counter", added)
+        except Exception as e:
+            # Retried on the next call
+            logger.warning("Could not carry the legacy quota counter over: %s", e)
+            return
+        _legacy_seeded_day = today
+
+    def policy_key(self, key_hash: str) -> str:
+        return f"quota:{{{self.name}}}:policy:{key_hash}"
+
+    @property
+    def reserved_total_key(self) -> str:
+        return f"quota:{{{self.name}}}:reserved_total"
+
+    def interactive_reserve(self, limit: int) -> int:
+        return math.ceil(limit * settings.QUOTA_INTERACTIVE_RESERVE)
+
+    async def consume(self, caller: Caller | None = None):
+        """Takes one unit for the caller (default: the current one) or raises DailyQuotaExceededError."""
+        caller = caller or current_caller.get() or Caller("")
+        if degraded_mode.active:
+            # Redis is down: spend from this worker's local share instead
+            degraded_mode.consume_quota(caller.key_hash)
+            return
+        await self._seed_from_legacy()
+        limit = settings.SMARTY_DAILY_LIMIT
+        day = self._day_prefix()
+        allowed, detail = await self.redis.eval(
+            QUOTA_SCRIPT,
+            5,
+            day,
+            f"{day}:reserved",
+            f"{day}:keys",
+            self.policy_key(caller.key_hash),
+            self.reserved_total_key,
+            limit,
+            caller.key_hash,
+            caller.lane,
+            self.interactive_reserve(limit),
+            86400,
+        )
+        if int(allowed) != 1:
+            metrics.increment("provider_quota_rejected_total", provider=self.name, reason=detail)
+            logger.warning("Provider quota rejected (%s) for key %s", detail, caller.key_hash[:8] or "-")
+            raise DailyQuotaExceededError(QUOTA_MESSAGES.get(detail, QUOTA_MESSAGES["global"]))
+        metrics.increment("provider_quota_used_total", provider=self.name, lane=detail)
+
+    async def set_policy(
+        self, key_hash: str, daily_limit: int | None = None, reserved: int | None = None, lane: str | None = None
+    ):
+        """
+        Updates the given fields of the key's policy; the others keep their stored
+        (or default) values. Raises ValueError when the reserved shares of all keys
+        would add up to more than SMARTY_DAILY_LIMIT.
+        """
+        if lane is not None and lane not in LANES:
+            raise ValueError(f"Unknown lane: {lane}")
+        limit = settings.SMARTY_DAILY_LIMIT
+        updated, reserved_total = await self.redis.eval(
+            SET_POLICY_SCRIPT,
+            2,
+            self.policy_key(key_hash),
+            self.reserved_total_key,
+            "" if daily_limit is None else daily_limit,
+            "" if reserved is None else reserved,
+            lane or "",
+            limit,
+        )
+        if int(updated) != 1:
+            raise ValueError(
+                f"Reserved shares would exceed the daily limit of {limit} ({reserved_total} already reserved)"
+            )
+
+    async def used_today(self) -> int:
+        """Provider calls made today across all keys."""
+        return int(await self.redis.get(self._day_prefix()) or 0)
+
+    async def add_usage(self, counts: dict[str, int]):
+        """
+        Adds calls made without Redis (see DegradedMode) to today's counters. A key's
+        calls draw on what is left of its reserved share first, as in consume().
+        """
+        day = self._day_prefix()
+        args = []
+        for key_hash, count in counts.items():
+            args += [key_hash, count]
+        await self.redis.eval(
+            ADD_USAGE_SCRIPT,
+            3 + len(counts),
+            day,
+            f"{day}:reserved",
+            f"{day}:keys",
+            *(self.policy_key(key_hash) for key_hash in counts),
+            86400,
+            *args,
+        )
+
+    async def usage(self) -> dict[str, int]:
+        """Today's provider calls per key hash."""
+        counts = await self.redis.hgetall(f"{self._day_prefix()}:keys")
+        return {key_hash: int(count) for key_hash, count in counts.items()}
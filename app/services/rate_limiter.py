@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import math
+import time
+from typing import NamedTuple
+from redis.asyncio import Redis
+from app.core.config import settings
+from app.core.exceptions import ProviderRateLimitedError
+from app.core.metrics import metrics
+from app.core.redis_client import run_script
+from app.services.degraded_mode import degraded_mode
+
+logger = logging.getLogger(__name__)
+
+# Per-key request limits ("<per second>[:<burst>]"), next to the allowed_api_key_hashes set
+API_KEY_RATE_LIMITS_HASH = "api_key_rate_limits"
+
+# KEYS: per-second bucket, per-minute bucket
+# ARGV: per-second limit, per-minute limit (0 disables a bucket)
+# Returns {1, 0} when a token was taken from every bucket, otherwise
+# {0, milliseconds until one is available}. Uses the Redis clock so workers on
+# different hosts agree on refill timing.
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local buckets = {
+    {tonumber(ARGV[1]), tonumber(ARGV[1])},
+    {tonumber(ARGV[2]), tonumber(ARGV[2]) / 60},
+}
+local levels = {}
+local wait = 0
+for i, bucket in ipairs(buckets) do
+    local capacity, rate = bucket[1], bucket[2]
+    if capacity > 0 then
+        local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+        local level = tonumber(state[1]) or capacity
+        local ts = tonumber(state[2]) or now
+        level = math.min(capacity, level + math.max(0, now - ts) * rate)
+        levels[i] = level
+        if level < 1 then
+            wait = math.max(wait, (1 - level) / rate)
+        end
+    end
+end
+if wait > 0 then
+    return {0, math.ceil(wait * 1000)}
+end
+for i, bucket in ipairs(buckets) do
+    if levels[i] then
+        redis.call('HSET', KEYS[i], 'tokens', tostring(levels[i] - 1), 'ts', tostring(now))
+        redis.call('EXPIRE', KEYS[i], math.ceil(bucket[1] / bucket[2]) + 1)
+    end
+end
+return {1, 0}
+"""
+
+class TokenBucketRateLimiter:
+    """
+    Distributed token bucket shared by all workers through Redis.
+    Callers wait (up to max_wait seconds) for a token instead of failing, so
+    bursts are smoothed out before they reach the provider.
+    Redis errors fail open.
+    """
+
+    def __init__(self, redis: Redis, name: str, per_second: float, per_minute: float, max_wait: float):
+        self.redis = redis
+        self.name = name
+        self.per_second = per_second
+        self.per_minute = per_minute
+        self.max_wait = max_wait
+        # Hash tag: both buckets are updated by one script, so they share a Cluster slot
+        self.second_key = f"rate:{{{name}}}:second"
+        self.minute_key = f"rate:{{{name}}}:minute"
+        metrics.set_gauge("provider_rate_limit", per_second, provider=name, window="second")
+        metrics.set_gauge("provider_rate_limit", per_minute, provider=name, window="minute")
+
+    async def _try_acquire(self) -> float:
+        """Returns 0 when a token was taken, otherwise the seconds to wait for one."""
+        allowed, wait_ms = await run_script(
+            self.redis, TOKEN_BUCKET_SCRIPT, [self.second_key, self.minute_key], [self.per_second, self.per_minute]
+        )
+        return 0.0 if int(allowed) == 1 else int(wait_ms) / 1000
+
+    async def acquire(self):
+        if (self.per_second <= 0 and self.per_minute <= 0) or degraded_mode.active:
+            return
+
+        start = time.monotonic()
+        delayed = False
+        while True:
+            try:
+                wait = await self._try_acquire()
+            except Exception as e:
+                # Resilience: never block provider calls on the limiter itself
+                logger.warning("Rate limiter unavailable: %s", e)
+                return
+
+            if wait == 0:
+                if delayed:
+                    metrics.increment("provider_rate_limit_delayed_total", provider=self.name)
+                    metrics.increment("provider_rate_limit_wait_seconds_total", time.monotonic() - start, provider=self.name)
+                return
+
+            if time.monotonic() - start + wait > self.max_wait:
+                metrics.increment("provider_rate_limit_rejected_total", provider=self.name)
+                logger.warning("Rate limit for %s not available within %.2fs", self.name, self.max_wait)
+                raise ProviderRateLimitedError(f"{self.name} rate limit reached, retry shortly")
+
+            delayed = True
+            await asyncio.sleep(wait)
+
+def smarty_rate_limiter(redis: Redis) -> TokenBucketRateLimiter:
+    return TokenBucketRateLimiter(
+        redis,
+        "smarty",
+        per_second=settings.SMARTY_RATE_PER_SECOND,
+        per_minute=settings.SMARTY_RATE_PER_MINUTE,
+        max_wait=settings.SMARTY_RATE_MAX_WAIT,
+    )
+
+# KEYS: the API key's theoretical arrival time (TAT)
+# ARGV: emission interval (seconds per request), burst, cost
+# GCRA: allows `cost` requests when doing so keeps the TAT within `burst` intervals
+# of now. Returns {1, 0} or {0, milliseconds until the request would be allowed}.
+GCRA_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local tat = math.max(tonumber(redis.call('GET', KEYS[1])) or now, now)
+local new_tat = tat + cost * interval
+local allow_at = new_tat - burst * interval
+if allow_at > now then
+    return {0, math.ceil((allow_at - now) * 1000)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, 0}
+"""
+
+class RateLimit(NamedTuple):
+    per_second: float
+    burst: int
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        """ "<per second>[:<burst>]", as stored in API_KEY_RATE_LIMITS_HASH."""
+        rate, _, burst = value.partition(":")
+        per_second = float(rate)
+        return cls(per_second, int(burst) if burst else max(1, math.ceil(per_second)))
+
+    def __str__(self) -> str:
+        return f"{self.per_second:g}:{self.burst}"
+
+class KeyRateLimiter:
+    """
+    Per-API-key request limit (GCRA), shared by all workers through Redis. Unlike
+    the provider limiter, callers are not made to wait: a throttled request fails
+    at once with the time to retry.
+
+    Each check is one script call. With `local_tokens` > 1 a worker reserves that
+    many requests at a time and serves them from memory, so most checks cost no
+    round trip; a reservation lapses after the time it represents at the key's rate.
+    Limits per key are read from API_KEY_RATE_LIMITS_HASH (falling back to the
+    settings defaults) and cached for `policy_ttl` seconds, so only keys that passed
+    the allow-list check may be checked here. Redis errors fail open.
+    """
+
+    def __init__(self, default: RateLimit, local_tokens: int = 0, policy_ttl: float = 30.0):
+        self.default = default
+        self.local_tokens = local_tokens
+        self.policy_ttl = policy_ttl
+        self._policies: dict[str, tuple[float, RateLimit]] = {}
+        # key hash -> (tokens left, reservation expiry on the monotonic clock)
+        self._tokens: dict[str, tuple[int, float]] = {}
+
+    async def limit_for(self, redis: Redis, key_hash: str) -> RateLimit:
+        cached = self._policies.get(key_hash)
+        now = time.monotonic()
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        value = await redis.hget(API_KEY_RATE_LIMITS_HASH, key_hash)
+        limit = RateLimit.parse(value) if isinstance(value, str) and value else self.default
+        self._policies[key_hash] = (now + self.policy_ttl, limit)
+        return limit
+
+    def _take_local(self, key_hash: str) -> bool:
+        tokens, expires = self._tokens.get(key_hash, (0, 0.0))
+        if tokens > 0 and expires > time.monotonic():
+            self._tokens[key_hash] = (tokens - 1, expires)
+            return True
+        self._tokens.pop(key_hash, None)
+        return False
+
+    async def check(self, redis: Redis, key_hash: str) -> float:
+        """Returns 0 when the request may proceed, otherwise the seconds until it may be retried."""
+        if degraded_mode.active or self._take_local(key_hash):
+            # Degraded (no Redis): fail open, as on a Redis error
+            return 0.0
+        try:
+            limit = await self.limit_for(redis, key_hash)
+            if limit.per_second <= 0:
+                return 0.0
+            cost = max(1, min(self.local_tokens, limit.burst))
+            keys = [f"ratelimit:{{{key_hash}}}"]
+            allowed, retry_ms = await run_script(redis, GCRA_SCRIPT, keys, [1 / limit.per_second, limit.burst, cost])
+            if int(allowed) != 1 and cost > 1:
+                # Not enough room for a whole reservation; a single request may still fit
+                cost = 1
+                allowed, retry_ms = await run_script(redis, GCRA_SCRIPT, keys, [1 / limit.per_second, limit.burst, 1])
+        except Exception as e:
+            # Resilience: never turn a Redis problem into rejected requests
+            logger.warning("API key rate limiter unavailable: %s", e)
+            return 0.0
+
+        if int(allowed) != 1:
+            metrics.increment("api_key_throttled_total")
+            return int(retry_ms) / 1000
+        if cost > 1:
+            self._tokens[key_hash] = (cost - 1, time.monotonic() + cost / limit.per_second)
+        return 0.0
+
+key_rate_limiter = KeyRateLimiter(
+    RateLimit(settings.API_KEY_RATE_LIMIT, settings.API_KEY_RATE_BURST),
+    local_tokens=settings.API_KEY_RATE_LOCAL_TOKENS,
+)
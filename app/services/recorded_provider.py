@@ -0,0 +1,140 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.interfaces.validator import AddressValidator
+from app.schemas import AddressDetails, StandardizedAddress
+from app.services.cache_service import AddressCacheService
+
+logger = logging.getLogger(__name__)
+
+class ResponseCorpus:
+    """
+    Provider responses on disk, one JSON object per line, keyed by cache key:
+        {"cache_key": ..., "standardized": {...} | null, "details": {...}}
+    `null` records that the provider found no match. The layout is the one
+    scripts/warm_cache.py --dump writes (minus details), so a cache snapshot can
+    be replayed as-is. Records are appended, one short write per line, so several
+    recording workers can share a file; the last record for a key wins.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # cache key -> the record's JSON line, parsed on lookup
+        self._records: dict[str, str] | None = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict[str, str]:
+        records: dict[str, str] = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        records[record["cache_key"]] = line
+        logger.info("Loaded %d recorded provider responses from %s", len(records), self.path)
+        return records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def records(self) -> dict[str, str]:
+        if self._records is None:
+            with self._lock:
+                if self._records is None:
+                    self._records = self._load()
+        return self._records
+
+    def __contains__(self, cache_key: str) -> bool:
+        return cache_key in self.records
+
+    def get(self, cache_key: str) -> StandardizedAddress | None:
+        """The recorded result (None when the provider found no match); KeyError if never recorded."""
+        record = json.loads(self.records[cache_key])
+        if record.get("standardized") is None:
+            return None
+        result = StandardizedAddress.model_validate(record["standardized"])
+        if record.get("details") is not None:
+            result.details = AddressDetails.model_validate(record["details"])
+        return result
+
+    def add(self, cache_key: str, result: StandardizedAddress | None):
+        record = {
+            "cache_key": cache_key,
+            "standardized": result.model_dump(mode="json") if result is not None else None,
+        }
+        if result is not None and result.details is not None:
+            record["details"] = result.details.model_dump(mode="json")
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            if self._records is not None:
+                self._records[cache_key] = line
+
+_corpora: dict[str, ResponseCorpus] = {}
+
+def get_corpus(path: str | None = None) -> ResponseCorpus:
+    """One corpus per file and worker, loaded on first use."""
+    path = path or settings.PROVIDER_CORPUS_PATH
+    if path not in _corpora:
+        _corpora[path] = ResponseCorpus(path)
+    return _corpora[path]
+
+def _cache_key(address: str) -> str:
+    # The same key the endpoint caches the result under
+    return AddressCacheService(None).generate_cache_key(address)
+
+class RecordingValidator(AddressValidator):
+    """Passes lookups through to a live provider and appends every answer to the corpus."""
+
+    def __init__(self, inner: AddressValidator, corpus: ResponseCorpus):
+        self.inner = inner
+        self.corpus = corpus
+
+    async def validate(self, address: str) -> StandardizedAddress | None:
+        result = await self.inner.validate(address)
+        # Errors are not recorded: a replay should see the answer, not the outage
+        await asyncio.to_thread(self.corpus.add, _cache_key(address), result)
+        metrics.increment("provider_recorded_total")
+        return result
+
+class ReplayValidator(AddressValidator):
+    """
+    Serves recorded responses without credentials, quota or network. Each lookup
+    sleeps a synthetic latency drawn uniformly from latency_ms +/- jitter_ms, so
+    load tests see a realistic miss path. Addresses never recorded answer "no match".
+    """
+
+    def __init__(self, corpus: ResponseCorpus, latency_ms: float = 0.0, jitter_ms: float = 0.0):
+        self.corpus = corpus
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+
+    def latency(self) -> float:
+        return max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    async def validate(self, address: str) -> StandardizedAddress | None:
+        delay = self.latency()
+        if delay:
+            await asyncio.sleep(delay)
+        key = _cache_key(address)
+        if key not in self.corpus:
+            metrics.increment("provider_replayed_total", outcome="miss")
+            logger.info("No recorded response for %s", address)
+            return None
+        metrics.increment("provider_replayed_total", outcome="hit")
+        return self.corpus.get(key)
+
+def replay_validator(redis) -> ReplayValidator:
+    """Provider factory for ADDRESS_PROVIDERS=["replay"]."""
+    return ReplayValidator(
+        get_corpus(),
+        latency_ms=settings.REPLAY_LATENCY_MS,
+        jitter_ms=settings.REPLAY_LATENCY_JITTER_MS,
+    )
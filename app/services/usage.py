@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from redis.asyncio import Redis
+from app.core.config import settings
+from app.core.redis_client import get_redis_clients
+
+logger = logging.getLogger(__name__)
+
+# Per-key events, each a field of the day's usage hash
+REQUESTS = "requests"
+CACHE_HITS = "cache_hits"
+PROVIDER_CALLS = "provider_calls"
+INVALID = "invalid"
+ERRORS = "errors"
+EVENTS = (REQUESTS, CACHE_HITS, PROVIDER_CALLS, INVALID, ERRORS)
+
+def today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+def usage_key(day: str) -> str:
+    return f"usage:{day}"
+
+class UsageRecorder:
+    """
+    Per-API-key usage counters. Requests only bump an in-process Counter; a
+    background task adds the totals to one Redis hash per day
+    (usage:<day>, field "<key hash>:<event>") every `flush_interval` seconds,
+    so accounting costs no Redis write on the request path.
+    """
+
+    def __init__(self, flush_interval: float = 10.0, retention_days: int = 90):
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self._pending: Counter[tuple[str, str, str]] = Counter()
+        self._flush_task: asyncio.Task | None = None
+        self._flush_lock = asyncio.Lock()
+
+    def record(self, key_hash: str, event: str, count: int = 1):
+        self._pending[(today(), key_hash, event)] += count
+
+    def start(self):
+        self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def close(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self, redis: Redis | None = None):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, Counter()
+            try:
+                redis = redis or get_redis_clients().primary
+                pipe = redis.pipeline(transaction=False)
+                for (day, key_hash, event), count in batch.items():
+                    pipe.hincrby(usage_key(day), f"{key_hash}:{event}", count)
+                for day in {day for day, _, _ in batch}:
+                    pipe.expire(usage_key(day), self.retention_days * 86400)
+                await pipe.execute()
+            except Exception as e:
+                logger.warning("Usage flush of %d counters failed: %s", len(batch), e)
+                # Counters merge losslessly; retry everything on the next flush
+                self._pending.update(batch)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+usage_recorder = UsageRecorder(
+    flush_interval=settings.USAGE_FLUSH_INTERVAL,
+    retention_days=settings.USAGE_RETENTION_DAYS,
+)
+
+def hit_ratio(row: dict) -> float | None:
+    """Share of valid lookups served without a provider call."""
+    lookups = row[CACHE_HITS] + row[PROVIDER_CALLS]
+    return round(row[CACHE_HITS] / lookups, 4) if lookups else None
+
+async def usage_report(redis: Redis, days: int = 7, key_hash: str | None = None) -> list[dict]:
+    """
+    One row per key and day over the last `days` days (today included), newest
+    day first and, within a day, the biggest provider spender first.
+    """
+    start = datetime.now(timezone.utc)
+    dates = [(start - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+    pipe = redis.pipeline(transaction=False)
+    for day in dates:
+        pipe.hgetall(usage_key(day))
+
+    rows = []
+    for day, counters in zip(dates, await pipe.execute()):
+        by_key: dict[str, dict] = {}
+        for field, count in counters.items():
+            owner, _, event = field.rpartition(":")
+            if event not in EVENTS or (key_hash and owner != key_hash):
+                continue
+            row = by_key.setdefault(owner, {"day": day, "key_hash": owner, **dict.fromkeys(EVENTS, 0)})
+            row[event] = int(count)
+        for row in sorted(by_key.values(), key=lambda r: (-r[PROVIDER_CALLS], -r[REQUESTS])):
+            row["hit_ratio"] = hit_ratio(row)
+            rows.append(row)
+    return rows
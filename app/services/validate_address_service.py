@@ -1,34 +1,107 @@
-from smartystreets_python_sdk import StaticCredentials, ClientBuilder
-from smartystreets_python_sdk.us_street import Lookup as StreetLookup
 from app.core.config import settings
 from redis.asyncio import Redis
-from datetime import datetime, timezone
-from smartystreets_python_sdk.exceptions import SmartyException
-from app.core.exceptions import DailyQuotaExceededError, AddressProviderError, ProviderTimeoutError
+from app.core.exceptions import AddressProviderError, ProviderTimeoutError
 from app.interfaces.validator import AddressValidator
-from app.schemas import StandardizedAddress
-import usaddress
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.fuzzy_matcher import canonical_tokens
+from app.services.lookup_batcher import LookupBatcher
+from app.services.provider_router import ProviderFactory, create_validator
+from app.services import usage
+from app.services.quota import ProviderQuota, current_caller
+from app.services.recorded_provider import RecordingValidator, get_corpus, replay_validator
+from app.services.rate_limiter import smarty_rate_limiter
+from app.services.usage import usage_recorder
+from app.schemas import AddressCandidate, AddressDetails, AddressMetadata, StandardizedAddress
 import asyncio
 import logging
+import os
+import time
+from contextvars import ContextVar
 
 logger = logging.getLogger(__name__)
 
+# The Smarty SDK (and the requests stack under it) and the usaddress CRF model are
+# only needed on a cache miss, so they are imported inside the functions that use
+# them, and warmed by preload_provider() from the lifespan, instead of at
+# application import.
+
+# The SDK client keeps a pooled HTTP session, so reuse one per credential pair
+# instead of paying a new TLS handshake on every lookup
+_clients: dict[tuple[str, str], object] = {}
+
+def get_smarty_client(auth_id: str, auth_token: str):
+    client = _clients.get((auth_id, auth_token))
+    if client is None:
+        from smartystreets_python_sdk import ClientBuilder, StaticCredentials
+
+        credentials = StaticCredentials(auth_id, auth_token)
+        client = ClientBuilder(credentials).build_us_street_api_client()
+        _clients[(auth_id, auth_token)] = client
+    return client
+
+# One batcher per client, so concurrent misses on the same credentials share calls.
+# A plain dict: each batcher holds its client, so weak keys would never be released.
+# Emptied on shutdown (close_lookup_batchers) and in forked children.
+_batchers: dict[object, LookupBatcher] = {}
+
+def get_lookup_batcher(client) -> LookupBatcher:
+    batcher = _batchers.get(client)
+    if batcher is None:
+        batcher = LookupBatcher(
+            client,
+            max_size=settings.SMARTY_BATCH_MAX_SIZE,
+            max_wait=settings.SMARTY_BATCH_MAX_WAIT_MS / 1000,
+        )
+        _batchers[client] = batcher
+    return batcher
+
+def close_lookup_batchers():
+    """Forgets the batchers, whose timers belong to the closing loop; called on shutdown."""
+    _batchers.clear()
+
+def _reset_clients():
+    # HTTP sessions must not be shared with forked workers
+    _clients.clear()
+    _batchers.clear()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_clients)
+
+def preload_provider():
+    """Imports and warms the address parser model and the SDK client (or the replay corpus)."""
+    if "replay" in settings.ADDRESS_PROVIDERS:
+        get_corpus().records  # Loads the file off the event loop
+        if settings.ADDRESS_PROVIDERS == ["replay"]:
+            return
+    import usaddress
+
+    usaddress.parse("130 Jackson St East Rutherford NJ 07055")
+    get_smarty_client(settings.SMARTY_AUTH_ID, settings.SMARTY_AUTH_TOKEN)
+
+# Whether the response will carry `details`; set by the endpoint like current_caller.
+# Only then are the extra candidates worth asking the provider for.
+candidates_requested: ContextVar[bool] = ContextVar("candidates_requested", default=False)
+
 class SmartyValidator(AddressValidator):
     def __init__(self, redis: Redis):
         self.redis = redis
+        self.breaker = CircuitBreaker(redis, "smarty")
+        self.rate_limiter = smarty_rate_limiter(redis)
+        self.quota = ProviderQuota(redis, "smarty")
 
     async def validate(self, address_raw: str) -> StandardizedAddress | None:
-        # 1. Quota Check
-        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        quota_key = f"smarty_quota:{today}"
-        
-        count = await self.redis.incr(quota_key)
-        if count == 1:
-            await self.redis.expire(quota_key, 86400)
-            
-        if count > settings.SMARTY_DAILY_LIMIT:
-            await self.redis.decr(quota_key)
-            raise DailyQuotaExceededError("Daily validation quota exceeded.")
+        import usaddress
+        from smartystreets_python_sdk.exceptions import SmartyException
+        from smartystreets_python_sdk.us_street import Lookup as StreetLookup
+
+        # 0. Circuit Breaker: fail fast while Smarty is known to be down
+        timeout = await self.breaker.before_call()
+
+        # 0b. Rate Limit: wait briefly for a token instead of bursting into provider 429s
+        await self.rate_limiter.acquire()
+
+        # 1. Quota Check: the day's budget, the calling key's policy and its lane
+        await self.quota.consume()
 
         auth_id = settings.SMARTY_AUTH_ID
         auth_token = settings.SMARTY_AUTH_TOKEN
@@ -39,8 +112,7 @@ class SmartyValidator(AddressValidator):
             # Existing logic just passed. Assuming it fails later or returns None.
             pass
 
-        credentials = StaticCredentials(auth_id, auth_token)
-        client = ClientBuilder(credentials).build_us_street_api_client()
+        client = get_smarty_client(auth_id, auth_token)
 
         lookup = StreetLookup()
         
@@ -71,42 +143,117 @@ class SmartyValidator(AddressValidator):
             logger.warning("Error parsing address locally: %s", e, exc_info=True)
             lookup.street = address_raw
 
-        lookup.candidates = 1
+        # Extra candidates come back in the same response, but each one is parsed,
+        # serialized and cached; only extended responses show them
+        if candidates_requested.get():
+            lookup.candidates = settings.SMARTY_MAX_CANDIDATES
         
         logger.info("Calling Smarty API for address: %s", address_raw)
+        start = time.perf_counter()
         try:
-            # Wrap with timeout
-            await asyncio.wait_for(
-                asyncio.to_thread(client.send_lookup, lookup),
-                timeout=5.0
-            )
+            # Wrap with the adaptive timeout
+            if settings.SMARTY_BATCH_MAX_WAIT_MS > 0 and settings.SMARTY_BATCH_MAX_SIZE > 1:
+                send = get_lookup_batcher(client).submit(lookup)
+            else:
+                send = asyncio.to_thread(client.send_lookup, lookup)
+            await asyncio.wait_for(send, timeout=timeout)
         except asyncio.TimeoutError:
-            logger.error("Provider timed out")
+            logger.error("Provider timed out after %.2fs", timeout)
+            await self.breaker.record_failure(time.perf_counter() - start)
             raise ProviderTimeoutError("Smarty API timed out")
         except SmartyException as e:
             logger.error("Smarty SDK Error: %s", e, exc_info=True)
+            await self.breaker.record_failure(time.perf_counter() - start)
             raise AddressProviderError(f"Smarty API Error: {str(e)}")
         except Exception as e:
             # General exception during call
             logger.error("Error calling Smarty: %s", e, exc_info=True)
+            await self.breaker.record_failure(time.perf_counter() - start)
             raise AddressProviderError("Unknown Provider Error")
+        finally:
+            # Counted once the lookup went out, whatever came back; a request stopped
+            # by the breaker, the rate limiter or the quota made no call
+            self._record_call()
+
+        await self.breaker.record_success(time.perf_counter() - start)
 
         if lookup.result:
             candidate = lookup.result[0]
-            is_corrected = candidate.analysis.dpv_match_code == "Y" and \
-                candidate.delivery_line_1.lower() != address_raw.lower()
-            logger.info("Address corrected: %s", is_corrected)
-            
-            return StandardizedAddress(
-                street=candidate.delivery_line_1,
-                city=candidate.components.city_name,
-                state=candidate.components.state_abbreviation,
-                zip_code=candidate.components.zipcode + "-" + candidate.components.plus4_code
-            )
+            result = self._standardized(candidate)
+            try:
+                result.details = self._details(lookup.result, lookup.street)
+                logger.info("Address corrected: %s", result.details.metadata.is_corrected)
+            except Exception as e:
+                # Enrichment is best effort; the standardized address stands on its own
+                logger.warning("Could not read candidate metadata: %s", e)
+            return result
         return None
 
+    @staticmethod
+    def _record_call():
+        caller = current_caller.get()
+        if caller is not None and caller.key_hash:
+            usage_recorder.record(caller.key_hash, usage.PROVIDER_CALLS)
+
+    @staticmethod
+    def _standardized(candidate) -> StandardizedAddress:
+        return StandardizedAddress(
+            street=candidate.delivery_line_1,
+            city=candidate.components.city_name,
+            state=candidate.components.state_abbreviation,
+            zip_code=candidate.components.zipcode + "-" + candidate.components.plus4_code
+        )
+
+    @classmethod
+    def _details(cls, candidates: list, street_line: str) -> AddressDetails:
+        enriched = [
+            AddressCandidate(standardized=cls._standardized(c), metadata=cls._metadata(c, street_line))
+            for c in candidates
+        ]
+        return AddressDetails(metadata=enriched[0].metadata, candidates=enriched)
+
+    @staticmethod
+    def _metadata(candidate, street_line: str) -> AddressMetadata:
+        # `street_line` is the street part of the input as sent; the city, state and
+        # ZIP went in separate fields, so comparing the whole input would always differ.
+        # Both sides are canonicalized first: "Street" for "St" is standardization,
+        # not a correction
+        # SDK fields are None (or absent) when Smarty omits them
+        def text(value):
+            return value if isinstance(value, str) else None
+
+        def number(value):
+            return float(value) if isinstance(value, (int, float)) else None
+
+        analysis = getattr(candidate, "analysis", None)
+        metadata = getattr(candidate, "metadata", None)
+        dpv_match_code = text(getattr(analysis, "dpv_match_code", None))
+        return AddressMetadata(
+            latitude=number(getattr(metadata, "latitude", None)),
+            longitude=number(getattr(metadata, "longitude", None)),
+            precision=text(getattr(metadata, "precision", None)),
+            rdi=text(getattr(metadata, "rdi", None)),
+            dpv_match_code=dpv_match_code,
+            dpv_footnotes=text(getattr(analysis, "dpv_footnotes", None)),
+            footnotes=text(getattr(analysis, "footnotes", None)),
+            is_corrected=dpv_match_code == "Y"
+            and canonical_tokens(candidate.delivery_line_1) != canonical_tokens(street_line),
+        )
+
+# Providers selectable through settings.ADDRESS_PROVIDERS
+PROVIDERS: dict[str, ProviderFactory] = {
+    "smarty": SmartyValidator,
+    # Recorded responses only (see PROVIDER_RECORD); no credentials or network
+    "replay": replay_validator,
+}
+
+def register_provider(name: str, factory: ProviderFactory):
+    """Makes an AddressValidator implementation available to the provider router."""
+    PROVIDERS[name] = factory
+
 # For backward compatibility / easier mocking in tests that import 'validate_address'
 async def validate_address(address_raw: str, redis: Redis):
-    validator = SmartyValidator(redis)
+    validator = create_validator(PROVIDERS, redis)
+    if settings.PROVIDER_RECORD:
+        validator = RecordingValidator(validator, get_corpus())
     return await validator.validate(address_raw)
-        
\ No newline at end of file
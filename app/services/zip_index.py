@@ -0,0 +1,143 @@
+import csv
+import logging
+import mmap
+import os
+import struct
+from typing import Iterable, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# File layout (little endian):
+#   header:  magic (4s) | version (H) | reserved (H) | record count (I)
+#   records: zip (I) | state (2s) | city offset (I) | city length (H), sorted by zip
+#   strings: UTF-8 city names referenced by the records; a ZIP's preferred name
+#            first, then any alternate names, separated by "|"
+HEADER = struct.Struct("<4sHHI")
+RECORD = struct.Struct("<I2sIH")
+MAGIC = b"ZIPX"
+VERSION = 2
+ALIAS_SEPARATOR = "|"
+
+class ZipCodeEntry(NamedTuple):
+    city: str
+    state: str
+    # Alternate city names the ZIP is also addressed with
+    aliases: tuple[str, ...] = ()
+
+class ZipCodeIndex:
+    """
+    Read-only ZIP -> (city, state) index backed by a memory-mapped file.
+    Lookups are a binary search over fixed-width records, so the OS pages in
+    only what is touched and every worker shares the same physical pages.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, _, count = HEADER.unpack_from(self._mmap, 0)
+        except struct.error:
+            self._mmap.close()
+            raise ValueError(f"{path} is corrupt: truncated header")
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a ZIP index (version {VERSION})")
+        strings_offset = HEADER.size + count * RECORD.size
+        size = len(self._mmap)
+        if size < strings_offset:
+            # A partly written or truncated file; lookups would read past the end
+            self._mmap.close()
+            raise ValueError(f"{path} is corrupt: {count} records need {strings_offset} bytes, file has {size}")
+
+        self._count = count
+        self._strings_offset = strings_offset
+
+    def __len__(self) -> int:
+        return self._count
+
+    def lookup(self, zip_code: str) -> ZipCodeEntry | None:
+        if len(zip_code) != 5 or not zip_code.isdigit():
+            return None
+        target = int(zip_code)
+
+        lo, hi = 0, self._count - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            zip_value, state, city_offset, city_length = RECORD.unpack_from(
+                self._mmap, HEADER.size + mid * RECORD.size
+            )
+            if zip_value < target:
+                lo = mid + 1
+            elif zip_value > target:
+                hi = mid - 1
+            else:
+                start = self._strings_offset + city_offset
+                city, *aliases = self._mmap[start:start + city_length].decode("utf-8").split(ALIAS_SEPARATOR)
+                return ZipCodeEntry(city=city, state=state.decode("ascii"), aliases=tuple(aliases))
+        return None
+
+    def close(self):
+        self._mmap.close()
+
+    @staticmethod
+    def build(rows: Iterable[tuple[str, str, str]], path: str) -> int:
+        """
+        Writes an index file from (zip, city, state) rows.
+        The first row seen for a ZIP sets its state and preferred city name, so list
+        that first; the cities of later rows are kept as alternate names.
+        Returns the number of ZIP codes written.
+        """
+        entries: dict[int, tuple[list[str], str]] = {}
+        for zip_code, city, state in rows:
+            zip_code = zip_code.strip().zfill(5)
+            state = state.strip().upper()
+            city = city.strip().replace(ALIAS_SEPARATOR, " ")
+            if len(zip_code) != 5 or not zip_code.isdigit() or len(state) != 2:
+                continue
+            cities, _ = entries.setdefault(int(zip_code), ([], state))
+            if city and city not in cities:
+                cities.append(city)
+
+        strings = bytearray()
+        records = bytearray()
+        city_offsets: dict[str, int] = {}
+        for zip_value in sorted(entries):
+            cities, state = entries[zip_value]
+            city = ALIAS_SEPARATOR.join(cities)
+            encoded = city.encode("utf-8")
+            # Many ZIPs share a city name; store each name once
+            if city not in city_offsets:
+                city_offsets[city] = len(strings)
+                strings += encoded
+            records += RECORD.pack(zip_value, state.encode("ascii"), city_offsets[city], len(encoded))
+
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(entries)))
+            f.write(records)
+            f.write(strings)
+        return len(entries)
+
+def read_zip_csv(path: str) -> Iterable[tuple[str, str, str]]:
+    """Yields (zip, city, state) rows from a CSV file, skipping any header row."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) < 3 or not row[0].strip().isdigit():
+                continue
+            yield row[0], row[1], row[2]
+
+def load_zip_index(path: str) -> ZipCodeIndex | None:
+    """Opens the configured index, or returns None when it is disabled or unusable."""
+    if not path:
+        return None
+    if not os.path.exists(path):
+        logger.warning("ZIP index not found at %s; offline ZIP checks disabled", path)
+        return None
+    try:
+        index = ZipCodeIndex(path)
+    except (OSError, ValueError) as e:
+        logger.warning("Failed to load ZIP index: %s; offline ZIP checks disabled", e)
+        return None
+    logger.info("Loaded ZIP index with %d entries from %s", len(index), path)
+    return index
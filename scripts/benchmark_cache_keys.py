@@ -0,0 +1,93 @@
+import asyncio
+import argparse
+import random
+import sys
+import os
+import time
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.cache_service import AddressCacheService, CACHE_KEY_SCHEMES
+from redis.asyncio import Redis
+
+STREETS = ["Main", "Jackson", "Oak", "Maple", "Washington", "Park", "Lake", "Hill", "Cedar", "Elm", "Pine", "Sunset"]
+SUFFIXES = ["St", "Ave", "Rd", "Blvd", "Ln", "Dr", "Ct", "Way"]
+CITIES = [("East Rutherford", "NJ"), ("Springfield", "IL"), ("Austin", "TX"), ("Portland", "OR"), ("Columbus", "OH")]
+VALUE = '{"street":"130 Jackson St","city":"East Rutherford","state":"NJ","zip_code":"07073-1234"}'
+
+def synthetic_addresses(count: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    addresses = []
+    for _ in range(count):
+        city, state = rng.choice(CITIES)
+        addresses.append(
+            f"{rng.randint(1, 99999)} {rng.choice(STREETS)} {rng.choice(SUFFIXES)} "
+            f"Apt {rng.randint(1, 999)} {city} {state} {rng.randint(501, 99950):05d}"
+        )
+    return addresses
+
+def time_keys(service: AddressCacheService, addresses: list[str], version: int) -> tuple[list[str], float]:
+    start = time.perf_counter()
+    keys = [service.generate_cache_key(address, version=version) for address in addresses]
+    return keys, time.perf_counter() - start
+
+async def used_memory(redis: Redis) -> int:
+    return (await redis.info("memory"))["used_memory"]
+
+async def measure_memory(redis: Redis, keys: list[str], batch_size: int) -> int:
+    """Bytes of used_memory added by storing every key with the same cached value."""
+    await redis.flushdb()
+    before = await used_memory(redis)
+    service = AddressCacheService(redis)
+    for i in range(0, len(keys), batch_size):
+        await service.cache_many([(key, VALUE) for key in keys[i:i + batch_size]])
+    after = await used_memory(redis)
+    await redis.flushdb()
+    return after - before
+
+async def run(args):
+    addresses = synthetic_addresses(args.count)
+    service = AddressCacheService(None)
+    results = {}
+    print(f"Generating keys for {args.count:,} addresses...")
+    for version in sorted(CACHE_KEY_SCHEMES):
+        keys, elapsed = time_keys(service, addresses, version)
+        results[version] = keys
+        print(
+            f"  v{version}: {len(keys[0])} bytes/key, e.g. {keys[0]}\n"
+            f"       {elapsed / args.count * 1e6:.2f} µs/key to generate"
+        )
+
+    if args.no_redis:
+        return
+
+    redis = Redis.from_url(settings.REDIS_URL, db=args.db, encoding="utf-8", decode_responses=True)
+    try:
+        if await redis.dbsize():
+            print(f"❌ Redis db {args.db} is not empty; pick an unused --db (it is flushed between runs)")
+            return
+        print(f"\nMeasuring Redis memory in db {args.db} (same value under every key)...")
+        usage = {}
+        for version, keys in results.items():
+            usage[version] = await measure_memory(redis, keys, args.batch_size)
+            print(f"  v{version}: {usage[version] / 2**20:,.1f} MiB ({usage[version] / args.count:.1f} bytes/entry)")
+        baseline, current = usage[1], usage[settings.CACHE_KEY_VERSION]
+        if settings.CACHE_KEY_VERSION != 1 and baseline:
+            saved = baseline - current
+            print(f"\n✅ v{settings.CACHE_KEY_VERSION} saves {saved / 2**20:,.1f} MiB ({saved / baseline:.0%}) over v1 for {args.count:,} keys")
+    finally:
+        await redis.aclose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cache key schemes: key size, hashing cost and Redis memory")
+    parser.add_argument("--count", type=int, default=1_000_000, help="Number of synthetic addresses (default: 1,000,000)")
+    parser.add_argument("--db", type=int, default=15, help="Empty Redis database to measure in (default: 15)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Keys per pipeline (default: 5000)")
+    parser.add_argument("--no-redis", action="store_true", help="Only measure key size and generation time")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
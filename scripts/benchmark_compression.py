@@ -0,0 +1,68 @@
+import argparse
+import gzip
+import json
+import sys
+import os
+import time
+from typing import Callable
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.middleware import ZSTD_AVAILABLE
+from scripts.benchmark_cache_keys import synthetic_addresses
+
+def validation_response(address_raw: str) -> bytes:
+    standardized = {"street": "130 Jackson St", "city": "East Rutherford", "state": "NJ", "zip_code": "07073-1234"}
+    return json.dumps({
+        "success": True,
+        "data": {"address_raw": address_raw, "standardized": standardized, "valid": True},
+        "error": None,
+    }).encode()
+
+def payloads() -> dict[str, bytes]:
+    addresses = synthetic_addresses(1000)
+    batch = b"[" + b",".join(validation_response(address) for address in addresses) + b"]"
+    return {
+        "single result": validation_response(addresses[0]),
+        "1,000 results": batch,
+    }
+
+def codecs(gzip_levels: list[int], zstd_levels: list[int]) -> dict[str, Callable[[bytes], bytes]]:
+    found = {f"gzip-{level}": (lambda body, level=level: gzip.compress(body, compresslevel=level)) for level in gzip_levels}
+    if ZSTD_AVAILABLE:
+        import zstandard
+
+        for level in zstd_levels:
+            found[f"zstd-{level}"] = zstandard.ZstdCompressor(level=level).compress
+    return found
+
+def time_codec(compress, body: bytes, rounds: int) -> tuple[int, float]:
+    size = len(compress(body))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        compress(body)
+    return size, (time.perf_counter() - start) / rounds
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU cost vs bytes saved for response compression")
+    parser.add_argument("--rounds", type=int, default=200, help="Compressions per measurement (default: 200)")
+    parser.add_argument("--gzip-levels", type=int, nargs="+", default=[1, 6, 9])
+    parser.add_argument("--zstd-levels", type=int, nargs="+", default=[1, 3, 9])
+    args = parser.parse_args()
+
+    if not ZSTD_AVAILABLE:
+        print("⚠️  zstandard is not installed; measuring gzip only")
+    available = codecs(args.gzip_levels, args.zstd_levels)
+    for name, body in payloads().items():
+        print(f"\n{name}: {len(body):,} bytes")
+        for codec, compress in available.items():
+            size, elapsed = time_codec(compress, body, args.rounds)
+            saved = len(body) - size
+            print(
+                f"  {codec:<8} {size:>9,} bytes ({saved / len(body):>4.0%} saved) "
+                f"{elapsed * 1e6:>9,.1f} µs  {saved / max(elapsed * 1e6, 1e-9):>7,.1f} bytes saved/µs"
+            )
+
+if __name__ == "__main__":
+    main()
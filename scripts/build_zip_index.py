@@ -0,0 +1,21 @@
+import argparse
+import sys
+import os
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.zip_index import ZipCodeIndex, read_zip_csv
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline ZIP -> city/state index")
+    parser.add_argument("source", help="CSV file with zip,city,state columns (header optional)")
+    parser.add_argument("output", help="Path of the index file to write (set ZIP_INDEX_PATH to it)")
+    args = parser.parse_args()
+
+    count = ZipCodeIndex.build(read_zip_csv(args.source), args.output)
+    size = os.path.getsize(args.output)
+    print(f"✅ Wrote {count} ZIP codes to {args.output} ({size / 1024:.1f} KiB)")
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.core.security import hash_key
 from app.core.config import settings
-from redis.asyncio import Redis
+from app.core.redis_client import create_redis_clients
 
 async def debug_check(raw_key: str):
     print(f"Checking key: {raw_key}")
@@ -18,7 +18,7 @@ async def debug_check(raw_key: str):
     
     # 2. Check Redis
     print(f"Connecting to Redis at: {settings.REDIS_URL}")
-    redis = Redis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
+    redis = create_redis_clients().primary
     
     try:
         exists = await redis.sismember("allowed_api_key_hashes", hashed)
@@ -6,26 +6,87 @@ import os
 # Add project root to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.core.security import generate_key
 from app.core.config import settings
-from redis.asyncio import Redis
+from app.core.security import generate_key
+from app.core.redis_client import create_redis_clients
+from app.services.quota import LANES, ProviderQuota
+from app.services.rate_limiter import API_KEY_RATE_LIMITS_HASH, RateLimit
 
-async def add_key_to_redis(hashed_key: str):
-    """Adds the hashed key to the Redis set."""
-    redis = Redis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
+async def add_key_to_redis(hashed_key: str, admin: bool = False, policy: dict | None = None, rate_limit: RateLimit | None = None):
+    """Adds the hashed key to the Redis set (and the admin set when requested)."""
+    redis = create_redis_clients().primary
     try:
         await redis.sadd("allowed_api_key_hashes", hashed_key)
         print(f"✅ Hashed key added to Redis set 'allowed_api_key_hashes'.")
+        if admin:
+            await redis.sadd("admin_api_key_hashes", hashed_key)
+            print(f"✅ Hashed key added to Redis set 'admin_api_key_hashes'.")
+        if policy:
+            await set_quota_policy(redis, hashed_key, policy)
+        if rate_limit:
+            await set_rate_limit(redis, hashed_key, rate_limit)
     except Exception as e:
         print(f"❌ Error adding to Redis: {e}")
     finally:
         await redis.aclose()
 
+async def set_quota_policy(redis, hashed_key: str, policy: dict):
+    """Sets only the given fields; the rest of a stored policy is kept."""
+    quota = ProviderQuota(redis)
+    await quota.set_policy(hashed_key, **policy)
+    stored = await redis.hgetall(quota.policy_key(hashed_key))
+    print(
+        f"✅ Quota policy set: daily limit {int(stored['daily_limit']) or 'none'}, "
+        f"reserved {stored['reserved']}, lane {stored['lane']}."
+    )
+
+async def set_rate_limit(redis, hashed_key: str, rate_limit: RateLimit):
+    await redis.hset(API_KEY_RATE_LIMITS_HASH, hashed_key, str(rate_limit))
+    print(f"✅ Rate limit set: {rate_limit.per_second:g}/s, burst {rate_limit.burst} (workers pick it up within 30s).")
+
+async def update_policy(hashed_key: str, policy: dict | None, rate_limit: RateLimit | None):
+    redis = create_redis_clients().primary
+    try:
+        if policy:
+            await set_quota_policy(redis, hashed_key, policy)
+        if rate_limit:
+            await set_rate_limit(redis, hashed_key, rate_limit)
+    except Exception as e:
+        print(f"❌ Error updating quota policy: {e}")
+    finally:
+        await redis.aclose()
+
 def main():
     parser = argparse.ArgumentParser(description="Manage API Keys for Address Validation Service")
     parser.add_argument("--add", action="store_true", help="Automatically add the hash to Redis")
+    parser.add_argument("--admin", action="store_true", help="With --add, also allow the /v1/admin endpoints")
+    parser.add_argument("--daily-limit", type=int, help="Provider calls per day for this key (0 = no cap)")
+    parser.add_argument("--reserved", type=int, help="Provider calls per day set aside for this key")
+    parser.add_argument("--lane", choices=LANES, help="bulk keys cannot use the interactive reserve")
+    parser.add_argument("--rate-limit", type=float, help="Requests per second for this key (0 = unlimited)")
+    parser.add_argument("--rate-burst", type=int, help="Requests allowed in a burst (default: one second's worth)")
+    parser.add_argument("--policy-for", metavar="KEY_HASH", help="Set the quota or rate policy of an existing key instead of generating one")
     args = parser.parse_args()
 
+    rate_limit = None
+    if args.rate_limit is not None:
+        rate_limit = RateLimit.parse(f"{args.rate_limit}:{args.rate_burst}" if args.rate_burst else str(args.rate_limit))
+
+    if args.reserved is not None and not 0 <= args.reserved <= settings.SMARTY_DAILY_LIMIT:
+        # The sum over all keys is checked again when the policy is stored
+        parser.error(f"--reserved must be between 0 and SMARTY_DAILY_LIMIT ({settings.SMARTY_DAILY_LIMIT})")
+
+    policy = None
+    if args.daily_limit is not None or args.reserved is not None or args.lane is not None:
+        # Flags left out keep the key's current values
+        policy = {"daily_limit": args.daily_limit, "reserved": args.reserved, "lane": args.lane}
+
+    if args.policy_for:
+        if policy is None and rate_limit is None:
+            parser.error("--policy-for needs --daily-limit, --reserved, --lane or --rate-limit")
+        asyncio.run(update_policy(args.policy_for, policy, rate_limit))
+        return
+
     print("Generating new API Key...")
     raw_key, key_hash = generate_key()
     
@@ -37,7 +98,7 @@ def main():
     print("="*60 + "\n")
 
     if args.add:
-        asyncio.run(add_key_to_redis(key_hash))
+        asyncio.run(add_key_to_redis(key_hash, admin=args.admin, policy=policy, rate_limit=rate_limit))
     else:
         print("Run with --add to automatically add the hash to Redis.")
 
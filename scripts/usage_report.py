@@ -0,0 +1,52 @@
+import asyncio
+import argparse
+import json
+import sys
+import os
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.redis_client import create_redis_clients
+from app.services.usage import EVENTS, usage_report
+
+def print_table(rows: list[dict]):
+    if not rows:
+        print("No usage recorded in this period.")
+        return
+    header = f"{'day':<10}  {'key hash':<16}  " + "  ".join(f"{event:>14}" for event in EVENTS) + f"  {'hit ratio':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        ratio = f"{row['hit_ratio']:.1%}" if row["hit_ratio"] is not None else "-"
+        counts = "  ".join(f"{row[event]:>14,}" for event in EVENTS)
+        print(f"{row['day']:<10}  {row['key_hash'][:16]:<16}  {counts}  {ratio:>9}")
+
+    totals = {event: sum(row[event] for row in rows) for event in EVENTS}
+    print(f"\n📊 {totals['provider_calls']:,} provider calls, {totals['cache_hits']:,} cache hits across {len({r['key_hash'] for r in rows})} keys")
+
+async def run(args):
+    redis = create_redis_clients().primary
+    try:
+        rows = await usage_report(redis, args.days, args.key_hash)
+    except Exception as e:
+        print(f"❌ Error reading usage from Redis: {e}")
+        return
+    finally:
+        await redis.aclose()
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-key usage: requests, cache hit ratio and provider spend by day")
+    parser.add_argument("--days", type=int, default=7, help="Days to report, today included (default: 7)")
+    parser.add_argument("--key-hash", help="Only report this key")
+    parser.add_argument("--json", action="store_true", help="Print the rows as JSON")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
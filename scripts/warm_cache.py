@@ -0,0 +1,176 @@
+import asyncio
+import argparse
+import csv
+import json
+import re
+import sys
+import os
+import time
+from typing import AsyncIterator, Iterator
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.schemas import StandardizedAddress
+from app.services.cache_service import AddressCacheService
+from app.core.redis_client import create_redis_clients
+
+# Cache keys of every scheme: legacy bare SHA-256 hex, or "<prefix>:<version>:" + base64url
+# digest, optionally with a {hash tag} over its first two characters
+CACHE_KEY_PATTERN = re.compile(
+    rf'^(?:[0-9a-f]{{64}}|{re.escape(settings.CACHE_KEY_PREFIX)}:\d+:(?:\{{[A-Za-z0-9_-]{{2}}\}}[A-Za-z0-9_-]{{20}}|[A-Za-z0-9_-]{{22}}))$'
+)
+
+def normalize(standardized) -> str:
+    """Validates a standardized address and returns the compact JSON the service caches."""
+    if isinstance(standardized, str):
+        return StandardizedAddress.model_validate_json(standardized).model_dump_json()
+    return StandardizedAddress.model_validate(standardized).model_dump_json()
+
+def read_file(path: str, cache_service: AddressCacheService) -> Iterator[tuple[str, str]]:
+    """
+    Streams (cache_key, value) pairs from a file.
+    .jsonl: one object per line with "standardized" and either "cache_key" or "address_raw"
+    .csv:   cache_key,standardized columns (e.g. a COPY export of validated_addresses)
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            for row in csv.reader(f):
+                if len(row) < 2 or not CACHE_KEY_PATTERN.match(row[0]):
+                    continue
+                yield row[0], normalize(row[1])
+            return
+
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            key = record.get("cache_key") or cache_service.generate_cache_key(record["address_raw"])
+            yield key, normalize(record["standardized"])
+
+async def read_postgres(batch_size: int) -> AsyncIterator[tuple[str, str]]:
+    """Streams (cache_key, value) pairs from the address store table with a server-side cursor."""
+    import asyncpg
+
+    conn = await asyncpg.connect(settings.DATABASE_URL)
+    try:
+        async with conn.transaction():
+            cursor = conn.cursor("SELECT cache_key, standardized FROM validated_addresses", prefetch=batch_size)
+            async for record in cursor:
+                yield record["cache_key"], normalize(record["standardized"])
+    finally:
+        await conn.close()
+
+async def batched(source, batch_size: int) -> AsyncIterator[list[tuple[str, str]]]:
+    batch = []
+    if hasattr(source, "__aiter__"):
+        async for item in source:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    else:
+        for item in source:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+class Progress:
+    def __init__(self, label: str):
+        self.label = label
+        self.count = 0
+        self.start = time.perf_counter()
+
+    def add(self, n: int):
+        self.count += n
+        elapsed = time.perf_counter() - self.start
+        rate = self.count / elapsed * 60 if elapsed else 0
+        print(f"\r{self.label}: {self.count:,} keys ({rate:,.0f} keys/min)", end="", flush=True)
+
+    def done(self):
+        elapsed = time.perf_counter() - self.start
+        print(f"\n✅ {self.label} {self.count:,} keys in {elapsed:.1f}s")
+
+async def load(args):
+    redis = create_redis_clients().primary
+    cache_service = AddressCacheService(redis)
+    source = read_postgres(args.batch_size) if args.postgres else read_file(args.source, cache_service)
+    progress = Progress("Loaded")
+    # Keep several pipelines in flight so network latency overlaps with parsing
+    in_flight: set[asyncio.Task] = set()
+
+    async def write(batch):
+        await cache_service.cache_many(batch)
+        progress.add(len(batch))
+
+    try:
+        async for batch in batched(source, args.batch_size):
+            if len(in_flight) >= args.concurrency:
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            in_flight.add(asyncio.create_task(write(batch)))
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        progress.done()
+    finally:
+        await redis.aclose()
+
+async def dump(args):
+    clients = create_redis_clients()
+    # Snapshots read from replicas when they are configured
+    redis = clients.reader
+    cache_service = AddressCacheService(clients.primary, reader=redis)
+    progress = Progress("Dumped")
+    try:
+        with open(args.dump, "w", encoding="utf-8") as out:
+            keys = []
+            async for key in redis.scan_iter(count=args.batch_size):
+                if not CACHE_KEY_PATTERN.match(key):
+                    continue
+                keys.append(key)
+                if len(keys) >= args.batch_size:
+                    await write_snapshot(cache_service, keys, out, progress)
+                    keys = []
+            if keys:
+                await write_snapshot(cache_service, keys, out, progress)
+        progress.done()
+    finally:
+        if clients.reader is not clients.primary:
+            await clients.primary.aclose()
+        await redis.aclose()
+
+async def write_snapshot(cache_service: AddressCacheService, keys: list[str], out, progress: Progress):
+    # MGETs grouped by hash tag, so this also works against Redis Cluster
+    values = await cache_service.get_many_fragments(keys)
+    written = 0
+    for key, value in zip(keys, values):
+        # Expired between SCAN and MGET
+        if value is None:
+            continue
+        out.write(json.dumps({"cache_key": key, "standardized": json.loads(value)}) + "\n")
+        written += 1
+    progress.add(written)
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the address cache or snapshot it to a file")
+    parser.add_argument("source", nargs="?", help="JSONL or CSV file of standardized addresses to load")
+    parser.add_argument("--postgres", action="store_true", help="Load from the address store table (DATABASE_URL)")
+    parser.add_argument("--dump", metavar="FILE", help="Write the current cache to a JSONL snapshot instead of loading")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Keys per pipeline (default: 5000)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Pipelines in flight (default: 4)")
+    args = parser.parse_args()
+
+    if args.dump:
+        asyncio.run(dump(args))
+    elif args.source or args.postgres:
+        asyncio.run(load(args))
+    else:
+        parser.error("give a source file, --postgres, or --dump FILE")
+
+if __name__ == "__main__":
+    main()
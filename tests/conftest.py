@@ -0,0 +1,26 @@
+import pytest
+import fakeredis
+import fakeredis.aioredis
+from app.core.dependencies import ALLOWED_KEYS_SET
+from app.core.metrics import metrics
+from app.core.security import hash_key
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    """Every test starts and ends with empty process-wide metrics."""
+    metrics.reset()
+    yield
+    metrics.reset()
+
+@pytest.fixture
+def redis_server():
+    """Backs the `redis` client; set `connected = False` to simulate an outage."""
+    return fakeredis.FakeServer()
+
+@pytest.fixture
+async def redis(redis_server):
+    """In-memory Redis (with Lua scripting) on which "test_key" is an allowed API key."""
+    client = fakeredis.aioredis.FakeRedis(server=redis_server, decode_responses=True)
+    await client.sadd(ALLOWED_KEYS_SET, hash_key("test_key"))
+    yield client
+    await client.aclose()
@@ -0,0 +1,128 @@
+import os
+import uuid
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.address_store import AddressStore
+from app.services.cache_service import AddressCacheService
+from app.services.cache_writer import get_cache_writer
+from app.api.v1.endpoints.address import validate_address
+from app.schemas import AddressRequest, StandardizedAddress
+
+FRAGMENT = '{"street":"123 Main St","city":"City","state":"ST","zip_code":"12345-6789"}'
+
+@pytest.fixture
+def mock_pool():
+    return AsyncMock()
+
+@pytest.fixture
+def store(mock_pool):
+    return AddressStore(mock_pool, batch_size=3)
+
+class TestAddressStore:
+    @pytest.mark.asyncio
+    async def test_get(self, store, mock_pool):
+        mock_pool.fetchval.return_value = FRAGMENT
+
+        assert await store.get("key") == FRAGMENT
+        mock_pool.fetchval.assert_called_once_with(AddressStore.SELECT_SQL, "key")
+
+    @pytest.mark.asyncio
+    async def test_get_fails_open(self, store, mock_pool):
+        mock_pool.fetchval.side_effect = ConnectionError("Postgres down")
+
+        assert await store.get("key") is None
+
+    @pytest.mark.asyncio
+    async def test_get_sees_pending_writes(self, store, mock_pool):
+        store.enqueue("key", FRAGMENT)
+
+        assert await store.get("key") == FRAGMENT
+        mock_pool.fetchval.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_falls_back_to_legacy_keys(self, store, mock_pool):
+        mock_pool.fetchval.side_effect = [None, FRAGMENT]
+
+        assert await store.get("new", ["old"]) == FRAGMENT
+        mock_pool.fetchval.assert_called_with(AddressStore.SELECT_ANY_SQL, ["old"])
+        # Rewritten under the current key on the next flush
+        assert store._pending == {"new": FRAGMENT}
+
+    @pytest.mark.asyncio
+    async def test_flush_batches_into_one_statement(self, store, mock_pool):
+        store.enqueue("a", "{}")
+        store.enqueue("b", "{}")
+        store.enqueue("a", '{"v":2}')
+
+        await store.flush()
+
+        # Duplicate keys collapse to the latest value
+        mock_pool.execute.assert_called_once_with(AddressStore.UPSERT_SQL, ["a", "b"], ['{"v":2}', "{}"])
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_retried(self, store, mock_pool):
+        mock_pool.execute.side_effect = [ConnectionError("Postgres down"), None]
+        store.enqueue("a", "{}")
+
+        await store.flush()
+        await store.flush()
+
+        assert mock_pool.execute.call_count == 2
+        assert mock_pool.execute.call_args.args[1] == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_close_flushes(self, store, mock_pool):
+        store.start()
+        store.enqueue("a", "{}")
+
+        await store.close()
+
+        mock_pool.execute.assert_called_once()
+        mock_pool.close.assert_called_once()
+
+@pytest.mark.asyncio
+@patch("app.api.v1.endpoints.address.validate_address_service")
+async def test_l3_hit_repopulates_redis(mock_validate_service, store, mock_pool):
+    mock_redis = AsyncMock()
+    mock_redis.pipeline = MagicMock()
+    mock_redis.pipeline.return_value.execute = AsyncMock()
+    mock_redis.get.return_value = None
+    mock_pool.fetchval.return_value = FRAGMENT
+
+    with patch("app.api.v1.endpoints.address.get_address_store", return_value=store):
+        response = await validate_address(AddressRequest(address_raw="123 Main St"), mock_redis, "test_key")
+
+    assert b'"city":"City"' in response.body
+    mock_validate_service.assert_not_called()
+    key = AddressCacheService(mock_redis).generate_cache_key("123 Main St")
+    await get_cache_writer(mock_redis).flush()
+    mock_redis.pipeline.return_value.set.assert_called_once_with(key, FRAGMENT, ex=2592000)
+
+@pytest.mark.asyncio
+@patch("app.api.v1.endpoints.address.validate_address_service")
+async def test_provider_result_is_queued_for_l3(mock_validate_service, store, mock_pool):
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = None
+    mock_pool.fetchval.return_value = None
+    mock_validate_service.return_value = StandardizedAddress(
+        street="123 Main St", city="City", state="ST", zip_code="12345-6789"
+    )
+
+    with patch("app.api.v1.endpoints.address.get_address_store", return_value=store):
+        await validate_address(AddressRequest(address_raw="123 Main St"), mock_redis, "test_key")
+
+    key = AddressCacheService(mock_redis).generate_cache_key("123 Main St")
+    assert await store.get(key) == FRAGMENT
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="needs a Postgres instance (docker-compose up postgres)")
+@pytest.mark.asyncio
+async def test_postgres_round_trip():
+    store = await AddressStore.connect(os.environ["TEST_DATABASE_URL"])
+    key = f"test:{uuid.uuid4().hex}"
+    try:
+        store.enqueue(key, FRAGMENT)
+        await store.flush()
+        assert await store.get(key) == FRAGMENT
+    finally:
+        await store.pool.execute("DELETE FROM validated_addresses WHERE cache_key = $1", key)
+        await store.close()
@@ -2,9 +2,13 @@ import pytest
 from unittest.mock import MagicMock, patch, AsyncMock
 from redis.exceptions import ConnectionError, TimeoutError
 import json
+import base64
 import hashlib
+from fastapi import HTTPException
 
-from app.services.cache_service import AddressCacheService
+from app.api.v1.endpoints.address import validate_address
+from app.schemas import AddressRequest
+from app.services.cache_service import AddressCacheService, details_key
 
 # ... (MockModel class remains same)
 
@@ -40,14 +44,28 @@ class TestKeyGeneration:
         assert key1 == key2
 
     def test_generate_key_hashing(self, cache_service):
-        # Verify it returns a SHA256 hex string
-        key = cache_service.generate_cache_key("test")
+        # Legacy scheme (version 1): a bare SHA256 hex string
+        key = cache_service.generate_cache_key("test", version=1)
         assert len(key) == 64 # SHA256 is 64 hex chars
         # Verify content
         # "test" -> sorted "test" -> sha256
         expected = hashlib.sha256("test".encode()).hexdigest()
         assert key == expected
 
+    def test_generate_key_compact_scheme(self, mock_redis):
+        cache_service = AddressCacheService(mock_redis, key_version=2, key_prefix="a")
+        key = cache_service.generate_cache_key("Jackson St 130")
+        # Namespaced prefix + base64url blake2b-128
+        assert len(key) == 26
+        assert key.startswith("a:2:")
+        digest = hashlib.blake2b("130jacksonst".encode(), digest_size=16).digest()
+        assert key[4:] == base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+        assert cache_service.legacy_cache_keys("Jackson St 130") == [hashlib.sha256(b"130jacksonst").hexdigest()]
+
+    def test_unknown_key_version_is_rejected(self, mock_redis):
+        with pytest.raises(ValueError):
+            AddressCacheService(mock_redis, key_version=99)
+
 class TestCacheOperations:
     @pytest.mark.asyncio
     async def test_get_resilience_connection_error(self, cache_service, mock_redis):
@@ -111,3 +129,83 @@ class TestCacheOperations:
         
         key = cache_service.generate_cache_key("input")
         mock_redis.set.assert_called_once_with(key, json.dumps(data), ex=2592000)
+
+    @pytest.mark.asyncio
+    async def test_get_cached_fragment_returns_raw_json(self, cache_service, mock_redis):
+        mock_redis.get.return_value = '{"street": "1 Main St"}'
+
+        result = await cache_service.get_cached_fragment("input")
+
+        # Returned verbatim so the endpoint can splice it without decoding
+        assert result == '{"street": "1 Main St"}'
+
+    @pytest.mark.asyncio
+    async def test_cache_many_pipelines_sets(self, redis):
+        service = AddressCacheService(redis)
+
+        await service.cache_many([("k1", '{"a": 1}'), ("k2", '{"b": 2}')])
+
+        assert await redis.get("k1") == '{"a": 1}'
+        assert await redis.get("k2") == '{"b": 2}'
+        assert 0 < await redis.ttl("k1") <= AddressCacheService.CACHE_TTL_SECONDS
+
+    @pytest.mark.asyncio
+    async def test_legacy_key_hit_migrates_to_current_key(self, redis):
+        service = AddressCacheService(redis, key_version=2, legacy_versions=[1])
+        legacy_key = service.generate_cache_key("130 Jackson St", version=1)
+        await redis.set(legacy_key, '{"street": "130 Jackson St"}')
+
+        result = await service.get_cached_fragment("130 Jackson St")
+
+        assert result == '{"street": "130 Jackson St"}'
+        new_key = service.generate_cache_key("130 Jackson St")
+        assert await redis.get(new_key) == result
+        assert 0 < await redis.ttl(new_key) <= AddressCacheService.CACHE_TTL_SECONDS
+        assert await redis.exists(legacy_key) == 0
+
+    @pytest.mark.asyncio
+    async def test_legacy_details_migrate_with_the_address(self, redis):
+        service = AddressCacheService(redis, key_version=3, legacy_versions=[2])
+        legacy_key = service.generate_cache_key("130 Jackson St", version=2)
+        await redis.set(legacy_key, '{"street": "130 Jackson St"}')
+        await redis.set(details_key(legacy_key), '{"rdi": "Commercial"}')
+
+        await service.get_cached_fragment("130 Jackson St")
+
+        new_key = service.generate_cache_key("130 Jackson St")
+        assert await service.get_cached_details(new_key) == '{"rdi": "Commercial"}'
+        assert await redis.exists(legacy_key, details_key(legacy_key)) == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_migration_keeps_legacy_key(self, redis):
+        service = AddressCacheService(redis, key_version=2, legacy_versions=[1])
+        legacy_key = service.generate_cache_key("130 Jackson St", version=1)
+        await redis.set(legacy_key, '{"street": "130 Jackson St"}')
+
+        with patch.object(redis, "pipeline", side_effect=ConnectionError("Redis went away")):
+            assert await service.get_cached_fragment("130 Jackson St") is None
+
+        assert await redis.get(legacy_key) == '{"street": "130 Jackson St"}'
+        assert await service.get_cached_fragment("130 Jackson St") == '{"street": "130 Jackson St"}'
+
+    @pytest.mark.asyncio
+    async def test_legacy_keys_ignored_once_migration_is_off(self, redis):
+        service = AddressCacheService(redis, key_version=2, legacy_versions=[])
+        await redis.set(service.generate_cache_key("130 Jackson St", version=1), '{"street": "130 Jackson St"}')
+
+        assert await service.get_cached_fragment("130 Jackson St") is None
+
+    @pytest.mark.asyncio
+    async def test_endpoint_migrates_only_for_authorized_keys(self, redis):
+        address = "130 Jackson St East Rutherford NJ 07073"
+        legacy_key = AddressCacheService(redis).generate_cache_key(address, version=1)
+        await redis.set(legacy_key, '{"street": "130 Jackson St"}')
+
+        # A rejected key must not be able to move (and delete) entries
+        with pytest.raises(HTTPException):
+            await validate_address(AddressRequest(address_raw=address), redis, "unknown_key")
+        assert await redis.exists(legacy_key) == 1
+
+        response = await validate_address(AddressRequest(address_raw=address), redis, "test_key")
+        assert b'"street": "130 Jackson St"' in response.body
+        assert await redis.exists(legacy_key) == 0
@@ -0,0 +1,83 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from app.core.metrics import metrics
+from app.services.cache_service import AddressCacheService, details_key
+from app.services.cache_writer import CacheWriter, close_cache_writers, get_cache_writer
+
+FRAGMENT = '{"street":"130 Jackson St","city":"East Rutherford","state":"NJ","zip_code":"07073-1234"}'
+
+async def test_flush_pipelines_queued_writes(redis):
+    writer = CacheWriter(redis, flush_interval=60)
+    writer.enqueue({"a:1": FRAGMENT, "a:2": FRAGMENT}, ttl_seconds=100)
+
+    assert await redis.get("a:1") is None
+    assert writer.get("a:1") == FRAGMENT
+
+    await writer.flush()
+    assert await redis.get("a:1") == FRAGMENT
+    assert 0 < await redis.ttl("a:2") <= 100
+    assert len(writer) == 0
+    assert metrics.get("cache_write_flushed_total") == 2
+    await writer.close()
+
+async def test_background_flush_after_interval(redis):
+    writer = CacheWriter(redis, flush_interval=0.01)
+    writer.enqueue({"a:1": FRAGMENT}, ttl_seconds=100)
+
+    await asyncio.sleep(0.05)
+    assert await redis.get("a:1") == FRAGMENT
+    assert len(writer) == 0
+
+async def test_full_queue_drops_and_counts(redis):
+    writer = CacheWriter(redis, max_entries=2, flush_interval=60)
+    assert writer.enqueue({"a:1": FRAGMENT, "a:1:d": "{}"}, ttl_seconds=100)
+    # Address and details are queued together or not at all
+    assert not writer.enqueue({"a:2": FRAGMENT, "a:2:d": "{}"}, ttl_seconds=100)
+    # Rewriting a queued key needs no room
+    assert writer.enqueue({"a:1": FRAGMENT}, ttl_seconds=100)
+
+    assert writer.get("a:2") is None
+    assert metrics.get("cache_write_dropped_total", reason="full") == 2
+    await writer.close()
+
+async def test_failed_flush_is_counted_and_dropped():
+    redis = AsyncMock()
+    redis.pipeline = MagicMock()
+    redis.pipeline.return_value.execute = AsyncMock(side_effect=ConnectionError("down"))
+    writer = CacheWriter(redis, flush_interval=60)
+    writer.enqueue({"a:1": FRAGMENT}, ttl_seconds=100)
+
+    await writer.close()
+    assert len(writer) == 0
+    assert metrics.get("cache_write_dropped_total", reason="error") == 1
+
+async def test_reads_see_unflushed_writes(redis):
+    service = AddressCacheService(redis)
+    await service.queue_address("130 Jackson St 07055", FRAGMENT, details='{"candidates":[]}')
+    key = service.generate_cache_key("130 Jackson St 07055")
+
+    assert await redis.get(key) is None
+    assert await service.get_cached_fragment("130 Jackson St 07055") == FRAGMENT
+    assert await service.get_cached_details(key) == '{"candidates":[]}'
+
+    await close_cache_writers()
+    assert await redis.get(key) == FRAGMENT
+    assert await redis.get(details_key(key)) == '{"candidates":[]}'
+
+async def test_shutdown_releases_writers(redis):
+    writer = get_cache_writer(redis)
+    writer.enqueue({"k1": FRAGMENT}, 60)
+
+    await close_cache_writers()
+
+    assert await redis.get("k1") == FRAGMENT
+    # The next use (a new loop after a restart) starts from a fresh queue
+    assert get_cache_writer(redis) is not writer
+
+async def test_write_behind_can_be_disabled(redis, monkeypatch):
+    monkeypatch.setattr("app.services.cache_service.settings.CACHE_WRITE_BEHIND_MAX_ENTRIES", 0)
+    service = AddressCacheService(redis)
+    await service.queue_address("130 Jackson St 07055", FRAGMENT)
+
+    assert await redis.get(service.generate_cache_key("130 Jackson St 07055")) == FRAGMENT
+    assert len(get_cache_writer(redis)) == 0
@@ -1,8 +1,10 @@
+import json
 import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
 from app.services.cache_service import AddressCacheService
-from app.api.v1.endpoints.address import validate_address
-from app.schemas import AddressRequest, StandardizedAddress
+from app.services.cache_writer import get_cache_writer
+from app.api.v1.endpoints.address import validate_address, cache_hit_response
+from app.schemas import AddressRequest, AddressResponse, APIResponse, StandardizedAddress
 
 @pytest.mark.asyncio
 @patch("app.api.v1.endpoints.address.validate_address_service")
@@ -10,6 +12,8 @@ from app.schemas import AddressRequest, StandardizedAddress
 async def test_caching_logic(mock_processor, mock_validate_service):
     # Setup
     mock_redis = AsyncMock()
+    mock_redis.pipeline = MagicMock()
+    mock_redis.pipeline.return_value.execute = AsyncMock()
     
     # Mock Input Processing
     mock_processor.process.return_value.is_valid = True
@@ -30,12 +34,20 @@ async def test_caching_logic(mock_processor, mock_validate_service):
     request = AddressRequest(address_raw="123 Main St")
     
     # Execute Miss
-    response = await validate_address(request, mock_redis)
+    response = await validate_address(request, mock_redis, "test_key")
     
     # Verify Miss Behavior
-    mock_redis.get.assert_called_once() # Checked cache
+    service = AddressCacheService(mock_redis)
+    key = service.generate_cache_key("123 Main St")
+    # Checked the cache, then the legacy key it may still be stored under
+    checked = [call.args[0] for call in mock_redis.get.call_args_list]
+    assert checked == [key] + service.legacy_cache_keys("123 Main St")
     mock_validate_service.assert_called_once() # Called service
-    mock_redis.set.assert_called_once() # Set cache
+    # Cache write queued (write-behind), not awaited on the response path
+    assert get_cache_writer(mock_redis).get(key) is not None
+    mock_redis.set.assert_not_called()
+    await get_cache_writer(mock_redis).flush()
+    mock_redis.pipeline.return_value.set.assert_called_once() # Set cache
     
     # Reset mocks for Scenario 2
     mock_redis.reset_mock()
@@ -47,12 +59,42 @@ async def test_caching_logic(mock_processor, mock_validate_service):
     mock_redis.get.return_value = cached_json
     
     # Execute Hit
-    response = await validate_address(request, mock_redis)
+    response = await validate_address(request, mock_redis, "test_key")
     
     # Verify Hit Behavior
     mock_redis.get.assert_called_once() # Checked cache
     mock_validate_service.assert_not_called() # SHOULD NOT CALL SERVICE
     mock_redis.set.assert_not_called() # No need to set
     
-    assert response.success is True
-    assert response.data.standardized.city == "City"
+    # Hits are served as prebuilt bytes, not through the response model
+    body = json.loads(response.body)
+    assert body["success"] is True
+    assert body["data"]["standardized"]["city"] == "City"
+    assert body["data"]["address_raw"] == "123 Main St"
+    assert body["data"]["valid"] is True
+    assert body["error"] is None
+
+@pytest.mark.asyncio
+@patch("app.api.v1.endpoints.address.validate_address_service")
+async def test_cache_hit_matches_model_response(mock_validate_service):
+    # The spliced fast-path body must decode to the same document the model would produce
+    standardized = StandardizedAddress(
+        street="130 Jackson St",
+        city="East Rutherford",
+        state="NJ",
+        zip_code="07055-5202"
+    )
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = standardized.model_dump_json()
+
+    address_raw = '07055 130 "jackson" st ñ'
+    response = await validate_address(AddressRequest(address_raw="07055 130 jackson st"), mock_redis, "test_key")
+    hit = cache_hit_response(address_raw, standardized.model_dump_json())
+
+    expected = APIResponse[AddressResponse](
+        success=True,
+        data=AddressResponse(address_raw=address_raw, valid=True, standardized=standardized)
+    )
+    assert response.media_type == "application/json"
+    assert json.loads(hit.body) == expected.model_dump()
+    mock_validate_service.assert_not_called()
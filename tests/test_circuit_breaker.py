@@ -0,0 +1,113 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.core.config import settings
+from app.core.exceptions import AddressProviderError
+from app.services.circuit_breaker import CircuitBreaker
+
+@pytest.fixture
+def breaker(redis):
+    return CircuitBreaker(redis, "test")
+
+@pytest.fixture(autouse=True)
+def breaker_settings():
+    with patch.multiple(
+        settings,
+        CIRCUIT_FAILURE_RATIO=0.5,
+        CIRCUIT_MIN_CALLS=4,
+        CIRCUIT_WINDOW_SECONDS=60,
+        CIRCUIT_OPEN_SECONDS=30,
+        CIRCUIT_HALF_OPEN_PROBES=1,
+        PROVIDER_TIMEOUT=5.0,
+        PROVIDER_MIN_TIMEOUT=0.5,
+        PROVIDER_TIMEOUT_MULTIPLIER=3.0,
+    ):
+        yield
+
+async def trip(breaker):
+    for _ in range(settings.CIRCUIT_MIN_CALLS):
+        await breaker.before_call()
+        await breaker.record_failure(5.0)
+
+class TestCircuitBreaker:
+    @pytest.mark.asyncio
+    async def test_closed_by_default(self, breaker):
+        assert await breaker.before_call() == settings.PROVIDER_TIMEOUT
+
+    @pytest.mark.asyncio
+    async def test_stays_closed_below_min_calls(self, breaker):
+        for _ in range(settings.CIRCUIT_MIN_CALLS - 1):
+            await breaker.record_failure(1.0)
+        await breaker.before_call()
+
+    @pytest.mark.asyncio
+    async def test_stays_closed_below_failure_ratio(self, breaker):
+        for _ in range(3):
+            await breaker.record_success(0.1)
+        await breaker.record_failure(1.0)
+        await breaker.before_call()
+
+    @pytest.mark.asyncio
+    async def test_opens_and_fails_fast(self, breaker):
+        await trip(breaker)
+
+        with pytest.raises(AddressProviderError):
+            await breaker.before_call()
+
+    @pytest.mark.asyncio
+    async def test_state_is_shared_across_instances(self, redis, breaker):
+        await trip(breaker)
+
+        with pytest.raises(AddressProviderError):
+            await CircuitBreaker(redis, "test").before_call()
+        # Other providers are unaffected
+        await CircuitBreaker(redis, "other").before_call()
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe_success_closes(self, redis, breaker):
+        await trip(breaker)
+        # Cool-down elapses
+        await redis.delete(breaker.open_key)
+
+        await breaker.before_call()
+        # Only one probe at a time
+        with pytest.raises(AddressProviderError):
+            await breaker.before_call()
+
+        await breaker.record_success(0.2)
+        await breaker.before_call()
+        await breaker.before_call()
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe_failure_reopens(self, redis, breaker):
+        await trip(breaker)
+        await redis.delete(breaker.open_key)
+
+        await breaker.before_call()
+        await breaker.record_failure(5.0)
+
+        with pytest.raises(AddressProviderError):
+            await breaker.before_call()
+        assert await redis.ttl(breaker.open_key) > 0
+
+    @pytest.mark.asyncio
+    async def test_adaptive_timeout(self, breaker):
+        for _ in range(CircuitBreaker.MIN_LATENCY_SAMPLES):
+            await breaker.record_success(0.4)
+
+        # p95 of 0.4s x 3
+        assert await breaker.before_call() == pytest.approx(1.2)
+
+    @pytest.mark.asyncio
+    async def test_adaptive_timeout_bounds(self, breaker):
+        for _ in range(CircuitBreaker.MIN_LATENCY_SAMPLES):
+            await breaker.record_success(0.01)
+        assert await breaker.before_call() == settings.PROVIDER_MIN_TIMEOUT
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_fails_open(self):
+        redis = AsyncMock()
+        redis.evalsha.side_effect = ConnectionError("Redis down")
+        breaker = CircuitBreaker(redis, "test")
+
+        assert await breaker.before_call() == settings.PROVIDER_TIMEOUT
+        await breaker.record_failure(1.0)
@@ -0,0 +1,161 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, patch
+from app.api.v1.endpoints.address import validate_address
+from app.core.dependencies import ADMIN_KEYS_SET, validate_admin_key
+from app.core.exceptions import DailyQuotaExceededError
+from app.core.metrics import metrics
+from app.core.security import hash_key
+from app.schemas import AddressRequest, StandardizedAddress
+from app.services.cache_service import AddressCacheService
+from app.services.degraded_mode import DegradedMode, degraded_mode
+from app.services.health_service import readiness_checker
+from app.services.quota import ProviderQuota
+
+ADDRESS = "130 Jackson St 07055"
+JACKSON = StandardizedAddress(street="130 Jackson St", city="East Rutherford", state="NJ", zip_code="07073-1234")
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    degraded_mode.reset()
+    yield
+    degraded_mode.reset()
+
+async def go_degraded(redis_server, redis):
+    """Snapshots while healthy, then takes Redis down until the threshold trips."""
+    await degraded_mode.check(redis)
+    redis_server.connected = False
+    for _ in range(degraded_mode.failure_threshold):
+        await degraded_mode.check(redis)
+    assert degraded_mode.active
+
+async def test_activates_after_consecutive_failures(redis_server, redis):
+    await degraded_mode.check(redis)
+    redis_server.connected = False
+    await degraded_mode.check(redis)
+    assert not degraded_mode.active
+    await degraded_mode.check(redis)
+    assert degraded_mode.active
+    assert metrics.get("degraded_mode_active") == 1
+
+@patch("app.api.v1.endpoints.address.validate_address_service", new_callable=AsyncMock)
+async def test_serves_cached_addresses_without_redis(mock_service, redis_server, redis):
+    mock_service.return_value = JACKSON
+    # Validated while healthy: the worker keeps a copy
+    await validate_address(AddressRequest(address_raw=ADDRESS), redis, "test_key")
+    await go_degraded(redis_server, redis)
+
+    response = await validate_address(AddressRequest(address_raw=ADDRESS), redis, "test_key")
+
+    mock_service.assert_awaited_once()
+    assert JACKSON.model_dump_json().encode() in response.body
+
+async def test_unknown_keys_rejected_from_snapshot(redis_server, redis):
+    await go_degraded(redis_server, redis)
+    with pytest.raises(HTTPException) as exc:
+        await validate_address(AddressRequest(address_raw=ADDRESS), redis, "other_key")
+    assert exc.value.status_code == 403
+
+async def test_local_quota_share(redis_server, redis):
+    degraded_mode.quota_share = 0.1
+    try:
+        with patch("app.services.degraded_mode.settings.SMARTY_DAILY_LIMIT", 100):
+            await redis.set(ProviderQuota(redis)._day_prefix(), 40)
+            await go_degraded(redis_server, redis)
+        # 10% of the 60 units left at the snapshot
+        quota = ProviderQuota(redis)
+        for _ in range(6):
+            await quota.consume()
+        with pytest.raises(DailyQuotaExceededError):
+            await quota.consume()
+    finally:
+        degraded_mode.quota_share = 0.02
+
+async def test_recovery_reconciles_quota_and_cache(redis_server, redis):
+    degraded_mode.quota_share = 1.0
+    try:
+        with patch("app.services.degraded_mode.settings.SMARTY_DAILY_LIMIT", 100):
+            await go_degraded(redis_server, redis)
+        await ProviderQuota(redis).consume()
+        await AddressCacheService(redis).queue_address(ADDRESS, JACKSON)
+    finally:
+        degraded_mode.quota_share = 0.02
+
+    redis_server.connected = True
+    await degraded_mode.check(redis)
+
+    assert not degraded_mode.active
+    quota = ProviderQuota(redis)
+    assert await quota.used_today() == 1
+    key = AddressCacheService(redis).generate_cache_key(ADDRESS)
+    assert await redis.get(key) == JACKSON.model_dump_json()
+    assert 0 < await redis.ttl(key) <= AddressCacheService.CACHE_TTL_SECONDS
+
+async def test_readiness_reports_degraded(redis_server, redis):
+    await go_degraded(redis_server, redis)
+    readiness_checker.reset()
+    try:
+        report = await readiness_checker.check(redis)
+    finally:
+        readiness_checker.reset()
+    assert report["status"] == "degraded"
+    assert report["checks"]["degraded_mode"] == {"active": True}
+
+class CancelSwallowingRedis:
+    """A ping that turns a cancel into a connection error, as a failing ping racing the cancel can."""
+
+    async def ping(self):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            raise ConnectionError("Connection reset")
+
+async def test_close_while_redis_is_down(redis_server, redis):
+    redis_server.connected = False
+    mode = DegradedMode(check_interval=0.01)
+    with patch("app.services.degraded_mode.get_redis_clients") as clients:
+        clients.return_value.primary = redis
+        mode.start()
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(mode.close(), timeout=2)
+
+    assert mode.active
+
+async def test_close_does_not_hang_when_cancel_races_the_ping():
+    mode = DegradedMode(check_interval=0.01)
+    with patch("app.services.degraded_mode.get_redis_clients") as clients:
+        clients.return_value.primary = CancelSwallowingRedis()
+        mode.start()
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(mode.close(timeout=1), timeout=2)
+
+async def test_admin_keys_checked_against_snapshot(redis_server, redis):
+    await redis.sadd(ADMIN_KEYS_SET, hash_key("test_key"))
+    await go_degraded(redis_server, redis)
+
+    assert await validate_admin_key("test_key", redis) == "test_key"
+    with pytest.raises(HTTPException) as exc:
+        await validate_admin_key("other_key", redis)
+    assert exc.value.status_code == 403
+
+async def test_small_daily_limit_allows_one_call_per_fleet(redis_server, redis):
+    # Default config: 2% of 33 rounds down to nothing, but the lease holder gets one call
+    workers = [DegradedMode() for _ in range(40)]
+    with patch("app.services.degraded_mode.settings.SMARTY_DAILY_LIMIT", 33):
+        for worker in workers:
+            await worker.check(redis)
+        redis_server.connected = False
+        for worker in workers:
+            for _ in range(worker.failure_threshold):
+                await worker.check(redis)
+
+    assert all(worker.active for worker in workers)
+    assert [worker.remaining_budget for worker in workers] == [1] + [0] * 39
+
+async def test_no_budget_once_the_day_is_spent(redis_server, redis):
+    with patch("app.services.degraded_mode.settings.SMARTY_DAILY_LIMIT", 33):
+        await redis.set(ProviderQuota(redis)._day_prefix(), 33)
+        await go_degraded(redis_server, redis)
+    with pytest.raises(DailyQuotaExceededError):
+        await ProviderQuota(redis).consume()
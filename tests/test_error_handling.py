@@ -2,14 +2,14 @@ import pytest
 from fastapi.testclient import TestClient
 from app.main import app
 from app.core.exceptions import ProviderTimeoutError, AddressProviderError, DailyQuotaExceededError
-from app.core.dependencies import validate_api_key, get_redis
+from app.core.dependencies import get_api_key, get_redis
 from unittest.mock import AsyncMock, patch
 
 client = TestClient(app, raise_server_exceptions=False)
 
 @pytest.fixture(autouse=True)
 def override_deps():
-    app.dependency_overrides[validate_api_key] = lambda: "test_key"
+    app.dependency_overrides[get_api_key] = lambda: "test_key"
     mock_redis = AsyncMock()
     mock_redis.incr.return_value = 1
     mock_redis.get.return_value = None # Cache miss by default
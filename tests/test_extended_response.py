@@ -0,0 +1,79 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import AsyncMock, patch
+from app.main import app
+from app.core.dependencies import get_api_key, get_redis
+from app.schemas import AddressCandidate, AddressDetails, AddressMetadata, StandardizedAddress
+from app.services.cache_service import AddressCacheService
+from app.services.validate_address_service import candidates_requested
+
+ADDRESS = "130 Jackson St 07055"
+METADATA = AddressMetadata(latitude=40.83, longitude=-74.1, precision="Zip9", rdi="Commercial", dpv_match_code="Y")
+
+def enriched() -> StandardizedAddress:
+    result = StandardizedAddress(street="130 Jackson St", city="East Rutherford", state="NJ", zip_code="07073-1234")
+    result.details = AddressDetails(
+        metadata=METADATA,
+        candidates=[AddressCandidate(standardized=result.model_copy(), metadata=METADATA)],
+    )
+    return result
+
+@pytest.fixture
+async def redis(redis):
+    app.dependency_overrides[get_api_key] = lambda: "test_key"
+    app.dependency_overrides[get_redis] = lambda: redis
+    yield redis
+    app.dependency_overrides = {}
+
+async def post(address_raw: str, **body):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        return await ac.post("/v1/validate-address", json={"address_raw": address_raw, **body})
+
+@patch("app.api.v1.endpoints.address.validate_address_service", new_callable=AsyncMock)
+async def test_details_cached_only_by_extended_lookups(mock_service, redis):
+    requested = []
+
+    async def lookup(address, redis):
+        requested.append(candidates_requested.get())
+        return enriched()
+
+    mock_service.side_effect = lookup
+
+    basic = await post(ADDRESS)
+    assert "details" not in basic.json()["data"]
+
+    # A basic lookup asked for a single candidate, so its details were not cached
+    extended = await post(ADDRESS, extended=True)
+    again = await post(ADDRESS, extended=True)
+    assert requested == [False, True]
+    assert again.json() == extended.json()
+    data = extended.json()["data"]
+    assert data["standardized"] == basic.json()["data"]["standardized"]
+    assert data["details"]["metadata"]["rdi"] == "Commercial"
+    assert data["details"]["candidates"][0]["standardized"]["street"] == "130 Jackson St"
+    assert extended.headers["etag"] != basic.headers["etag"]
+
+@patch("app.api.v1.endpoints.address.validate_address_service", new_callable=AsyncMock)
+async def test_entry_without_details_is_refreshed_once(mock_service, redis):
+    # Cached before enrichment existed
+    await AddressCacheService(redis).cache_address(ADDRESS, '{"street":"130 Jackson St","city":"East Rutherford","state":"NJ","zip_code":"07073-1234"}')
+    mock_service.return_value = enriched()
+
+    assert "details" not in (await post(ADDRESS)).json()["data"]
+    mock_service.assert_not_awaited()
+
+    first = await post(ADDRESS, extended=True)
+    second = await post(ADDRESS, extended=True)
+    mock_service.assert_awaited_once()
+    assert first.json() == second.json()
+    assert second.json()["data"]["details"]["metadata"]["latitude"] == 40.83
+
+@patch("app.api.v1.endpoints.address.validate_address_service", new_callable=AsyncMock)
+async def test_provider_without_details_returns_null(mock_service, redis):
+    mock_service.return_value = StandardizedAddress(street="1 Main St", city="Springfield", state="IL", zip_code="62701-0001")
+    response = await post("1 Main St 62701", extended=True)
+    assert response.json()["data"]["details"] is None
+
+def test_extended_shape_is_documented():
+    response = app.openapi()["paths"]["/v1/validate-address"]["post"]["responses"]["200"]
+    assert response["content"]["application/json"]["schema"]["$ref"].endswith("APIResponse_ExtendedAddressResponse_")
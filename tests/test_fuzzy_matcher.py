@@ -0,0 +1,129 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.api.v1.endpoints.address import validate_address
+from app.core.metrics import metrics
+from app.schemas import AddressRequest, StandardizedAddress
+from app.services import fuzzy_matcher as fuzzy_module
+from app.services.cache_service import AddressCacheService
+from app.services.fuzzy_matcher import FuzzyMatcher, query_signature
+from app.services.input_processor import AddressInputProcessor
+
+JACKSON = StandardizedAddress(street="130 Jackson St", city="East Rutherford", state="NJ", zip_code="07073-1234")
+processor = AddressInputProcessor()
+
+def canonical(address: str) -> str:
+    return processor.process(address).canonical_key
+
+async def seed(redis, address: str, result: StandardizedAddress = JACKSON) -> str:
+    """Caches and indexes `result` as the provider answer for `address`."""
+    cache = AddressCacheService(redis)
+    key = cache.generate_cache_key(processor.process(address).sanitized_input)
+    await cache.cache_address(processor.process(address).sanitized_input, result)
+    await FuzzyMatcher(redis).index(canonical(address), key, result)
+    return key
+
+def test_query_signature_blocks_on_zip_and_house_number():
+    signature = query_signature(canonical("130 Jakson St Apt 5 07055"))
+    assert signature.zip_code == "07055"
+    assert signature.house_number == "130"
+    assert signature.numbers == "130 5"
+    assert signature.words == "jakson street apartment"
+    # Nothing to block on
+    assert query_signature(canonical("Jackson St 07055")) is None
+    assert query_signature(canonical("130 Jackson St")) is None
+
+async def test_typo_matches_cached_address(redis):
+    key = await seed(redis, "130 Jackson St 07055")
+    match = await FuzzyMatcher(redis).lookup(canonical("130 Jakson St 07055"))
+    assert match == (key, JACKSON.model_dump_json())
+    assert metrics.get("fuzzy_lookup_total", outcome="hit") == 1
+
+async def test_standardized_zip_is_indexed_too(redis):
+    await seed(redis, "130 Jackson St 07055")
+    # The provider corrected the ZIP to 07073; inputs using it still find the entry
+    assert await FuzzyMatcher(redis).lookup(canonical("130 Jackson Street East Rutherfrd NJ 07073")) is not None
+
+@pytest.mark.parametrize("address", [
+    "130 Main St 07055",            # different street
+    "132 Jakson St 07055",          # different house number
+    "130 Jakson St Apt 6 07055",    # unit numbers are never fuzzed
+    "130 Jakson St 07056",          # different ZIP
+])
+async def test_no_match_for_different_addresses(redis, address):
+    await seed(redis, "130 Jackson St 07055")
+    assert await FuzzyMatcher(redis).lookup(canonical(address)) is None
+
+async def test_ambiguous_candidates_are_not_matched(redis):
+    await seed(redis, "130 Jackson St 07055")
+    await seed(redis, "130 Jackman St 07055", StandardizedAddress(
+        street="130 Jackman St", city="East Rutherford", state="NJ", zip_code="07073-1111"))
+    assert await FuzzyMatcher(redis, threshold=0.8).lookup(canonical("130 Jacksman St 07055")) is None
+    assert metrics.get("fuzzy_ambiguous_total") == 1
+
+async def test_threshold_is_tunable(redis):
+    await seed(redis, "130 Jackson St 07055")
+    assert await FuzzyMatcher(redis, threshold=0.99).lookup(canonical("130 Jakson St 07055")) is None
+
+async def test_expired_entry_is_dropped_from_block(redis):
+    key = await seed(redis, "130 Jackson St 07055")
+    await redis.delete(key)
+    matcher = FuzzyMatcher(redis)
+    assert await matcher.lookup(canonical("130 Jakson St 07055")) is None
+    assert not await redis.hexists(matcher.block_key("07055", "130"), key)
+
+async def test_lookup_fails_open():
+    redis = AsyncMock()
+    redis.hgetall.side_effect = ConnectionError("down")
+    assert await FuzzyMatcher(redis, reader=redis).lookup(canonical("130 Jakson St 07055")) is None
+
+@pytest.mark.parametrize("cached, typed", [
+    ("130 N Main St", "130 S Main St"),
+    ("130 E Washington St", "130 W Washington St"),
+    ("130 NE Main St", "130 SE Main St"),
+    ("130 Main Ave", "130 Main St"),
+    ("130 Main St Apt 5", "130 Main St Ste 5"),
+    ("130 Main St", "130 N Main St"),
+])
+async def test_directionals_suffixes_and_units_must_match(redis, cached, typed):
+    result = StandardizedAddress(street=cached, city="East Rutherford", state="NJ", zip_code="07073-1234")
+    await seed(redis, f"{cached} 07055", result)
+    assert await FuzzyMatcher(redis).lookup(canonical(f"{typed} 07055")) is None
+
+async def test_directional_in_city_does_not_block_match(redis):
+    key = await seed(redis, "130 Jackson St 07055")
+    assert (await FuzzyMatcher(redis).lookup(canonical("130 Jakson St East Rutherford NJ 07055")))[0] == key
+
+def test_fuzzy_lookup_is_off_by_default():
+    from app.core.config import Settings
+    assert Settings.model_fields["FUZZY_MATCH_ENABLED"].default is False
+
+@patch("app.api.v1.endpoints.address.settings.FUZZY_MATCH_ENABLED", True)
+@patch("app.api.v1.endpoints.address.validate_address_service", new_callable=AsyncMock)
+async def test_endpoint_serves_typo_without_provider_call(mock_service, redis):
+    mock_service.return_value = JACKSON
+    await validate_address(AddressRequest(address_raw="130 Jackson St 07055"), redis, "test_key")
+    mock_service.assert_awaited_once()
+
+    with patch("app.api.v1.endpoints.address.settings.FUZZY_VERIFY_SAMPLE_RATE", 0.0):
+        response = await validate_address(AddressRequest(address_raw="130 Jakson St 07055"), redis, "test_key")
+    mock_service.assert_awaited_once()
+    assert JACKSON.model_dump_json().encode() in response.body
+
+    # The typo is now an exact cache hit of its own
+    cache = AddressCacheService(redis)
+    assert await cache.get_cached_fragment("130 Jakson St 07055") == JACKSON.model_dump_json()
+
+async def test_sampled_verification_counts_false_matches(redis):
+    await seed(redis, "130 Jackson St 07055")
+    actual = StandardizedAddress(street="130 Jakson St", city="Newark", state="NJ", zip_code="07055-0001")
+    provider = AsyncMock(return_value=actual)
+    repair = AsyncMock()
+
+    matcher = FuzzyMatcher(redis)
+    _, fragment = await matcher.lookup(canonical("130 Jakson St 07055"))
+    matcher.verify_later(provider(), fragment, repair)
+    await next(iter(fuzzy_module._verifications))
+
+    assert metrics.get("fuzzy_verified_total") == 1
+    assert metrics.get("fuzzy_false_match_total") == 1
+    repair.assert_awaited_once_with(actual)
@@ -1,6 +1,23 @@
 import pytest
+from unittest.mock import AsyncMock, patch
 from httpx import AsyncClient, ASGITransport
 from app.main import app
+from app.api.deps import get_redis
+from app.core.config import settings
+from app.services.health_service import readiness_checker
+
+@pytest.fixture
+async def redis(redis):
+    app.dependency_overrides[get_redis] = lambda: redis
+    readiness_checker.reset()
+    yield redis
+    app.dependency_overrides = {}
+    readiness_checker.reset()
+
+async def get(path: str):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        return await ac.get(path)
 
 @pytest.mark.asyncio
 async def test_health_check():
@@ -15,3 +32,63 @@ async def test_health_check():
         response = await ac.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
+
+async def test_liveness():
+    response = await get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+async def test_readiness_reports_dependency_latency(redis):
+    response = await get("/v1/health/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert body["checks"]["redis"]["status"] == "ok"
+    assert body["checks"]["redis"]["latency_ms"] >= 0
+    assert body["checks"]["event_loop"]["lag_ms"] >= 0
+    assert body["checks"]["providers"] == {"smarty": {"circuit": "closed"}}
+
+async def test_readiness_fails_when_redis_is_down(redis):
+    redis.ping = AsyncMock(side_effect=ConnectionError("Connection refused"))
+    response = await get("/health/ready")
+    assert response.status_code == 503
+    body = response.json()
+    assert body["status"] == "not_ready"
+    assert body["checks"]["redis"] == {"status": "down", "error": "Connection refused"}
+
+async def test_readiness_fails_when_redis_is_slow(redis):
+    with patch.object(settings, "HEALTH_MAX_REDIS_LATENCY", -1):
+        response = await get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["redis"]["status"] == "slow"
+
+async def test_readiness_fails_when_event_loop_lags(redis):
+    with patch.object(settings, "HEALTH_MAX_LOOP_LAG", -1):
+        response = await get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["event_loop"]["status"] == "slow"
+
+async def test_open_circuit_degrades_but_keeps_pod_in_rotation(redis):
+    await redis.set("circuit:{smarty}:open", "1")
+    response = await get("/health/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "degraded"
+    assert body["checks"]["providers"]["smarty"]["circuit"] == "open"
+
+async def test_readiness_results_are_cached(redis):
+    ping = redis.ping
+
+    async def counted_ping():
+        return await ping()
+
+    redis.ping = AsyncMock(side_effect=counted_ping)
+    first = (await get("/health/ready")).json()
+    second = (await get("/health/ready")).json()
+    assert redis.ping.await_count == 1
+    assert first["age_ms"] == 0
+    assert second["checks"] == first["checks"]
+
+    with patch.object(settings, "HEALTH_CACHE_SECONDS", 0):
+        await get("/health/ready")
+    assert redis.ping.await_count == 2
@@ -0,0 +1,153 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import AsyncMock, patch
+from app.main import app
+from app.core.dependencies import get_api_key, get_redis
+from app.core.middleware import (
+    CompressionMiddleware,
+    ConditionalRequestMiddleware,
+    ZSTD_AVAILABLE,
+    accepted_encodings,
+    etag_matches,
+)
+from app.schemas import StandardizedAddress
+
+RESULT = StandardizedAddress(street="130 Jackson St", city="East Rutherford", state="NJ", zip_code="07073-1234")
+
+def small_app(body: str, etag: str | None = None) -> FastAPI:
+    test_app = FastAPI()
+
+    @test_app.get("/")
+    async def index():
+        return PlainTextResponse(body, headers={"ETag": etag} if etag else None)
+
+    test_app.add_middleware(ConditionalRequestMiddleware)
+    test_app.add_middleware(CompressionMiddleware, minimum_size=100)
+    return test_app
+
+async def get(test_app, path: str = "/", **headers):
+    async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as ac:
+        return await ac.get(path, headers=headers)
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, deflate, br;q=0.5, zstd;q=0") == {"gzip", "deflate", "br"}
+    assert accepted_encodings("") == set()
+
+def test_etag_matching_is_weak():
+    assert etag_matches('W/"abc"', 'W/"abc"')
+    assert etag_matches('"xyz", "abc"', 'W/"abc"')
+    assert etag_matches("*", 'W/"abc"')
+    assert not etag_matches('W/"abd"', 'W/"abc"')
+
+async def test_small_responses_are_not_compressed():
+    response = await get(small_app("x" * 50), **{"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.text == "x" * 50
+
+async def test_large_responses_are_gzipped():
+    test_app = small_app("address " * 500)
+    with patch("app.core.middleware.ZSTD_AVAILABLE", False):
+        response = await get(test_app, **{"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert int(response.headers["content-length"]) < 4000
+    assert response.text == "address " * 500
+
+async def test_streamed_responses_are_gzipped_chunk_by_chunk():
+    test_app = FastAPI()
+
+    @test_app.get("/")
+    async def index():
+        async def chunks():
+            for n in range(3):
+                yield f"chunk {n} ".encode() * 100
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    test_app.add_middleware(CompressionMiddleware, minimum_size=100, zstd=False)
+    response = await get(test_app, **{"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == "".join(f"chunk {n} " * 100 for n in range(3))
+
+async def test_identity_when_client_does_not_accept_compression():
+    response = await get(small_app("address " * 500), **{"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+@pytest.mark.skipif(not ZSTD_AVAILABLE, reason="zstandard is not installed")
+async def test_zstd_preferred_when_accepted():
+    import zstandard
+
+    test_app = FastAPI()
+
+    @test_app.get("/")
+    async def index():
+        return PlainTextResponse("address " * 500)
+
+    test_app.add_middleware(CompressionMiddleware, minimum_size=100)
+    async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as ac:
+        async with ac.stream("GET", "/", headers={"Accept-Encoding": "gzip, zstd"}) as response:
+            # Undecoded: httpx would otherwise decompress zstd itself
+            body = b"".join([chunk async for chunk in response.aiter_raw()])
+    assert response.headers["content-encoding"] == "zstd"
+    assert zstandard.ZstdDecompressor().decompress(body).decode() == "address " * 500
+
+async def test_matching_if_none_match_returns_304():
+    test_app = small_app("address " * 500, etag='W/"v1"')
+    response = await get(test_app, **{"If-None-Match": 'W/"v1"', "Accept-Encoding": "gzip"})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == 'W/"v1"'
+
+    response = await get(test_app, **{"If-None-Match": 'W/"v0"'})
+    assert response.status_code == 200
+    assert response.text == "address " * 500
+
+@pytest.fixture
+async def redis(redis):
+    app.dependency_overrides[get_api_key] = lambda: "test_key"
+    app.dependency_overrides[get_redis] = lambda: redis
+    yield redis
+    app.dependency_overrides = {}
+
+async def post(address_raw: str, **headers):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        return await ac.post("/v1/validate-address", json={"address_raw": address_raw}, headers=headers)
+
+async def get_address(address_raw: str, **headers):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        return await ac.get("/v1/validate-address", params={"address_raw": address_raw}, headers=headers)
+
+@patch("app.api.v1.endpoints.address.validate_address_service", new_callable=AsyncMock)
+async def test_validated_address_etag_is_stable_and_conditional(mock_service, redis):
+    mock_service.return_value = RESULT
+
+    miss = await post("130 Jackson St East Rutherford NJ")
+    hit = await post("East Rutherford NJ 130 Jackson St")
+
+    etag = miss.headers["etag"]
+    assert etag.startswith('W/"')
+    # Same cache key and result: the provider answer and the later cache hit agree
+    assert hit.headers["etag"] == etag
+    assert miss.headers["cache-control"] == "private, max-age=86400"
+    mock_service.assert_awaited_once()
+
+    not_modified = await get_address("130 Jackson St East Rutherford NJ", **{"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+@patch("app.api.v1.endpoints.address.validate_address_service", new_callable=AsyncMock)
+async def test_post_ignores_if_none_match(mock_service, redis):
+    mock_service.return_value = RESULT
+    etag = (await post("130 Jackson St East Rutherford NJ")).headers["etag"]
+
+    response = await post("130 Jackson St East Rutherford NJ", **{"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["data"]["standardized"]["street"] == "130 Jackson St"
+
+async def test_invalid_input_has_no_etag(redis):
+    response = await post("123")
+    assert response.status_code == 200
+    assert "etag" not in response.headers
@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from app.core.metrics import metrics
+from app.services.lookup_batcher import LookupBatcher
+
+class FakeLookup:
+    def __init__(self, street):
+        self.street = street
+        self.input_id = None
+        self.result = []
+
+def fake_client():
+    client = MagicMock()
+
+    def send_lookup(lookup):
+        lookup.result = [f"single:{lookup.street}"]
+
+    def send_batch(batch):
+        for lookup in batch:
+            lookup.result = [f"batch:{lookup.street}"]
+
+    client.send_lookup.side_effect = send_lookup
+    client.send_batch.side_effect = send_batch
+    return client
+
+def test_window_adapts_to_arrival_rate():
+    batcher = LookupBatcher(MagicMock(), max_size=10, max_wait=0.01)
+    # No history: nothing to wait for
+    assert batcher.window() == 0.0
+    # 50/s: under one more lookup expected within 10ms
+    batcher._mean_gap = 0.02
+    assert batcher.window() == 0.0
+    # 200/s: two expected within the window; wait all of it
+    batcher._mean_gap = 0.005
+    assert batcher.window() == 0.01
+    # 10000/s: a batch fills in 0.9ms, so no need to wait longer
+    batcher._mean_gap = 0.0001
+    assert batcher.window() == pytest.approx(0.0009)
+
+@pytest.mark.asyncio
+async def test_lone_lookup_is_sent_immediately():
+    client = fake_client()
+    batcher = LookupBatcher(client, max_size=10, max_wait=1.0)
+    lookup = FakeLookup("130 Jackson St")
+
+    await asyncio.wait_for(batcher.submit(lookup), timeout=0.5)
+
+    assert lookup.result == ["single:130 Jackson St"]
+    client.send_batch.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_batch_under_load():
+    client = fake_client()
+    batcher = LookupBatcher(client, max_size=10, max_wait=0.05)
+    batcher._mean_gap = 0.001  # ~1000 lookups/s observed
+    lookups = [FakeLookup(f"{n} Main St") for n in range(4)]
+
+    await asyncio.gather(*(batcher.submit(lookup) for lookup in lookups))
+
+    client.send_batch.assert_called_once()
+    client.send_lookup.assert_not_called()
+    assert [lookup.result for lookup in lookups] == [[f"batch:{n} Main St"] for n in range(4)]
+    assert metrics.get("provider_batches_total") == 1
+    assert metrics.get("provider_batched_lookups_total") == 4
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting_for_the_window():
+    client = fake_client()
+    batcher = LookupBatcher(client, max_size=3, max_wait=10.0)
+    batcher._mean_gap = 0.001
+    lookups = [FakeLookup(f"{n} Main St") for n in range(3)]
+
+    await asyncio.wait_for(asyncio.gather(*(batcher.submit(lookup) for lookup in lookups)), timeout=1.0)
+
+    client.send_batch.assert_called_once()
+    assert len(client.send_batch.call_args.args[0]) == 3
+
+@pytest.mark.asyncio
+async def test_batch_failure_reaches_every_caller():
+    client = fake_client()
+    client.send_batch.side_effect = RuntimeError("connection reset")
+    batcher = LookupBatcher(client, max_size=10, max_wait=0.01)
+    batcher._mean_gap = 0.001
+
+    results = await asyncio.gather(
+        *(batcher.submit(FakeLookup(f"{n} Main St")) for n in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+@pytest.mark.asyncio
+async def test_timed_out_caller_does_not_break_the_batch():
+    client = fake_client()
+    batcher = LookupBatcher(client, max_size=10, max_wait=0.05)
+    batcher._mean_gap = 0.001
+    impatient, patient = FakeLookup("1 Main St"), FakeLookup("2 Main St")
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(batcher.submit(impatient), timeout=0.001)
+    await batcher.submit(patient)
+
+    assert patient.result == ["batch:2 Main St"]
@@ -0,0 +1,37 @@
+import asyncio
+import logging
+import time
+from app.core.loop_monitor import LoopMonitor
+from app.core.metrics import metrics
+
+def blocking_call(seconds: float):
+    time.sleep(seconds)
+
+async def test_reports_lag_and_logs_blocking_stack(caplog):
+    monitor = LoopMonitor(interval=0.02, threshold=0.05)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        with caplog.at_level(logging.WARNING, logger="app.core.loop_monitor"):
+            blocking_call(0.3)
+            await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    assert monitor.max_lag >= 0.2
+    assert metrics.get("event_loop_lag_max_seconds") >= 0.2
+    # One report for one stall, pointing at the blocking frame
+    assert metrics.get("event_loop_blocked_total") == 1
+    assert "blocking_call" in caplog.text
+
+async def test_quiet_loop_is_not_reported(caplog):
+    monitor = LoopMonitor(interval=0.02, threshold=0.2)
+    with caplog.at_level(logging.WARNING, logger="app.core.loop_monitor"):
+        monitor.start()
+        await asyncio.sleep(0.15)
+        await monitor.stop()
+
+    assert monitor.running is False
+    assert metrics.get("event_loop_blocked_total") == 0
+    assert "blocked" not in caplog.text
+    assert monitor.lag < 0.2
@@ -0,0 +1,43 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app.main import app
+from app.core.metrics import Metrics, metrics
+
+def test_counters_and_gauges():
+    registry = Metrics()
+    registry.increment("requests_total", route="a")
+    registry.increment("requests_total", 2, route="a")
+    registry.set_gauge("queue_depth", 4)
+
+    assert registry.get("requests_total", route="a") == 3
+    assert registry.get("requests_total", route="b") == 0
+    assert registry.render() == (
+        "# TYPE requests_total counter\n"
+        'requests_total{route="a"} 3\n'
+        "# TYPE queue_depth gauge\n"
+        "queue_depth 4\n"
+    )
+
+def test_render_keeps_full_precision():
+    registry = Metrics()
+    registry.increment("bytes_total", 123456789)
+    registry.set_gauge("hit_ratio", 0.123456789)
+    registry.set_gauge("budget", float("inf"))
+
+    assert registry.render().splitlines()[1:] == [
+        "bytes_total 123456789",
+        "# TYPE budget gauge",
+        "budget +Inf",
+        "# TYPE hit_ratio gauge",
+        "hit_ratio 0.123456789",
+    ]
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint():
+    metrics.increment("test_endpoint_total")
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.get("/v1/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "test_endpoint_total" in response.text
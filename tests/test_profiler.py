@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app.main import app
+from app.api.deps import get_redis
+from app.core.dependencies import ALLOWED_KEYS_SET, ADMIN_KEYS_SET
+from app.core.profiler import SamplingProfiler, profile
+from app.core.security import hash_key
+
+def busy_parse(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+async def waiting_on_provider():
+    await asyncio.sleep(1)
+
+async def test_cpu_profile_collects_working_threads():
+    profiler = SamplingProfiler(interval=0.002)
+    profiler.start()
+    await asyncio.to_thread(busy_parse, 0.2)
+    profiler.stop()
+
+    stacks = profiler.collapsed().splitlines()
+    busy = [line for line in stacks if line.rsplit(" ", 1)[0].endswith("test_profiler:busy_parse")]
+    assert busy
+    stack, count = busy[0].rsplit(" ", 1)
+    assert stack.startswith("thread:")
+    assert int(count) > 0
+
+async def test_wall_profile_includes_suspended_tasks():
+    task = asyncio.create_task(waiting_on_provider())
+    await asyncio.sleep(0)
+    profiler = SamplingProfiler(interval=0.002, mode="wall", loop=asyncio.get_running_loop())
+    profiler.start()
+    await asyncio.sleep(0.05)
+    profiler.stop()
+    task.cancel()
+
+    assert "test_profiler:waiting_on_provider;asyncio.tasks:sleep" in profiler.collapsed()
+
+async def test_cpu_profile_of_idle_worker_is_empty():
+    # A parked asyncio.to_thread worker and a second event loop thread with nothing to do
+    await asyncio.to_thread(time.sleep, 0)
+    stop = threading.Event()
+    loop_thread = threading.Thread(target=asyncio.run, args=(asyncio.to_thread(stop.wait),), daemon=True)
+    loop_thread.start()
+    try:
+        await asyncio.sleep(0.05)
+        assert await profile(0.2, interval=0.002) == ""
+    finally:
+        stop.set()
+        loop_thread.join()
+
+async def test_one_profile_at_a_time():
+    first = asyncio.create_task(profile(0.1))
+    await asyncio.sleep(0.01)
+    with pytest.raises(RuntimeError):
+        await profile(0.1)
+    await first
+
+@pytest.fixture
+async def redis(redis):
+    await redis.sadd(ALLOWED_KEYS_SET, hash_key("user_key"), hash_key("admin_key"))
+    await redis.sadd(ADMIN_KEYS_SET, hash_key("admin_key"))
+    app.dependency_overrides[get_redis] = lambda: redis
+    yield redis
+    app.dependency_overrides = {}
+
+async def get_profile(key: str | None, **params):
+    transport = ASGITransport(app=app)
+    headers = {"X-API-Key": key} if key else {}
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        return await ac.get("/v1/admin/profile", params=params, headers=headers)
+
+async def test_profile_endpoint_requires_admin_key(redis):
+    assert (await get_profile(None, seconds=0.05)).status_code == 403
+    assert (await get_profile("unknown_key", seconds=0.05)).json() == {"detail": "Invalid API Key"}
+    response = await get_profile("user_key", seconds=0.05)
+    assert response.status_code == 403
+    assert response.json() == {"detail": "Admin API Key required"}
+
+async def test_profile_endpoint_returns_collapsed_stacks(redis):
+    response = await get_profile("admin_key", seconds=0.1, interval_ms=2, mode="wall")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    for line in response.text.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert stack and int(count) > 0
+
+async def test_profile_endpoint_bounds_duration(redis):
+    assert (await get_profile("admin_key", seconds=120)).status_code == 422
@@ -0,0 +1,151 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.interfaces.validator import AddressValidator
+from app.core.exceptions import AddressProviderError
+from app.schemas import StandardizedAddress
+from app.services.provider_router import ProviderRouter, ProviderStats, create_validator
+
+def make_address(street: str) -> StandardizedAddress:
+    return StandardizedAddress(street=street, city="City", state="ST", zip_code="12345-6789")
+
+class FakeProvider(AddressValidator):
+    def __init__(self, name: str, delay: float = 0.0, error: Exception | None = None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    async def validate(self, address: str) -> StandardizedAddress | None:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return make_address(self.name)
+
+def seeded_stats(**latencies: float) -> dict[str, ProviderStats]:
+    stats = {}
+    for name, latency in latencies.items():
+        stats[name] = ProviderStats()
+        for _ in range(ProviderStats.MIN_SAMPLES):
+            stats[name].record(latency)
+    return stats
+
+class TestProviderStats:
+    def test_unmeasured_provider_ranks_first(self):
+        stats = seeded_stats(slow=0.5)
+        assert stats["slow"].score() > ProviderStats().score()
+
+    def test_errors_inflate_score(self):
+        stats = seeded_stats(a=0.1, b=0.1)
+        stats["b"].record(0.1, error=True)
+        assert stats["b"].score() > stats["a"].score()
+
+    def test_percentile(self):
+        stats = ProviderStats()
+        for latency in range(1, 101):
+            stats.record(latency / 100)
+        assert stats.percentile(0.95) == pytest.approx(0.96)
+
+class TestProviderRouter:
+    @pytest.mark.asyncio
+    async def test_picks_fastest_provider(self):
+        fast, slow = FakeProvider("fast"), FakeProvider("slow")
+        router = ProviderRouter({"slow": slow, "fast": fast}, stats=seeded_stats(slow=0.5, fast=0.01))
+
+        result = await router.validate("123 Main St")
+
+        assert result.street == "fast"
+        assert slow.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_hedge_fires_after_p95_and_cancels_loser(self):
+        primary = FakeProvider("primary", delay=1.0)
+        backup = FakeProvider("backup", delay=0.0)
+        router = ProviderRouter(
+            {"primary": primary, "backup": backup},
+            stats=seeded_stats(primary=0.01, backup=0.02),
+            hedge=True,
+            hedge_min_delay=0.01,
+        )
+
+        result = await router.validate("123 Main St")
+
+        assert result.street == "backup"
+        assert primary.calls == 1 and backup.calls == 1
+        # The losing call is cancelled without the caller waiting on it
+        await asyncio.sleep(0)
+        assert primary.cancelled
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_when_primary_is_fast(self):
+        primary = FakeProvider("primary")
+        backup = FakeProvider("backup")
+        router = ProviderRouter(
+            {"primary": primary, "backup": backup},
+            stats=seeded_stats(primary=0.01, backup=0.02),
+            hedge=True,
+            hedge_min_delay=0.5,
+        )
+
+        result = await router.validate("123 Main St")
+
+        assert result.street == "primary"
+        assert backup.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_hedge_covers_primary_failure(self):
+        primary = FakeProvider("primary", error=AddressProviderError("down"))
+        backup = FakeProvider("backup")
+        stats = seeded_stats(primary=0.01, backup=0.02)
+        router = ProviderRouter({"primary": primary, "backup": backup}, stats=stats, hedge=True)
+
+        result = await router.validate("123 Main St")
+
+        assert result.street == "backup"
+        assert stats["primary"].error_rate > 0
+
+    @pytest.mark.asyncio
+    async def test_all_providers_fail(self):
+        router = ProviderRouter(
+            {
+                "a": FakeProvider("a", error=AddressProviderError("a down")),
+                "b": FakeProvider("b", error=AddressProviderError("b down")),
+            },
+            stats=seeded_stats(a=0.01, b=0.02),
+            hedge=True,
+        )
+
+        with pytest.raises(AddressProviderError):
+            await router.validate("123 Main St")
+
+class TestCreateValidator:
+    def test_single_provider_is_used_directly(self):
+        with patch("app.services.provider_router.settings") as mock_settings:
+            mock_settings.ADDRESS_PROVIDERS = ["fake"]
+            validator = create_validator({"fake": lambda redis: FakeProvider("fake")}, redis=None)
+        assert isinstance(validator, FakeProvider)
+
+    def test_multiple_providers_are_routed(self):
+        with patch("app.services.provider_router.settings") as mock_settings:
+            mock_settings.ADDRESS_PROVIDERS = ["a", "b"]
+            mock_settings.PROVIDER_HEDGING_ENABLED = True
+            mock_settings.PROVIDER_HEDGE_MIN_DELAY = 0.05
+            mock_settings.PROVIDER_HEDGE_MAX_DELAY = 1.0
+            validator = create_validator(
+                {"a": lambda redis: FakeProvider("a"), "b": lambda redis: FakeProvider("b")},
+                redis=None,
+            )
+        assert isinstance(validator, ProviderRouter)
+        assert validator.hedge is True
+
+    def test_unknown_provider(self):
+        with patch("app.services.provider_router.settings") as mock_settings:
+            mock_settings.ADDRESS_PROVIDERS = ["missing"]
+            with pytest.raises(ValueError):
+                create_validator({}, redis=None)
@@ -0,0 +1,148 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.core.exceptions import DailyQuotaExceededError
+from app.core.metrics import metrics
+from app.services.quota import BULK, LEGACY_DAY_KEY, Caller, ProviderQuota, current_caller, set_caller
+
+@pytest.fixture
+async def quota(redis, monkeypatch):
+    monkeypatch.setattr("app.services.quota._legacy_seeded_day", None)
+    with patch("app.services.quota.settings.SMARTY_DAILY_LIMIT", 10), \
+         patch("app.services.quota.settings.QUOTA_INTERACTIVE_RESERVE", 0.2):
+        yield ProviderQuota(redis)
+
+async def consume_until_rejected(quota: ProviderQuota, caller: Caller, attempts: int = 20) -> tuple[int, str]:
+    for used in range(attempts):
+        try:
+            await quota.consume(caller)
+        except DailyQuotaExceededError as e:
+            return used, e.message
+    return attempts, ""
+
+async def test_global_limit(quota):
+    used, message = await consume_until_rejected(quota, Caller("a"))
+    assert used == 10
+    assert message == "Daily validation quota exceeded."
+    assert metrics.get("provider_quota_rejected_total", provider="smarty", reason="global") == 1
+
+async def test_per_key_daily_limit(quota):
+    await quota.set_policy("a", daily_limit=3)
+    used, message = await consume_until_rejected(quota, Caller("a"))
+    assert used == 3
+    assert "this API key" in message
+    # Other keys are unaffected
+    await quota.consume(Caller("b"))
+    assert await quota.usage() == {"a": 3, "b": 1}
+
+async def test_bulk_lane_leaves_interactive_reserve(quota):
+    await quota.set_policy("batch", lane=BULK)
+    used, message = await consume_until_rejected(quota, Caller("batch"))
+    # 20% of the 10-unit day stays with interactive callers
+    assert used == 8
+    assert "bulk" in message
+    used, _ = await consume_until_rejected(quota, Caller("web"))
+    assert used == 2
+    assert metrics.get("provider_quota_used_total", provider="smarty", lane="interactive") == 2
+
+async def test_requested_bulk_lane_is_honoured(quota):
+    used, _ = await consume_until_rejected(quota, Caller("web", BULK))
+    assert used == 8
+
+async def test_reserved_share_is_kept_for_its_owner(quota):
+    await quota.set_policy("partner", reserved=4)
+    used, _ = await consume_until_rejected(quota, Caller("web"))
+    assert used == 6
+    used, _ = await consume_until_rejected(quota, Caller("partner"))
+    assert used == 4
+
+async def test_reserved_owner_spills_into_shared_pool(quota):
+    await quota.set_policy("partner", reserved=2)
+    used, _ = await consume_until_rejected(quota, Caller("partner"))
+    assert used == 10
+
+async def test_set_policy_keeps_reserved_total(quota):
+    await quota.set_policy("a", reserved=3)
+    await quota.set_policy("b", reserved=2)
+    await quota.set_policy("a", reserved=1)
+    assert await quota.redis.get(quota.reserved_total_key) == "3"
+    with pytest.raises(ValueError):
+        await quota.set_policy("a", lane="express")
+
+async def test_reserved_shares_cannot_exceed_daily_limit(quota):
+    await quota.set_policy("a", reserved=6)
+    with pytest.raises(ValueError, match="6 already reserved"):
+        await quota.set_policy("b", reserved=5)
+    assert await quota.redis.exists(quota.policy_key("b")) == 0
+    # Moving share between keys within the limit is fine
+    await quota.set_policy("a", reserved=2)
+    await quota.set_policy("b", reserved=8)
+    assert await quota.redis.get(quota.reserved_total_key) == "10"
+
+async def test_offline_usage_draws_on_reserved_share(quota):
+    await quota.set_policy("partner", reserved=4)
+    await quota.consume(Caller("partner"))
+
+    await quota.add_usage({"partner": 5, "web": 2, "": 1})
+
+    day = quota._day_prefix()
+    assert await quota.used_today() == 9
+    # 1 online and 3 offline calls used up the share; the other 2 came from the shared pool
+    assert await quota.redis.get(f"{day}:reserved") == "4"
+    assert await quota.usage() == {"partner": 6, "web": 2}
+
+async def test_concurrent_consumers_never_overspend(quota):
+    async def attempt(i):
+        try:
+            await quota.consume(Caller(f"k{i % 3}"))
+            return True
+        except DailyQuotaExceededError:
+            return False
+
+    results = await asyncio.gather(*(attempt(i) for i in range(50)))
+    assert sum(results) == 10
+
+async def test_consume_uses_current_caller(quota):
+    await quota.set_policy("a", daily_limit=1)
+    set_caller("a")
+    try:
+        await quota.consume()
+        with pytest.raises(DailyQuotaExceededError):
+            await quota.consume()
+    finally:
+        current_caller.set(None)
+
+async def test_policy_update_keeps_unset_fields(quota):
+    await quota.set_policy("a", daily_limit=5, reserved=3, lane=BULK)
+    await quota.set_policy("a", lane="interactive")
+
+    assert await quota.redis.hgetall(quota.policy_key("a")) == {
+        "daily_limit": "5", "reserved": "3", "lane": "interactive",
+    }
+    assert await quota.redis.get(quota.reserved_total_key) == "3"
+
+async def test_legacy_day_counter_carried_over(quota):
+    # Spent by workers running the previous release earlier today
+    await quota.redis.set(LEGACY_DAY_KEY.format(day=quota._today()), 7)
+
+    used, _ = await consume_until_rejected(quota, Caller("a"))
+
+    assert used == 3
+    assert await quota.used_today() == 10
+    # Still counting for the old workers
+    assert await quota.redis.get(LEGACY_DAY_KEY.format(day=quota._today())) == "7"
+
+async def test_legacy_counter_carried_over_once(quota, monkeypatch):
+    legacy_key = LEGACY_DAY_KEY.format(day=quota._today())
+    await quota.redis.set(legacy_key, 3)
+    # Several workers starting at once each check the legacy counter
+    for _ in range(3):
+        monkeypatch.setattr("app.services.quota._legacy_seeded_day", None)
+        await quota._seed_from_legacy()
+    assert await quota.used_today() == 3
+
+    # Old workers kept counting; the next check carries only the difference
+    await quota.redis.set(legacy_key, 5)
+    monkeypatch.setattr("app.services.quota._legacy_seeded_day", None)
+    await quota.consume(Caller("a"))
+    assert await quota.used_today() == 6
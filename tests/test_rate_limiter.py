@@ -0,0 +1,174 @@
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, patch
+from app.core.dependencies import get_api_key, get_redis, require_within_rate
+from app.core.exceptions import ProviderRateLimitedError, RateLimitExceededError
+from app.core.metrics import metrics
+from app.main import app
+from app.services.rate_limiter import (
+    API_KEY_RATE_LIMITS_HASH,
+    GCRA_SCRIPT,
+    KeyRateLimiter,
+    RateLimit,
+    TokenBucketRateLimiter,
+)
+
+class TestTokenBucketRateLimiter:
+    @pytest.mark.asyncio
+    async def test_burst_within_capacity(self, redis):
+        limiter = TokenBucketRateLimiter(redis, "test", per_second=5, per_minute=0, max_wait=0)
+        for _ in range(5):
+            await limiter.acquire()
+        assert metrics.get("provider_rate_limit_rejected_total", provider="test") == 0
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_wait_too_long(self, redis):
+        limiter = TokenBucketRateLimiter(redis, "test", per_second=2, per_minute=0, max_wait=0.01)
+        await limiter.acquire()
+        await limiter.acquire()
+
+        with pytest.raises(ProviderRateLimitedError):
+            await limiter.acquire()
+        assert metrics.get("provider_rate_limit_rejected_total", provider="test") == 1
+
+    @pytest.mark.asyncio
+    async def test_waits_for_refill(self, redis):
+        limiter = TokenBucketRateLimiter(redis, "test", per_second=4, per_minute=0, max_wait=1.0)
+        for _ in range(4):
+            await limiter.acquire()
+
+        # Next token arrives within ~250ms; the caller waits rather than failing
+        await limiter.acquire()
+        assert metrics.get("provider_rate_limit_delayed_total", provider="test") == 1
+        assert metrics.get("provider_rate_limit_wait_seconds_total", provider="test") > 0
+
+    @pytest.mark.asyncio
+    async def test_minute_window_applies(self, redis):
+        limiter = TokenBucketRateLimiter(redis, "test", per_second=100, per_minute=3, max_wait=0.01)
+        for _ in range(3):
+            await limiter.acquire()
+
+        with pytest.raises(ProviderRateLimitedError):
+            await limiter.acquire()
+
+    @pytest.mark.asyncio
+    async def test_buckets_shared_across_instances(self, redis):
+        await TokenBucketRateLimiter(redis, "test", per_second=1, per_minute=0, max_wait=0).acquire()
+
+        with pytest.raises(ProviderRateLimitedError):
+            await TokenBucketRateLimiter(redis, "test", per_second=1, per_minute=0, max_wait=0).acquire()
+
+    @pytest.mark.asyncio
+    async def test_disabled(self):
+        redis = AsyncMock()
+        await TokenBucketRateLimiter(redis, "test", per_second=0, per_minute=0, max_wait=0).acquire()
+        redis.evalsha.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_fails_open(self):
+        redis = AsyncMock()
+        redis.evalsha.side_effect = ConnectionError("Redis down")
+        await TokenBucketRateLimiter(redis, "test", per_second=1, per_minute=0, max_wait=0).acquire()
+
+    def test_limits_reported(self, redis):
+        TokenBucketRateLimiter(redis, "test", per_second=7, per_minute=90, max_wait=0)
+        rendered = metrics.render()
+        assert 'provider_rate_limit{provider="test",window="second"} 7' in rendered
+        assert 'provider_rate_limit{provider="test",window="minute"} 90' in rendered
+
+class TestKeyRateLimiter:
+    def test_parse_limit(self):
+        assert RateLimit.parse("5:10") == RateLimit(5, 10)
+        assert RateLimit.parse("2.5") == RateLimit(2.5, 3)
+        assert str(RateLimit(5, 10)) == "5:10"
+
+    @pytest.mark.asyncio
+    async def test_burst_then_throttled(self, redis):
+        limiter = KeyRateLimiter(RateLimit(2, 3))
+        for _ in range(3):
+            assert await limiter.check(redis, "k") == 0
+
+        retry_after = await limiter.check(redis, "k")
+        # One request is emitted every 0.5s
+        assert 0 < retry_after <= 0.5
+        assert metrics.get("api_key_throttled_total") == 1
+        # Other keys have their own allowance
+        assert await limiter.check(redis, "other") == 0
+
+    @pytest.mark.asyncio
+    async def test_per_key_limit_overrides_default(self, redis):
+        await redis.hset(API_KEY_RATE_LIMITS_HASH, "k", "1:1")
+        limiter = KeyRateLimiter(RateLimit(100, 100))
+        assert await limiter.check(redis, "k") == 0
+        assert await limiter.check(redis, "k") > 0
+
+    @pytest.mark.asyncio
+    async def test_zero_rate_disables(self, redis):
+        await redis.hset(API_KEY_RATE_LIMITS_HASH, "k", "0")
+        limiter = KeyRateLimiter(RateLimit(1, 1))
+        for _ in range(5):
+            assert await limiter.check(redis, "k") == 0
+
+    @pytest.mark.asyncio
+    async def test_local_tokens_skip_round_trips(self, redis):
+        limiter = KeyRateLimiter(RateLimit(10, 10), local_tokens=5)
+        # Already cached by the server, so every reservation is one EVALSHA
+        await redis.script_load(GCRA_SCRIPT)
+        with patch.object(redis, "evalsha", wraps=redis.evalsha) as evals:
+            for _ in range(10):
+                assert await limiter.check(redis, "k") == 0
+            # Two reservations of five serve ten requests
+            assert evals.call_count == 2
+            assert await limiter.check(redis, "k") > 0
+
+    @pytest.mark.asyncio
+    async def test_shared_across_workers(self, redis):
+        await KeyRateLimiter(RateLimit(1, 1)).check(redis, "k")
+        assert await KeyRateLimiter(RateLimit(1, 1)).check(redis, "k") > 0
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_fails_open(self):
+        redis = AsyncMock()
+        redis.hget.side_effect = ConnectionError("Redis down")
+        assert await KeyRateLimiter(RateLimit(1, 1)).check(redis, "k") == 0
+
+    @pytest.mark.asyncio
+    async def test_throttled_check_raises_with_retry_after(self, redis):
+        limiter = KeyRateLimiter(RateLimit(1, 1))
+        require_within_rate(await limiter.check(redis, "k"))
+        with pytest.raises(RateLimitExceededError) as exc:
+            require_within_rate(await limiter.check(redis, "k"))
+        assert exc.value.headers == {"Retry-After": "1"}
+
+@pytest.mark.asyncio
+async def test_throttled_request_gets_429_with_retry_after(redis):
+    app.dependency_overrides[get_api_key] = lambda: "test_key"
+    app.dependency_overrides[get_redis] = lambda: redis
+    try:
+        with patch("app.core.dependencies.key_rate_limiter", KeyRateLimiter(RateLimit(1, 1))):
+            client = TestClient(app)
+            first = client.post("/v1/validate-address", json={"address_raw": "123"})
+            second = client.post("/v1/validate-address", json={"address_raw": "123"})
+    finally:
+        app.dependency_overrides = {}
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert second.headers["retry-after"] == "1"
+    assert second.json()["error"]["type"] == "rate_limited"
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("address", ["123", "130 Jackson St 07055"])
+async def test_unknown_keys_leave_no_rate_limit_state(redis, address):
+    app.dependency_overrides[get_api_key] = lambda: "unknown_key"
+    app.dependency_overrides[get_redis] = lambda: redis
+    limiter = KeyRateLimiter(RateLimit(1, 1))
+    try:
+        with patch("app.core.dependencies.key_rate_limiter", limiter):
+            response = TestClient(app).post("/v1/validate-address", json={"address_raw": address})
+    finally:
+        app.dependency_overrides = {}
+
+    assert response.status_code == 403
+    assert limiter._policies == {}
+    assert await redis.keys("ratelimit:*") == []
@@ -0,0 +1,93 @@
+import json
+import time
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.core.metrics import metrics
+from app.interfaces.validator import AddressValidator
+from app.schemas import AddressDetails, AddressMetadata, StandardizedAddress
+from app.services import recorded_provider
+from app.services.cache_service import AddressCacheService
+from app.services.recorded_provider import RecordingValidator, ReplayValidator, ResponseCorpus
+from app.services.validate_address_service import validate_address
+
+ADDRESS = "130 Jackson St East Rutherford NJ 07055"
+
+def jackson() -> StandardizedAddress:
+    result = StandardizedAddress(street="130 Jackson St", city="East Rutherford", state="NJ", zip_code="07073-1234")
+    result.details = AddressDetails(metadata=AddressMetadata(latitude=40.8, rdi="Commercial"), candidates=[])
+    return result
+
+class FakeProvider(AddressValidator):
+    def __init__(self, answers: dict):
+        self.answers = answers
+
+    async def validate(self, address: str):
+        return self.answers[address]
+
+@pytest.fixture
+def corpus_path(tmp_path):
+    path = str(tmp_path / "corpus.jsonl")
+    yield path
+    recorded_provider._corpora.pop(path, None)
+
+async def test_record_then_replay(corpus_path):
+    recorder = RecordingValidator(FakeProvider({ADDRESS: jackson(), "1 Nowhere Rd 99999": None}), ResponseCorpus(corpus_path))
+    assert await recorder.validate(ADDRESS) == jackson()
+    assert await recorder.validate("1 Nowhere Rd 99999") is None
+
+    # A fresh corpus, as another process would load it
+    replay = ReplayValidator(ResponseCorpus(corpus_path))
+    result = await replay.validate(ADDRESS)
+    assert result == jackson()
+    assert result.details.metadata.rdi == "Commercial"
+    assert await replay.validate("1 Nowhere Rd 99999") is None
+
+async def test_records_are_keyed_by_cache_key(corpus_path):
+    await RecordingValidator(FakeProvider({ADDRESS: jackson()}), ResponseCorpus(corpus_path)).validate(ADDRESS)
+    with open(corpus_path) as f:
+        [record] = [json.loads(line) for line in f]
+    assert record["cache_key"] == AddressCacheService(None).generate_cache_key(ADDRESS)
+    # Reordered input normalizes to the same key, so it replays too
+    assert await ReplayValidator(ResponseCorpus(corpus_path)).validate("07055 East Rutherford NJ 130 Jackson St") == jackson()
+
+async def test_provider_errors_are_not_recorded(corpus_path):
+    inner = AsyncMock(spec=AddressValidator)
+    inner.validate.side_effect = RuntimeError("provider down")
+    with pytest.raises(RuntimeError):
+        await RecordingValidator(inner, ResponseCorpus(corpus_path)).validate(ADDRESS)
+    assert len(ResponseCorpus(corpus_path)) == 0
+
+async def test_unrecorded_address_is_no_match(corpus_path):
+    assert await ReplayValidator(ResponseCorpus(corpus_path)).validate(ADDRESS) is None
+    assert metrics.get("provider_replayed_total", outcome="miss") == 1
+
+async def test_replays_cache_snapshots(corpus_path):
+    # The layout scripts/warm_cache.py --dump writes
+    key = AddressCacheService(None).generate_cache_key(ADDRESS)
+    with open(corpus_path, "w") as f:
+        f.write(json.dumps({"cache_key": key, "standardized": jackson().model_dump()}) + "\n")
+    result = await ReplayValidator(ResponseCorpus(corpus_path)).validate(ADDRESS)
+    assert result.street == "130 Jackson St"
+    assert result.details is None
+
+async def test_synthetic_latency(corpus_path):
+    replay = ReplayValidator(ResponseCorpus(corpus_path), latency_ms=30, jitter_ms=10)
+    assert all(0.02 <= replay.latency() <= 0.04 for _ in range(100))
+    start = time.perf_counter()
+    await replay.validate(ADDRESS)
+    assert time.perf_counter() - start >= 0.02
+
+async def test_selected_through_settings(corpus_path):
+    ResponseCorpus(corpus_path).add(AddressCacheService(None).generate_cache_key(ADDRESS), jackson())
+    with patch("app.services.validate_address_service.settings.ADDRESS_PROVIDERS", ["replay"]), \
+         patch("app.services.recorded_provider.settings.PROVIDER_CORPUS_PATH", corpus_path), \
+         patch("app.services.recorded_provider.settings.REPLAY_LATENCY_MS", 0):
+        # No credentials, quota or network involved
+        assert await validate_address(ADDRESS, redis=None) == jackson()
+
+async def test_record_mode_wraps_live_provider(corpus_path):
+    with patch("app.services.validate_address_service.settings.PROVIDER_RECORD", True), \
+         patch("app.services.recorded_provider.settings.PROVIDER_CORPUS_PATH", corpus_path), \
+         patch.dict("app.services.validate_address_service.PROVIDERS", {"smarty": lambda redis: FakeProvider({ADDRESS: jackson()})}):
+        assert await validate_address(ADDRESS, redis=None) == jackson()
+    assert len(ResponseCorpus(corpus_path)) == 1
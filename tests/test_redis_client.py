@@ -0,0 +1,141 @@
+import pytest
+import fakeredis.aioredis
+from unittest.mock import patch
+from redis.asyncio import Redis
+from redis.asyncio.cluster import RedisCluster
+from redis.cluster import LoadBalancingStrategy
+from app.core import redis_client
+from app.core.config import settings
+from app.core.redis_client import create_redis_clients, get_redis_clients, reader_for, run_script
+from app.services.cache_service import AddressCacheService, hash_tag
+
+def connection_host(client: Redis) -> str:
+    return client.connection_pool.connection_kwargs["host"]
+
+def test_standalone_reads_from_replica_url():
+    with patch.multiple(settings, REDIS_MODE="standalone", REDIS_URL="redis://primary:6379/0",
+                        REDIS_REPLICA_URL="redis://replica:6379/0", REDIS_READ_FROM_REPLICAS=True):
+        clients = create_redis_clients()
+    assert connection_host(clients.primary) == "primary"
+    assert connection_host(clients.reader) == "replica"
+
+def test_standalone_without_replica_reads_from_primary():
+    with patch.multiple(settings, REDIS_MODE="standalone", REDIS_REPLICA_URL=""):
+        clients = create_redis_clients()
+    assert clients.reader is clients.primary
+
+def test_replica_reads_can_be_disabled():
+    with patch.multiple(settings, REDIS_MODE="standalone", REDIS_REPLICA_URL="redis://replica:6379/0",
+                        REDIS_READ_FROM_REPLICAS=False):
+        clients = create_redis_clients()
+    assert clients.reader is clients.primary
+
+def test_sentinel_discovers_primary_and_replica():
+    with patch.multiple(settings, REDIS_MODE="sentinel", REDIS_URL="redis://:secret@ignored:6379/2",
+                        REDIS_SENTINELS=["sentinel-1:26379", "sentinel-2:26379"],
+                        REDIS_SENTINEL_SERVICE="mymaster", REDIS_READ_FROM_REPLICAS=True):
+        clients = create_redis_clients()
+    assert clients.primary.connection_pool.is_master
+    assert not clients.reader.connection_pool.is_master
+    assert clients.primary.connection_pool.service_name == "mymaster"
+    assert clients.primary.connection_pool.connection_kwargs["db"] == 2
+    sentinels = clients.primary.connection_pool.sentinel_manager.sentinels
+    assert [s.connection_pool.connection_kwargs["host"] for s in sentinels] == ["sentinel-1", "sentinel-2"]
+
+def test_cluster_keeps_primary_traffic_off_replicas():
+    with patch.multiple(settings, REDIS_MODE="cluster", REDIS_URL="redis://node-1:6379",
+                        REDIS_READ_FROM_REPLICAS=True):
+        clients = create_redis_clients()
+    assert isinstance(clients.primary, RedisCluster)
+    assert isinstance(clients.reader, RedisCluster)
+    assert clients.reader is not clients.primary
+    assert clients.primary.load_balancing_strategy is None
+    assert clients.reader.load_balancing_strategy == LoadBalancingStrategy.ROUND_ROBIN_REPLICAS
+
+def test_cluster_replica_reads_can_be_disabled():
+    with patch.multiple(settings, REDIS_MODE="cluster", REDIS_URL="redis://node-1:6379",
+                        REDIS_READ_FROM_REPLICAS=False):
+        clients = create_redis_clients()
+    assert clients.reader is clients.primary
+    assert clients.primary.load_balancing_strategy is None
+
+def test_unknown_mode_is_rejected():
+    with patch.object(settings, "REDIS_MODE", "shard"):
+        with pytest.raises(ValueError):
+            create_redis_clients()
+
+def test_reader_for_pairs_primary_with_replica():
+    with patch.multiple(settings, REDIS_MODE="standalone", REDIS_REPLICA_URL="redis://replica:6379/0",
+                        REDIS_READ_FROM_REPLICAS=True), patch.object(redis_client, "_clients", None):
+        clients = get_redis_clients()
+        assert reader_for(clients.primary) is clients.reader
+        # Clients the registry doesn't know about (tests, scripts) read from themselves
+        other = fakeredis.aioredis.FakeRedis()
+        assert reader_for(other) is other
+
+@pytest.mark.asyncio
+async def test_run_script_loads_the_script_once(redis):
+    script = "return redis.call('INCR', KEYS[1]) + tonumber(ARGV[1])"
+    assert await run_script(redis, script, ["n"], [10]) == 11
+    with patch.object(redis, "script_load", wraps=redis.script_load) as loads:
+        assert await run_script(redis, script, ["n"], [10]) == 12
+        loads.assert_not_called()
+        # A restarted or failed-over node has lost its script cache
+        await redis.script_flush()
+        assert await run_script(redis, script, ["n"], [10]) == 13
+        loads.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_cache_reads_go_to_reader_and_writes_to_primary():
+    primary = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    replica = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    service = AddressCacheService(primary, reader=replica)
+    key = service.generate_cache_key("130 Jackson St")
+    await replica.set(key, '{"street": "130 Jackson St"}')
+
+    assert await service.get_cached_fragment("130 Jackson St") == '{"street": "130 Jackson St"}'
+
+    await service.cache_address("1 Main St", '{"street": "1 Main St"}')
+    assert await primary.get(service.generate_cache_key("1 Main St")) == '{"street": "1 Main St"}'
+    assert await replica.get(service.generate_cache_key("1 Main St")) is None
+    await primary.aclose()
+    await replica.aclose()
+
+def test_cache_keys_carry_a_hash_tag():
+    service = AddressCacheService(None, key_version=3, key_prefix="a")
+    key = service.generate_cache_key("130 Jackson St")
+    assert len(key) == 28
+    assert key.startswith("a:3:{")
+    assert hash_tag(key) == key[5:7]
+    # Keys without a tag hash as a whole
+    assert hash_tag("plainkey") == "plainkey"
+    assert hash_tag("a{}b") == "a{}b"
+
+@pytest.mark.asyncio
+async def test_get_many_fragments_groups_mgets_by_tag(redis):
+    service = AddressCacheService(redis, key_version=3)
+    keys = [service.generate_cache_key(f"{n} Main St") for n in range(50)]
+    await service.cache_many([(key, f'{{"n": {n}}}') for n, key in enumerate(keys[::2])])
+
+    pipeline = redis.pipeline
+    issued = []
+
+    def recording_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        mget = pipe.mget
+
+        def record(keys_in_group):
+            issued.append(keys_in_group)
+            return mget(keys_in_group)
+
+        pipe.mget = record
+        return pipe
+
+    with patch.object(redis, "pipeline", recording_pipeline):
+        values = await service.get_many_fragments(keys + ["missing"])
+
+    assert values[:50:2] == [f'{{"n": {n}}}' for n in range(25)]
+    assert values[1:50:2] == [None] * 25
+    assert values[-1] is None
+    for group in issued:
+        assert len({hash_tag(key) for key in group}) == 1
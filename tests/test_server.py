@@ -0,0 +1,103 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import httpx
+import pytest
+from unittest.mock import patch
+from app.server import Supervisor, build_config, worker_count
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def test_worker_count_defaults_to_cpus():
+    with patch("app.server.os.cpu_count", return_value=6):
+        assert worker_count(0) == 6
+    assert worker_count(3) == 3
+
+def test_build_config_prefers_fast_loop_and_parser():
+    with patch("app.server.is_available", return_value=True):
+        config = build_config(app=None, host="127.0.0.1", port=8000)
+    assert config.loop == "uvloop"
+    assert config.http == "httptools"
+
+    with patch("app.server.is_available", return_value=False):
+        config = build_config(app=None, host="127.0.0.1", port=8000)
+    assert config.loop == "asyncio"
+    assert config.http == "h11"
+
+def test_startup_failures_back_off_then_give_up():
+    supervisor = Supervisor(config=None, sock=None, workers=1)
+    with patch("app.server.settings.WORKER_STARTUP_SECONDS", 10.0), \
+         patch("app.server.settings.WORKER_MAX_STARTUP_FAILURES", 4):
+        delays = []
+        for pid in range(3):
+            supervisor.worker_exited(pid, uptime=0.1)
+            delays.append(supervisor.restart_delay())
+        assert delays == [0.5, 1.0, 2.0]
+        assert not supervisor.should_exit
+
+        supervisor.worker_exited(3, uptime=0.1)
+        assert supervisor.should_exit
+        assert supervisor.exit_code == 1
+        assert len(supervisor.respawn_at) == 3
+
+def test_worker_that_ran_resets_startup_failures():
+    supervisor = Supervisor(config=None, sock=None, workers=1)
+    with patch("app.server.settings.WORKER_STARTUP_SECONDS", 10.0):
+        supervisor.worker_exited(1, uptime=0.1)
+        supervisor.worker_exited(2, uptime=0.1)
+        supervisor.worker_exited(3, uptime=60.0)
+    assert supervisor.startup_failures == 0
+    assert supervisor.restart_delay() == 0.0
+    assert not supervisor.should_exit
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="pre-fork server needs os.fork")
+def test_run_exits_nonzero_when_workers_never_start():
+    sock = socket.socket()
+    supervisor = Supervisor(config=None, sock=sock, workers=1)
+    supervisor.RESTART_BACKOFF_BASE = 0.01
+    handlers = signal.getsignal(signal.SIGINT), signal.getsignal(signal.SIGTERM)
+    try:
+        with patch("app.server.uvicorn.Server", side_effect=RuntimeError("bad config")), \
+             patch("app.server.settings.WORKER_MAX_STARTUP_FAILURES", 3):
+            assert supervisor.run() == 1
+    finally:
+        signal.signal(signal.SIGINT, handlers[0])
+        signal.signal(signal.SIGTERM, handlers[1])
+    assert supervisor.children == {}
+    assert sock.fileno() == -1
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="pre-fork server needs os.fork")
+def test_multi_worker_server_serves_and_shuts_down_gracefully():
+    port = free_port()
+    env = {**os.environ, "GRACEFUL_SHUTDOWN_TIMEOUT": "5", "LOG_LEVEL": "WARNING"}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--host", "127.0.0.1", "--port", str(port), "--workers", "2"],
+        cwd=ROOT,
+        env=env,
+    )
+    try:
+        deadline = time.monotonic() + 20
+        while True:
+            try:
+                response = httpx.get(f"http://127.0.0.1:{port}/v1/health", timeout=1)
+                break
+            except httpx.TransportError:
+                assert proc.poll() is None, "server exited during startup"
+                assert time.monotonic() < deadline, "server did not start"
+                time.sleep(0.2)
+        assert response.status_code == 200
+
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=15) == 0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed on a cache miss (or with DATABASE_URL); loaded lazily or in the lifespan
+LAZY_MODULES = ("smartystreets_python_sdk", "usaddress", "pycrfsuite", "asyncpg")
+
+def loaded_modules(code: str) -> set[str]:
+    """Runs `code` in a fresh interpreter; returns the top-level packages in sys.modules afterwards."""
+    proc = subprocess.run(
+        [sys.executable, "-c", code + "\nimport sys\nprint('\\n'.join(sys.modules))"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert proc.returncode == 0, proc.stderr
+    return {name.split(".")[0] for name in proc.stdout.splitlines()}
+
+def test_import_does_not_load_provider_dependencies():
+    loaded = loaded_modules("import app.main") & set(LAZY_MODULES)
+    assert not loaded, f"imported eagerly: {sorted(loaded)}"
+
+def test_import_has_no_side_effects():
+    proc = subprocess.run(
+        [sys.executable, "-c", "import app.main, app.services.address_input_processor"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout == ""
+
+def test_provider_dependencies_load_on_first_use():
+    code = (
+        "import sys\n"
+        "import app.main\n"
+        "from app.services.validate_address_service import preload_provider\n"
+        "assert 'usaddress' not in sys.modules and 'smartystreets_python_sdk' not in sys.modules\n"
+        "preload_provider()\n"
+        "assert 'usaddress' in sys.modules and 'smartystreets_python_sdk' in sys.modules\n"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env={**os.environ, "ADDRESS_PROVIDERS": '["smarty"]'},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert proc.returncode == 0, proc.stderr
+
+def test_startup_to_first_request():
+    """Fresh interpreter to a served health check, lifespan included."""
+    code = (
+        "from fastapi.testclient import TestClient\n"
+        "from app.main import app\n"
+        "with TestClient(app) as client:\n"
+        "    assert client.get('/v1/health').status_code == 200\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert proc.returncode == 0, proc.stderr
+
+def test_lifespan_warms_provider_in_background():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with patch("app.main.preload_provider") as preload:
+        with TestClient(app) as client:
+            client.get("/v1/health")
+    preload.assert_called_once()
@@ -0,0 +1,99 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.main import app
+from app.api.deps import get_redis
+from app.api.v1.endpoints.address import validate_address
+from app.core.dependencies import ALLOWED_KEYS_SET, ADMIN_KEYS_SET
+from app.core.security import hash_key
+from app.schemas import AddressRequest, StandardizedAddress
+from app.services import usage
+from app.services.usage import UsageRecorder, today, usage_key, usage_report
+
+@pytest.fixture
+async def redis(redis):
+    await redis.sadd(ALLOWED_KEYS_SET, hash_key("admin_key"))
+    await redis.sadd(ADMIN_KEYS_SET, hash_key("admin_key"))
+    yield redis
+
+@pytest.fixture
+def recorder():
+    fresh = UsageRecorder()
+    with patch("app.api.v1.endpoints.address.usage_recorder", fresh), \
+         patch("app.api.v1.endpoints.admin.usage_recorder", fresh):
+        yield fresh
+
+async def test_counters_are_batched_until_flush(redis):
+    recorder = UsageRecorder()
+    for _ in range(3):
+        recorder.record("k1", usage.REQUESTS)
+    recorder.record("k1", usage.CACHE_HITS, 2)
+    assert await redis.exists(usage_key(today())) == 0
+
+    await recorder.flush(redis)
+    assert await redis.hgetall(usage_key(today())) == {"k1:requests": "3", "k1:cache_hits": "2"}
+    assert await redis.ttl(usage_key(today())) > 0
+
+    # Flushed counters are not sent twice
+    await recorder.flush(redis)
+    assert await redis.hget(usage_key(today()), "k1:requests") == "3"
+
+async def test_failed_flush_keeps_counters(redis):
+    recorder = UsageRecorder()
+    recorder.record("k1", usage.REQUESTS)
+    broken = MagicMock()
+    broken.pipeline.return_value.execute = AsyncMock(side_effect=ConnectionError("Redis down"))
+    await recorder.flush(broken)
+
+    recorder.record("k1", usage.REQUESTS)
+    await recorder.flush(redis)
+    assert await redis.hget(usage_key(today()), "k1:requests") == "2"
+
+async def test_report_by_key_and_day(redis):
+    await redis.hset(usage_key(today()), mapping={
+        "small:requests": 10, "small:cache_hits": 9, "small:provider_calls": 1,
+        "big:requests": 40, "big:cache_hits": 10, "big:provider_calls": 30, "big:errors": 2,
+    })
+    rows = await usage_report(redis, days=2)
+    assert [row["key_hash"] for row in rows] == ["big", "small"]
+    assert rows[0]["hit_ratio"] == 0.25
+    assert rows[0]["errors"] == 2
+    assert rows[1]["hit_ratio"] == 0.9
+    assert rows[1]["invalid"] == 0
+
+    only = await usage_report(redis, days=1, key_hash="small")
+    assert [row["key_hash"] for row in only] == ["small"]
+
+@patch("app.api.v1.endpoints.address.validate_address_service", new_callable=AsyncMock)
+async def test_endpoint_records_outcomes(mock_service, redis, recorder):
+    mock_service.return_value = StandardizedAddress(
+        street="130 Jackson St", city="East Rutherford", state="NJ", zip_code="07073-1234")
+    for address in ["130 Jackson St 07055", "07055 130 Jackson St", "123"]:
+        await validate_address(AddressRequest(address_raw=address), redis, "test_key")
+    mock_service.side_effect = RuntimeError("provider down")
+    with pytest.raises(RuntimeError):
+        await validate_address(AddressRequest(address_raw="1 Main St 10001"), redis, "test_key")
+
+    await recorder.flush(redis)
+    key_hash = hash_key("test_key")
+    [row] = await usage_report(redis, days=1)
+    assert row["key_hash"] == key_hash
+    # Provider calls are recorded by the provider itself, which is mocked out here
+    assert {event: row[event] for event in usage.EVENTS} == {
+        "requests": 4, "cache_hits": 1, "provider_calls": 0, "invalid": 1, "errors": 1,
+    }
+
+async def test_usage_endpoint_is_admin_only(redis, recorder):
+    recorder.record(hash_key("test_key"), usage.REQUESTS)
+    app.dependency_overrides[get_redis] = lambda: redis
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            denied = await ac.get("/v1/admin/usage", headers={"X-API-Key": "test_key"})
+            response = await ac.get("/v1/admin/usage", params={"days": 1}, headers={"X-API-Key": "admin_key"})
+    finally:
+        app.dependency_overrides = {}
+
+    assert denied.status_code == 403
+    assert response.status_code == 200
+    # The worker's pending counters are flushed before reporting
+    assert response.json()[0]["requests"] == 1
@@ -1,8 +1,9 @@
+import asyncio
 import pytest
 from httpx import AsyncClient, ASGITransport
 from unittest.mock import AsyncMock, patch
 from app.main import app
-from app.core.dependencies import validate_api_key, get_redis
+from app.core.dependencies import get_api_key, get_redis
 
 from app.schemas import StandardizedAddress
 
@@ -14,7 +15,7 @@ def mock_redis():
 
 @pytest.fixture(autouse=True)
 def override_deps(mock_redis):
-    app.dependency_overrides[validate_api_key] = lambda: "test_key"
+    app.dependency_overrides[get_api_key] = lambda: "test_key"
     app.dependency_overrides[get_redis] = lambda: mock_redis
     yield
     app.dependency_overrides = {}
@@ -55,3 +56,47 @@ async def test_validate_address_invalid_input():
     assert data["success"] is True
     assert data["data"]["valid"] is False
     assert data["data"]["standardized"] is None
+
+@pytest.mark.asyncio
+async def test_auth_and_cache_lookup_share_a_round_trip(mock_redis):
+    # Both Redis calls must be in flight before either completes
+    started = []
+    both_started = asyncio.Event()
+
+    async def record(name, value):
+        started.append(name)
+        if len(started) == 2:
+            both_started.set()
+        await asyncio.wait_for(both_started.wait(), timeout=1)
+        return value
+
+    async def sismember(*args):
+        return await record("sismember", 1)
+
+    async def get(*args):
+        return await record(
+            "get", '{"street": "123 Main St", "city": "Anytown", "state": "NY", "zip_code": "12345-6789"}'
+        )
+
+    mock_redis.sismember.side_effect = sismember
+    mock_redis.get.side_effect = get
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/v1/validate-address", json={"address_raw": "123 Main St"})
+
+    assert response.status_code == 200
+    assert response.json()["data"]["standardized"]["city"] == "Anytown"
+    assert sorted(started) == ["get", "sismember"]
+
+@pytest.mark.asyncio
+async def test_cache_hit_still_requires_allowed_key(mock_redis):
+    mock_redis.sismember.return_value = 0
+    mock_redis.get.return_value = '{"street": "123 Main St", "city": "Anytown", "state": "NY", "zip_code": "12345-6789"}'
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/v1/validate-address", json={"address_raw": "123 Main St"})
+
+    assert response.status_code == 403
+    assert response.json() == {"detail": "Invalid API Key"}
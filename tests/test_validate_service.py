@@ -1,8 +1,13 @@
 import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
-from app.services.validate_address_service import validate_address
+from app.services.validate_address_service import candidates_requested, validate_address, _clients
 from app.core.exceptions import DailyQuotaExceededError, AddressProviderError, ProviderTimeoutError
+from app.core.redis_client import script_sha
+from app.services.circuit_breaker import BEFORE_CALL_SCRIPT, RECORD_SCRIPT
 from app.schemas import StandardizedAddress
+from app.services import usage
+from app.services.quota import set_caller
+from app.services.usage import UsageRecorder
 
 # Mock structure for a Smarty Candidate
 class MockCandidate:
@@ -16,22 +21,46 @@ class MockCandidate:
         self.analysis = MagicMock()
         self.analysis.dpv_match_code = "Y"
 
+@pytest.fixture(autouse=True)
+def reset_smarty_clients():
+    # Clients are cached per process; each test patches its own ClientBuilder
+    _clients.clear()
+    yield
+    _clients.clear()
+
+@pytest.fixture
+def recorder():
+    fresh = UsageRecorder()
+    with patch("app.services.validate_address_service.usage_recorder", fresh):
+        yield fresh
+
 @pytest.fixture
 def mock_redis():
     mock = AsyncMock()
-    mock.incr.return_value = 1
+    # Closed circuit, rate limiter token granted
+    circuit = {script_sha(BEFORE_CALL_SCRIPT): ["closed", ""], script_sha(RECORD_SCRIPT): "closed"}
+    mock.evalsha.side_effect = lambda sha, *args: circuit.get(sha, [1, 0])
+    # Quota unit granted
+    mock.eval.return_value = [1, "interactive"]
+    # No legacy quota counter to carry over
+    mock.get.return_value = None
     return mock
 
 @pytest.mark.asyncio
-@patch("app.services.validate_address_service.usaddress.parse")
-@patch("app.services.validate_address_service.ClientBuilder")
-@patch("app.services.validate_address_service.StaticCredentials")
+@patch("usaddress.parse")
+@patch("smartystreets_python_sdk.ClientBuilder")
+@patch("smartystreets_python_sdk.StaticCredentials")
 @patch("app.services.validate_address_service.settings")
 async def test_validate_address_success(mock_settings, mock_creds, mock_builder, mock_usaddress_parse, mock_redis):
     # Setup
     mock_settings.SMARTY_AUTH_ID = "test_id"
     mock_settings.SMARTY_AUTH_TOKEN = "test_token"
     mock_settings.SMARTY_DAILY_LIMIT = 33
+    # A bare MagicMock would be truthy and switch on record mode
+    mock_settings.PROVIDER_RECORD = False
+    mock_settings.ADDRESS_PROVIDERS = ["smarty"]
+    mock_settings.SMARTY_BATCH_MAX_SIZE = 100
+    mock_settings.SMARTY_BATCH_MAX_WAIT_MS = 5.0
 
     mock_client = MagicMock()
     mock_builder.return_value.build_us_street_api_client.return_value = mock_client
@@ -61,27 +90,41 @@ async def test_validate_address_success(mock_settings, mock_creds, mock_builder,
     assert result.city == "Anytown"
     
     mock_client.send_lookup.assert_called_once()
-    mock_redis.incr.assert_called_once()
+    assert any("quota:{smarty}" in str(call.args[2]) for call in mock_redis.eval.await_args_list)
 
 @pytest.mark.asyncio
-@patch("app.services.validate_address_service.ClientBuilder")
+@patch("smartystreets_python_sdk.ClientBuilder")
 @patch("app.services.validate_address_service.settings")
-async def test_daily_limit_exceeded(mock_settings, mock_builder, mock_redis):
+async def test_daily_limit_exceeded(mock_settings, mock_builder, mock_redis, recorder):
     mock_settings.SMARTY_DAILY_LIMIT = 33
-    mock_redis.incr.return_value = 34
+    mock_settings.PROVIDER_RECORD = False
+    mock_settings.ADDRESS_PROVIDERS = ["smarty"]
+    mock_settings.SMARTY_BATCH_MAX_SIZE = 100
+    mock_settings.SMARTY_BATCH_MAX_WAIT_MS = 5.0
+    async def eval_script(script, numkeys, *args):
+        # The rate limiter grants a token; the quota script rejects
+        return [0, "global"] if args[0].startswith("quota:") else [1, 0]
 
+    mock_redis.eval.side_effect = eval_script
+
+    set_caller("k1")
     with pytest.raises(DailyQuotaExceededError):
         await validate_address("123 Main St", mock_redis)
     
     mock_builder.assert_not_called()
-    mock_redis.decr.assert_called_once()
+    # Rejected before any call went out
+    assert not recorder._pending
 
 @pytest.mark.asyncio
-@patch("app.services.validate_address_service.ClientBuilder")
-@patch("app.services.validate_address_service.StaticCredentials")
+@patch("smartystreets_python_sdk.ClientBuilder")
+@patch("smartystreets_python_sdk.StaticCredentials")
 @patch("app.services.validate_address_service.settings")
 async def test_validate_address_not_found(mock_settings, mock_creds, mock_builder, mock_redis):
     mock_settings.SMARTY_DAILY_LIMIT = 33
+    mock_settings.PROVIDER_RECORD = False
+    mock_settings.ADDRESS_PROVIDERS = ["smarty"]
+    mock_settings.SMARTY_BATCH_MAX_SIZE = 100
+    mock_settings.SMARTY_BATCH_MAX_WAIT_MS = 5.0
     mock_client = MagicMock()
     mock_builder.return_value.build_us_street_api_client.return_value = mock_client
     
@@ -96,30 +139,138 @@ async def test_validate_address_not_found(mock_settings, mock_creds, mock_builde
     mock_client.send_lookup.assert_called_once()
 
 @pytest.mark.asyncio
-@patch("app.services.validate_address_service.ClientBuilder")
-@patch("app.services.validate_address_service.StaticCredentials")
+@patch("smartystreets_python_sdk.ClientBuilder")
+@patch("smartystreets_python_sdk.StaticCredentials")
 @patch("app.services.validate_address_service.settings")
-async def test_validate_address_api_failure(mock_settings, mock_creds, mock_builder, mock_redis):
+async def test_validate_address_api_failure(mock_settings, mock_creds, mock_builder, mock_redis, recorder):
     mock_settings.SMARTY_DAILY_LIMIT = 33
+    mock_settings.PROVIDER_RECORD = False
+    mock_settings.ADDRESS_PROVIDERS = ["smarty"]
+    mock_settings.SMARTY_BATCH_MAX_SIZE = 100
+    mock_settings.SMARTY_BATCH_MAX_WAIT_MS = 5.0
     mock_client = MagicMock()
     mock_builder.return_value.build_us_street_api_client.return_value = mock_client
     
     mock_client.send_lookup.side_effect = Exception("API Error")
 
+    set_caller("k1")
     with pytest.raises(AddressProviderError):
         await validate_address("123 Main St", mock_redis)
+    # The lookup went out, so it counts even though it failed
+    assert recorder._pending[(usage.today(), "k1", usage.PROVIDER_CALLS)] == 1
 
 @patch("app.services.validate_address_service.settings")
 @pytest.mark.asyncio
 async def test_validate_address_missing_credentials(mock_settings, mock_redis):
     mock_settings.SMARTY_DAILY_LIMIT = 33
+    mock_settings.PROVIDER_RECORD = False
+    mock_settings.ADDRESS_PROVIDERS = ["smarty"]
+    mock_settings.SMARTY_BATCH_MAX_SIZE = 100
+    mock_settings.SMARTY_BATCH_MAX_WAIT_MS = 5.0
     mock_settings.SMARTY_AUTH_ID = ""
     mock_settings.SMARTY_AUTH_TOKEN = ""
 
-    with patch("app.services.validate_address_service.ClientBuilder") as mock_builder:
+    with patch("smartystreets_python_sdk.ClientBuilder") as mock_builder:
          mock_client = MagicMock()
          mock_builder.return_value.build_us_street_api_client.return_value = mock_client
          mock_client.send_lookup.side_effect = Exception("Auth Error")
          
          with pytest.raises(AddressProviderError):
-             await validate_address("123 Main St", mock_redis)
\ No newline at end of file
+             await validate_address("123 Main St", mock_redis)
+@pytest.mark.asyncio
+@patch("smartystreets_python_sdk.ClientBuilder")
+async def test_open_circuit_fails_fast(mock_builder, mock_redis):
+    with patch(
+        "app.services.validate_address_service.CircuitBreaker.before_call",
+        side_effect=AddressProviderError("circuit open"),
+    ):
+        with pytest.raises(AddressProviderError):
+            await validate_address("123 Main St", mock_redis)
+
+    # No quota spent and no provider call while the circuit is open
+    mock_redis.eval.assert_not_called()
+    mock_builder.assert_not_called()
+
+@pytest.mark.asyncio
+@patch("usaddress.parse", return_value=[])
+@patch("smartystreets_python_sdk.ClientBuilder")
+@patch("smartystreets_python_sdk.StaticCredentials")
+async def test_validate_address_collects_details(mock_creds, mock_builder, mock_parse, mock_redis):
+    mock_client = MagicMock()
+    mock_builder.return_value.build_us_street_api_client.return_value = mock_client
+
+    first = MockCandidate("123 Main St", "Anytown", "NY", "12345", "6789")
+    first.metadata = MagicMock(latitude=40.1, longitude=-74.2, precision="Zip9", rdi="Residential")
+    first.analysis.dpv_footnotes = "AABB"
+    first.analysis.footnotes = "N#"
+    second = MockCandidate("123 Main St Apt 1", "Anytown", "NY", "12345", "6790")
+
+    def side_effect(lookup):
+        lookup.result = [first, second]
+
+    mock_client.send_lookup.side_effect = side_effect
+
+    token = candidates_requested.set(True)
+    try:
+        result = await validate_address("123 maine street", mock_redis)
+    finally:
+        candidates_requested.reset(token)
+
+    # One call, several candidates requested
+    mock_client.send_lookup.assert_called_once()
+    assert mock_client.send_lookup.call_args.args[0].candidates == 5
+    assert result.street == "123 Main St"
+    assert result.details.metadata.latitude == 40.1
+    assert result.details.metadata.rdi == "Residential"
+    assert result.details.metadata.dpv_footnotes == "AABB"
+    # "maine" was respelled
+    assert result.details.metadata.is_corrected is True
+    assert [c.standardized.street for c in result.details.candidates] == ["123 Main St", "123 Main St Apt 1"]
+    # Fields the SDK did not provide stay empty
+    assert result.details.candidates[1].metadata.latitude is None
+    # Details never leak into the serialized (cached) address
+    assert "details" not in result.model_dump_json()
+
+@pytest.mark.asyncio
+@patch("usaddress.parse")
+@patch("smartystreets_python_sdk.ClientBuilder")
+@patch("smartystreets_python_sdk.StaticCredentials")
+async def test_uncorrected_street_line_is_not_flagged(mock_creds, mock_builder, mock_parse, mock_redis):
+    mock_client = MagicMock()
+    mock_builder.return_value.build_us_street_api_client.return_value = mock_client
+    mock_parse.return_value = [
+        ('123', 'AddressNumber'),
+        ('Main', 'StreetName'),
+        ('St', 'StreetNamePostType'),
+        ('Anytown', 'PlaceName'),
+        ('NY', 'StateName'),
+        ('12345', 'ZipCode'),
+    ]
+
+    def side_effect(lookup):
+        lookup.result = [MockCandidate("123 Main St", "Anytown", "NY", "12345", "6789")]
+
+    mock_client.send_lookup.side_effect = side_effect
+
+    result = await validate_address("123 Main St Anytown NY 12345", mock_redis)
+
+    # Only the street line is compared; the last line was sent separately
+    assert result.details.metadata.is_corrected is False
+    # A plain lookup leaves the SDK's candidate count alone
+    assert not mock_client.send_lookup.call_args.args[0].candidates
+
+@pytest.mark.asyncio
+@patch("usaddress.parse", return_value=[])
+@patch("smartystreets_python_sdk.ClientBuilder")
+@patch("smartystreets_python_sdk.StaticCredentials")
+async def test_standardized_spelling_is_not_a_correction(mock_creds, mock_builder, mock_parse, mock_redis):
+    mock_client = MagicMock()
+    mock_builder.return_value.build_us_street_api_client.return_value = mock_client
+
+    def side_effect(lookup):
+        lookup.result = [MockCandidate("123 N Main St", "Anytown", "NY", "12345", "6789")]
+
+    mock_client.send_lookup.side_effect = side_effect
+
+    result = await validate_address("123 north main street", mock_redis)
+    assert result.details.metadata.is_corrected is False
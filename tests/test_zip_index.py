@@ -0,0 +1,127 @@
+import pytest
+from app.services.zip_index import ZipCodeIndex, ZipCodeEntry, load_zip_index, read_zip_csv
+from app.services.input_processor import AddressInputProcessor
+
+ROWS = [
+    ("07055", "Passaic", "NJ"),
+    ("07073", "East Rutherford", "NJ"),
+    ("06103", "Hartford", "CT"),
+    ("00501", "Holtsville", "NY"),
+    ("07073", "Rutherford", "NJ"),
+    ("07073", "Rutherford", "NJ"),
+]
+
+@pytest.fixture
+def zip_index(tmp_path):
+    path = tmp_path / "zips.idx"
+    ZipCodeIndex.build(ROWS, str(path))
+    index = ZipCodeIndex(str(path))
+    yield index
+    index.close()
+
+@pytest.fixture
+def processor(zip_index):
+    return AddressInputProcessor(zip_index=zip_index)
+
+class TestZipCodeIndex:
+    def test_lookup(self, zip_index):
+        assert len(zip_index) == 4
+        assert zip_index.lookup("07073") == ZipCodeEntry(city="East Rutherford", state="NJ", aliases=("Rutherford",))
+        # Leading zeros survive the integer encoding
+        assert zip_index.lookup("00501") == ZipCodeEntry(city="Holtsville", state="NY")
+
+    def test_lookup_miss(self, zip_index):
+        assert zip_index.lookup("99999") is None
+        assert zip_index.lookup("0000") is None
+        assert zip_index.lookup("abcde") is None
+
+    def test_first_row_wins(self, zip_index):
+        assert zip_index.lookup("07073").city == "East Rutherford"
+
+    def test_later_rows_are_aliases(self, zip_index):
+        # Repeated names are stored once
+        assert zip_index.lookup("07073").aliases == ("Rutherford",)
+        assert zip_index.lookup("07055").aliases == ()
+
+    def test_rejects_foreign_file(self, tmp_path):
+        path = tmp_path / "bogus.idx"
+        path.write_bytes(b"not an index at all")
+        with pytest.raises(ValueError):
+            ZipCodeIndex(str(path))
+
+    def test_truncated_file_disables_the_check(self, tmp_path, caplog):
+        path = tmp_path / "zips.idx"
+        ZipCodeIndex.build(ROWS, str(path))
+        data = path.read_bytes()
+        for truncated in (data[:6], data[:30]):
+            path.write_bytes(truncated)
+            assert load_zip_index(str(path)) is None
+            assert "corrupt" in caplog.text
+            caplog.clear()
+
+    def test_load_disabled_or_missing(self, tmp_path):
+        assert load_zip_index("") is None
+        assert load_zip_index(str(tmp_path / "missing.idx")) is None
+
+    def test_read_csv_skips_header(self, tmp_path):
+        path = tmp_path / "zips.csv"
+        path.write_text("zip,city,state\n07073,East Rutherford,NJ\n")
+        assert list(read_zip_csv(str(path))) == [("07073", "East Rutherford", "NJ")]
+
+class TestProcessorZipCheck:
+    def test_unknown_zip_rejected(self, processor):
+        result = processor.process("130 Jackson St 99999")
+        assert not result.is_valid
+        assert result.error_message == "Unknown ZIP code"
+
+    def test_state_mismatch_rejected(self, processor):
+        result = processor.process("130 Jackson St East Rutherford NY 07073")
+        assert not result.is_valid
+        assert result.error_message == "ZIP code does not match state"
+
+    def test_no_city_left_unchanged(self, processor):
+        # No telling where the street ends, so nothing is filled in
+        result = processor.process("07073 130 jackson st")
+        assert result.is_valid
+        assert result.sanitized_input == "130 jackson st 07073"
+
+    def test_fills_state_only(self, processor):
+        result = processor.process("130 jackson st east rutherford 07073")
+        assert result.sanitized_input == "130 jackson st east rutherford NJ 07073"
+        assert result.canonical_key == "130 jackson street east rutherford nj 07073"
+
+    def test_fills_state_after_alias(self, processor):
+        result = processor.process("130 Jackson St Rutherford 07073")
+        assert result.is_valid
+        assert result.sanitized_input == "130 Jackson St Rutherford NJ 07073"
+
+    def test_zip_plus_four_kept(self, processor):
+        result = processor.process("130 Jackson St, East Rutherford, NJ 07073-1234")
+        assert result.is_valid
+        assert result.sanitized_input == "130 Jackson St, East Rutherford, NJ 07073-1234"
+
+    def test_zip_plus_four_moved_whole(self, processor):
+        result = processor.process("07073-1234 130 Jackson St Rutherford")
+        assert result.is_valid
+        assert result.sanitized_input == "130 Jackson St Rutherford NJ 07073-1234"
+
+    def test_complete_lastline_untouched(self, processor):
+        result = processor.process("130 Jackson St, East Rutherford, NJ 07073")
+        assert result.is_valid
+        assert result.sanitized_input == "130 Jackson St, East Rutherford, NJ 07073"
+
+    def test_street_suffix_not_mistaken_for_state(self, processor):
+        # "Ct" is Connecticut's code but here it is the street suffix
+        result = processor.process("12 Oak Ct 07073")
+        assert result.is_valid
+        assert result.sanitized_input == "12 Oak Ct 07073"
+
+    def test_ambiguous_code_matching_zip_is_state(self, processor):
+        result = processor.process("1 Main St Hartford CT 06103")
+        assert result.is_valid
+        assert result.sanitized_input == "1 Main St Hartford CT 06103"
+
+    def test_no_zip_passes_through(self, processor):
+        result = processor.process("130 Jackson St")
+        assert result.is_valid
+        assert result.sanitized_input == "130 Jackson St"